@@ -0,0 +1,53 @@
+"""
+Compares the allocations made by a chained query and by a query assembled with XPathHelper.builder().
+
+Usage: python -m benchmarks.builder [steps]
+"""
+import sys
+import timeit
+from xpath_helper import xh, filter, XPathHelper
+
+TAGS = ["div", "span", "a", "li", "p", "td"]
+
+
+def build_chained(steps):
+    query = xh
+    for index in range(steps):
+        query = query.get_child_by_tag(TAGS[index % len(TAGS)], filter.get(index % 3 + 1))
+    return query
+
+
+def build_with_builder(steps):
+    builder = XPathHelper.builder()
+    for index in range(steps):
+        builder.get_child_by_tag(TAGS[index % len(TAGS)], filter.get(index % 3 + 1))
+    return builder.freeze()
+
+
+def count_instances(build, steps):
+    """Counts the query instances created while building a query."""
+    instances = [0]
+
+    def profile(frame, event, arg):
+        if event == "call" and frame.f_code is XPathHelper.__init__.__code__:
+            instances[0] += 1
+
+    sys.setprofile(profile)
+    try:
+        build(steps)
+    finally:
+        sys.setprofile(None)
+    return instances[0]
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    assert str(build_chained(steps)) == str(build_with_builder(steps))
+    for name, build in (("chained", build_chained), ("builder", build_with_builder)):
+        instances = count_instances(build, steps)
+        duration = min(timeit.repeat(lambda: build(steps), number=100, repeat=5)) / 100
+        print("{:<8} steps: {} instances: {} time: {:.1f} us".format(name, steps, instances, duration * 10 ** 6))
+
+
+if __name__ == "__main__":
+    main()
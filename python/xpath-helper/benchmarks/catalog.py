@@ -0,0 +1,58 @@
+"""
+Measures the memory held by a catalog of generated four-step queries, with tracemalloc.
+The steps and the filter terms of the queries are interned, so the memory of a query is mostly its XPathHelper
+instance and its path list.
+
+The interning aimed at a 5x cut of the memory per query. It is still open: against the string-only paths
+of 368 bytes/query, the catalog uses 136 bytes/query, a 2.7x cut. The benchmark reports the reduction reached.
+
+Usage: python -m benchmarks.catalog [queries]
+"""
+import gc
+import sys
+import tracemalloc
+from xpath_helper import xh, filter
+
+TAGS = ["div", "span", "a", "li", "p", "td", "h2", "img"]
+CLASSES = ["title", "price", "name", "x", "item", "desc"]
+
+# Memory per query of the catalog before the interning, and the reduction aimed at
+BASELINE_BYTES_PER_QUERY = 368
+TARGET_REDUCTION = 5
+
+
+def build_catalog(size):
+    catalog = []
+    for index in range(size):
+        tag = TAGS[index % len(TAGS)]
+        css_class = CLASSES[(index // len(TAGS)) % len(CLASSES)]
+        catalog.append(xh.get_element_by_tag(tag, filter.attribute_equals("class", css_class)).get_parent()
+                       .get_child_by_tag("div").get_following_sibling_by_tag(TAGS[(index // 3) % len(TAGS)]))
+    return catalog
+
+
+def measure(size):
+    """Returns the memory held by a catalog of <code>size</code> queries, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        catalog = build_catalog(size)
+        gc.collect()
+        memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(catalog) == size
+    return memory
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    memory = measure(size)
+    reduction = BASELINE_BYTES_PER_QUERY / (memory / size)
+    print("queries: {} memory: {:.1f} MB bytes/query: {} reduction: {:.1f}x (target {}x: {})".format(
+        size, memory / 2 ** 20, memory // size, reduction, TARGET_REDUCTION,
+        "met" if reduction >= TARGET_REDUCTION else "not met"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Generator of synthetic XHTML documents, to benchmark queries on documents of any size and shape.
+
+Usage: python -m benchmarks.documents ELEMENTS [--depth N] [--fan-out N] [--seed N] > document.xml
+"""
+import argparse
+import random
+import sys
+
+TAGS = ["div", "section", "ul", "li", "p", "span", "a", "td", "h2", "i"]
+TAG_WEIGHTS = [30, 5, 5, 20, 10, 10, 10, 5, 3, 2]
+CLASSES = ["item", "title", "price", "name", "desc", "st", "mfw", "tleft", "nav", "footer"]
+WORDS = ["motherfudging", "website", "secure", "connection", "it's", "fast", "nginx", "awesome", "over", "a,",
+         "don't", "\"quoted\"", "lightweight", "page", "ARPANET"]
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+
+
+class DocumentShape:
+    """
+    Shape and content distributions of a synthetic document.
+    """
+
+    def __init__(self, elements: int = 10000, depth: int = 12, fan_out: int = 8, attributes: int = 3,
+                 text_probability: float = 0.6, words: int = 6, svg_probability: float = 0.01, seed: int = 0):
+        """Creates an instance of DocumentShape.
+
+        Args:
+            elements (int): number of HTML elements, besides the SVG content
+            depth (int): maximum depth of the elements, reached by at least one of them
+            fan_out (int): maximum number of children of an element
+            attributes (int): maximum number of attributes of an element, besides its id
+            text_probability (float): probability for an element to contain text
+            words (int): maximum number of words of a text
+            svg_probability (float): probability for an element to contain an SVG image
+            seed (int): seed of the random generator, the same shape always generates the same document
+        """
+        self.elements = elements
+        self.depth = depth
+        self.fan_out = fan_out
+        self.attributes = attributes
+        self.text_probability = text_probability
+        self.words = words
+        self.svg_probability = svg_probability
+        self.seed = seed
+
+
+def generate(shape: DocumentShape) -> bytes:
+    """Generates the XHTML document of <code>shape</code>.
+    Elements are generated depth first: the first ones go down to the maximum depth, then each element gets
+    a random number of children, up to the fan-out, until the number of elements is reached.
+
+    Args:
+        shape (DocumentShape): shape of the document
+
+    Returns:
+        bytes: the document, encoded in UTF-8
+    """
+    generator = random.Random(shape.seed)
+    parts = ["<html><head><title>Synthetic document</title></head><body>"]
+    # Each open element is [tag, remaining children]
+    stack = []
+    count = 0
+    while count < shape.elements:
+        if stack and (stack[-1][1] == 0 or len(stack) >= shape.depth):
+            parts.append("</" + stack.pop()[0] + ">")
+            continue
+        if stack:
+            stack[-1][1] -= 1
+        tag = generator.choices(TAGS, TAG_WEIGHTS)[0]
+        count += 1
+        parts.append(_open_tag(generator, shape, tag, count))
+        if generator.random() < shape.text_probability:
+            parts.append(_text(generator, shape))
+        if generator.random() < shape.svg_probability:
+            parts.append(_svg(generator, count))
+        on_first_branch = count == len(stack) + 1
+        children = 1 if on_first_branch else generator.randint(0, shape.fan_out)
+        stack.append([tag, children])
+    parts.extend("</" + tag + ">" for tag, _ in reversed(stack))
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def _open_tag(generator: random.Random, shape: DocumentShape, tag: str, count: int) -> str:
+    attributes = {"id": "e" + str(count)}
+    for _ in range(generator.randint(0, shape.attributes)):
+        kind = generator.random()
+        if kind < 0.5:
+            attributes["class"] = " ".join(generator.sample(CLASSES, generator.randint(1, 3)))
+        elif kind < 0.8:
+            attributes["data-number"] = str(generator.randint(0, 100))
+        elif tag == "a":
+            attributes["href"] = "https://example.com/" + str(count)
+        else:
+            attributes["title"] = generator.choice(WORDS)
+    return "<" + tag + "".join(" " + name + '="' + _escape(value) + '"' for name, value in attributes.items()) + ">"
+
+
+def _text(generator: random.Random, shape: DocumentShape) -> str:
+    return _escape(" ".join(generator.choice(WORDS) for _ in range(generator.randint(1, shape.words))))
+
+
+def _svg(generator: random.Random, count: int) -> str:
+    return ('<svg xmlns="' + SVG_NAMESPACE + '" viewBox="0 0 10 10"><g id="Layer' + str(count) + '">' +
+            "".join('<path d="M0 0L' + str(generator.randint(1, 9)) + ' 9"/>' for _ in range(generator.randint(1, 4))) +
+            "</g></svg>")
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;")
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("elements", type=int)
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(arguments)
+    shape = DocumentShape(options.elements, depth=options.depth, fan_out=options.fan_out, seed=options.seed)
+    sys.stdout.buffer.write(generate(shape))
+
+
+if __name__ == "__main__":
+    main()
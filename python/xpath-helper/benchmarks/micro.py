@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks of the hot paths of the builder and of the filters: per operation time and allocated memory.
+
+Usage:
+    python -m benchmarks.micro                              # runs the benchmarks
+    python -m benchmarks.micro --save benchmarks/baseline.json
+    python -m benchmarks.micro --compare benchmarks/baseline.json [--threshold 0.25]
+
+In comparison mode, the process exits with status 1 when an operation is slower, or allocates more memory,
+than its baseline by more than the threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from xpath_helper import xh, filter
+from xpath_helper.filter import add_openrand, replace_apostrophes
+
+TAGS = ["div", "span", "a", "li", "p", "td", "ul", "section"]
+APOSTROPHE_LITERAL = "It's \"over\" a, isn't it? " * 8
+DEEP_CHAIN = None
+WIDE_FILTER = None
+
+
+def deep_chain():
+    query = xh
+    for index in range(50):
+        query = query.get_child_by_tag(TAGS[index % len(TAGS)], filter.attribute_equals("class", "c" + str(index)))
+    return query
+
+
+def wide_and_operator():
+    return filter.and_operator(*[filter.attribute_contains("class", "c" + str(index)) for index in range(30)])
+
+
+def wide_or_operator():
+    return filter.or_operator(*[filter.value_equals("value " + str(index)) for index in range(30)])
+
+
+def apostrophe_literals():
+    return [replace_apostrophes(APOSTROPHE_LITERAL[index:]) for index in range(0, 200, 10)]
+
+
+def apostrophe_filters():
+    return filter.or_operator(filter.value_contains("It's"), filter.attribute_equals("title", APOSTROPHE_LITERAL))
+
+
+def add_operands():
+    return [add_openrand(WIDE_FILTER, " and ", False) for _ in range(10)]
+
+
+def repeated_str():
+    return [str(DEEP_CHAIN) for _ in range(10)]
+
+
+def canonical_form():
+    return DEEP_CHAIN.fingerprint()
+
+
+BENCHMARKS = {
+    "deep_chain": deep_chain,
+    "wide_and_operator": wide_and_operator,
+    "wide_or_operator": wide_or_operator,
+    "apostrophe_literals": apostrophe_literals,
+    "apostrophe_filters": apostrophe_filters,
+    "add_operands": add_operands,
+    "repeated_str": repeated_str,
+    "canonical_form": canonical_form,
+}
+
+
+def measure(operation):
+    """Returns the best time of an operation, in microseconds, and the peak memory it allocates, in bytes."""
+    operation()
+    number, _ = timeit.Timer(operation).autorange()
+    duration = min(timeit.repeat(operation, number=number, repeat=5)) / number
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"time_us": round(duration * 10 ** 6, 2), "peak_bytes": peak}
+
+
+def run(names=None):
+    global DEEP_CHAIN, WIDE_FILTER
+    DEEP_CHAIN = deep_chain()
+    WIDE_FILTER = wide_and_operator()
+    return {name: measure(BENCHMARKS[name]) for name in names or BENCHMARKS}
+
+
+def compare(results, baseline, threshold):
+    """Returns the regressions of <code>results</code> compared to <code>baseline</code>, as readable lines."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("time_us", "peak_bytes"):
+            reference = baseline[name][metric]
+            if reference and result[metric] > reference * (1 + threshold):
+                regressions.append("{}: {} {} -> {} (+{:.0%})".format(
+                    name, metric, reference, result[metric], result[metric] / reference - 1))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all of them by default")
+    parser.add_argument("--save", metavar="PATH", help="stores the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compares the results with a baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative increase above which a result is a regression (default: 0.25)")
+    options = parser.parse_args(arguments)
+
+    results = run(options.names)
+    for name, result in results.items():
+        print("{:<22} {:>12.2f} us {:>12} bytes".format(name, result["time_us"], result["peak_bytes"]))
+
+    if options.save:
+        with open(options.save, "w") as file:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2, sort_keys=True)
+            file.write("\n")
+    if options.compare:
+        with open(options.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, options.threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+End-to-end benchmarks of representative queries, one per axis family, on synthetic documents of growing size.
+Each document and backend is benchmarked in its own process, so that its peak memory can be measured.
+
+Usage:
+    python -m benchmarks.scaling [--sizes 1000 10000 100000] [--depth 12] [--fan-out 8] [--backends lxml stepwise elementtree]
+    python -m benchmarks.scaling --sizes 2000 --depth 500 --fan-out 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from xpath_helper import xh, filter, Budget, BudgetExceededError
+from benchmarks.documents import DocumentShape, generate
+
+QUERIES = {
+    "descendant": xh.get_element_by_tag("li", filter.attribute_contains("class", "item")),
+    "child": xh.get_element_by_tag("ul").get_child_by_tag("li"),
+    "parent": xh.get_element_by_tag("a", filter.value_contains("secure")).get_parent(),
+    "ancestor": xh.get_element_by_tag("a", filter.attribute_greater_than("data-number", 95)).get_ancestor_by_tag("section"),
+    "following": xh.get_element(filter.attribute_equals("id", "e100")).get_following_by_tag("a"),
+    "following_sibling": xh.get_element_by_tag("li").get_following_sibling_by_tag("li", filter.value_contains("nginx")),
+    "preceding": xh.get_element(filter.attribute_equals("id", "e5000")).get_preceding_by_tag("h2"),
+    "preceding_sibling": xh.get_element_by_tag("p", filter.value_contains("ARPANET")).get_preceding_sibling(),
+    "svg": xh.get_element_by_svg_tag("g").get_child_by_svg_tag("path"),
+    "text": xh.get_element_by_tag("p").get_text(),
+    "attribute_in": xh.get_element(filter.attribute_in("data-number", ["1", "2", "3", "5", "8", "13"])),
+    "count": xh.get_element_by_tag("li").count(),
+    "first": xh.get_element_by_tag("a", filter.value_contains("awesome")).first(),
+}
+
+"""
+Maximum duration of a step by step evaluation, in seconds.
+"""
+TIMEOUT = 30
+
+
+def evaluate_with_lxml(query, document):
+    return query.evaluate(document)
+
+
+def evaluate_step_by_step(query, document):
+    return query.evaluate(document, Budget(timeout=TIMEOUT))
+
+
+def evaluate_with_elementtree(query, document):
+    return query.evaluate(document)
+
+
+BACKENDS = {
+    "lxml": evaluate_with_lxml,
+    "stepwise": evaluate_step_by_step,
+    "elementtree": evaluate_with_elementtree,
+}
+
+
+def peak_memory() -> int:
+    """Returns the peak resident memory of the process, in bytes."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_worker(path, backend):
+    """Parses the document <code>path</code> and evaluates every query with <code>backend</code>.
+    The elementtree backend parses it with the standard library and evaluates the queries compiled for it."""
+    with open(path, "rb") as file:
+        content = file.read()
+    queries = QUERIES
+    if backend == "elementtree":
+        from xml.etree import ElementTree
+        from xpath_helper.elementtree import compile_elementtree
+        queries = {name: compile_elementtree(query) for name, query in QUERIES.items()}
+        parse = ElementTree.fromstring
+    else:
+        from lxml import etree
+        parse = lambda content: etree.fromstring(content, etree.XMLParser(huge_tree=True))
+    initial_memory = peak_memory()
+    start = time.perf_counter()
+    document = parse(content)
+    parse_time = time.perf_counter() - start
+
+    timings = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        try:
+            result = BACKENDS[backend](query, document)
+        except BudgetExceededError:
+            timings[name] = {"time": None, "results": None}
+            continue
+        timings[name] = {"time": time.perf_counter() - start,
+                         "results": result if isinstance(result, (int, bool)) else len(result)}
+    return {"parse_time": parse_time, "memory": peak_memory() - initial_memory, "queries": timings}
+
+
+def run(shape, backends):
+    """Benchmarks the backends against the document of <code>shape</code>, each in its own process."""
+    content = generate(shape)
+    with tempfile.NamedTemporaryFile(suffix=".xml", delete=False) as file:
+        file.write(content)
+    try:
+        reports = {}
+        for backend in backends:
+            output = subprocess.run([sys.executable, "-m", "benchmarks.scaling", "--worker", file.name, backend],
+                                    stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+            reports[backend] = json.loads(output)
+        return len(content), reports
+    finally:
+        os.remove(file.name)
+
+
+def print_report(shape, size, reports):
+    megabytes = size / 2 ** 20
+    print("{} elements, depth {}, fan-out {}: {:.1f} MB".format(shape.elements, shape.depth, shape.fan_out, megabytes))
+    for backend, report in reports.items():
+        print("  {:<10} parse {:8.1f} ms   peak memory +{:.1f} MB".format(
+            backend, report["parse_time"] * 1000, report["memory"] / 2 ** 20))
+        for name, timing in report["queries"].items():
+            if timing["time"] is None:
+                print("    {:<18} timeout after {} s".format(name, TIMEOUT))
+                continue
+            throughput = megabytes / timing["time"] if timing["time"] else float("inf")
+            print("    {:<18} {:10.2f} ms {:10.1f} MB/s {:>10} results".format(
+                name, timing["time"] * 1000, throughput, timing["results"]))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--worker", nargs=2, metavar=("PATH", "BACKEND"), help=argparse.SUPPRESS)
+    options = parser.parse_args(arguments)
+
+    if options.worker:
+        json.dump(run_worker(*options.worker), sys.stdout)
+        return
+    for elements in options.sizes:
+        shape = DocumentShape(elements, depth=options.depth, fan_out=options.fan_out)
+        size, reports = run(shape, options.backends)
+        print_report(shape, size, reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from xpath_helper.driver import BATCH_SCRIPT, NODES
+from xpath_helper.evaluation import BOOLEAN, STRING, _resolve_document
+
+
+class FakeDriver:
+    """
+    Driver executing the batch script against an lxml tree instead of a browser, for tests.
+    It counts the round trips a real driver would make: script executions and element lookups.
+    """
+
+    def __init__(self, document):
+        """Creates an instance of FakeDriver.
+
+        Args:
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): document loaded in the fake browser
+        """
+        self.document = _resolve_document(document)
+        self.round_trips = 0
+
+    def execute_script(self, script: str, *arguments) -> list:
+        """Executes the batch script.
+
+        Args:
+            script (str): script, which must be BATCH_SCRIPT
+            arguments: the [expression, kind] pairs and the context node
+
+        Raises:
+            ValueError: when the script isn't the batch script
+
+        Returns:
+            list: the result of each query
+        """
+        self.round_trips += 1
+        if script != BATCH_SCRIPT:
+            raise ValueError("FakeDriver only executes the batch script")
+        from lxml import etree
+        queries = arguments[0]
+        context = arguments[1] if len(arguments) > 1 and arguments[1] is not None else self.document
+        results = []
+        for expression, kind in queries:
+            try:
+                value = context.xpath(expression, smart_strings=False)
+            except etree.XPathError as error:
+                results.append({"error": str(error)})
+                continue
+            if kind == NODES:
+                value = [node if hasattr(node, "tag") else str(node) for node in value]
+            elif kind == STRING:
+                value = str(value)
+            elif kind == BOOLEAN:
+                value = bool(value)
+            results.append(value)
+        return results
+
+    def find_elements(self, by: str, value: str) -> list:
+        """Returns the elements selected by the XPath expression <code>value</code>, in one round trip.
+
+        Args:
+            by (str): locator strategy, which must be "xpath"
+            value (str): XPath expression
+
+        Raises:
+            ValueError: when the locator strategy isn't "xpath"
+
+        Returns:
+            list[lxml.etree._Element]: the selected elements
+        """
+        self.round_trips += 1
+        if by != "xpath":
+            raise ValueError("FakeDriver only locates elements by xpath")
+        return self.document.xpath(value)
+
+    def find_element(self, by: str, value: str):
+        """Returns the first element selected by the XPath expression <code>value</code>, in one round trip.
+
+        Args:
+            by (str): locator strategy, which must be "xpath"
+            value (str): XPath expression
+
+        Raises:
+            LookupError: when no element is selected
+
+        Returns:
+            lxml.etree._Element: the first selected element
+        """
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise LookupError("No element is selected by " + repr(value))
+        return elements[0]
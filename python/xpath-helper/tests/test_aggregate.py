@@ -0,0 +1,55 @@
+import pytest
+from xpath_helper import xh, filter, Budget
+
+
+def test_count(html_doc):
+    count = xh.get_element_by_tag("li").count()
+    assert str(count) == "count(//li)"
+    assert count.evaluate(html_doc) == len(html_doc.xpath("//li"))
+    assert count.evaluate(html_doc, Budget()) == len(html_doc.xpath("//li"))
+
+
+def test_count_limited(html_doc):
+    assert xh.get_element_by_tag("li").limit(5).count().evaluate(html_doc) == 5
+
+
+def test_exists(html_doc):
+    assert str(xh.get_element_by_tag("h1").exists()) == "boolean(//h1)"
+    assert xh.get_element_by_tag("h1").exists().evaluate(html_doc) is True
+    assert xh.get_element_by_tag("h7").exists().evaluate(html_doc) is False
+    assert xh.get_element_by_tag("h7").exists().evaluate(html_doc, Budget()) is False
+
+
+def test_exists_stops_at_first_node(html_doc):
+    assert xh.get_element_by_tag("p").exists().evaluate(html_doc, Budget(max_visited_nodes=30)) is True
+
+
+def test_string(html_doc):
+    string = xh.get_element_by_tag("h1").string()
+    assert str(string) == "string(//h1)"
+    assert string.evaluate(html_doc) == "The best motherfudging website"
+    assert type(string.evaluate(html_doc)) is str
+    assert string.evaluate(html_doc, Budget()) == "The best motherfudging website"
+    assert xh.get_element_by_tag("h7").string().evaluate(html_doc, Budget()) == ""
+
+
+def test_get_text(html_doc):
+    text = xh.get_element_by_tag("h1").get_text()
+    assert str(text) == "//h1/text()"
+    assert text.evaluate(html_doc) == ["The ", " motherfudging website"]
+    assert text.evaluate(html_doc, Budget()) == ["The ", " motherfudging website"]
+    assert all(type(value) is str for value in text.evaluate(html_doc))
+
+
+@pytest.mark.parametrize("attribute", ["href", "*"])
+def test_get_attribute(html_doc, attribute):
+    values = xh.get_element_by_tag("a", filter.value_contains("guy")).get_attribute(attribute)
+    assert str(values) == "//a[text()[contains(., 'guy')]]/@" + attribute
+    assert values.evaluate(html_doc) == ["http://bettermotherfudgingwebsite.com", "http://motherfudgingwebsite.com/"]
+    assert values.evaluate(html_doc, Budget()) == values.evaluate(html_doc)
+    assert all(type(value) is str for value in values.evaluate(html_doc))
+
+
+def test_count_projection(html_doc):
+    assert xh.get_element_by_tag("a").get_attribute("href").count().evaluate(html_doc, Budget()) == \
+        xh.get_element_by_tag("a").get_attribute("href").count().evaluate(html_doc)
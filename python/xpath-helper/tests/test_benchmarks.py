@@ -0,0 +1,25 @@
+from lxml import etree
+from benchmarks.documents import DocumentShape, generate
+from benchmarks.micro import compare
+
+
+def test_compare():
+    baseline = {"deep_chain": {"time_us": 100.0, "peak_bytes": 1000}, "removed": {"time_us": 1.0, "peak_bytes": 1}}
+    assert compare({"deep_chain": {"time_us": 120.0, "peak_bytes": 1000}}, baseline, 0.25) == []
+    assert compare({"deep_chain": {"time_us": 130.0, "peak_bytes": 2000}}, baseline, 0.25) == [
+        "deep_chain: time_us 100.0 -> 130.0 (+30%)",
+        "deep_chain: peak_bytes 1000 -> 2000 (+100%)",
+    ]
+
+
+def test_generate_document():
+    shape = DocumentShape(300, depth=40, fan_out=3, svg_probability=0.2)
+    content = generate(shape)
+    assert content == generate(shape)
+    document = etree.fromstring(content)
+    body = document.find("body")
+    elements = body.xpath(".//*[not(ancestor-or-self::*[local-name() = 'svg'])]")
+    assert len(elements) == 300
+    # html and body are above the generated elements
+    assert max(len(node.xpath("ancestor::*")) for node in elements) == 40 + 1
+    assert document.xpath("//*[local-name() = 'path']")
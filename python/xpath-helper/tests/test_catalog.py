@@ -0,0 +1,60 @@
+import json
+import pytest
+from xpath_helper import xh, filter, Budget, QuerySet
+from xpath_helper.catalog import CatalogQuery, CatalogVersionError, load_catalog, save_catalog
+
+
+def create_query_set():
+    queries = QuerySet({
+        "title": xh.get_element_by_tag("h1"),
+        "secure": xh.get_element_by_tag("a", filter.value_contains("secure connection")).get_parent(),
+        "last_items": xh.get_element_by_tag("ul").get_child_by_tag("li", filter.get_last()),
+        "svg": xh.get_element_by_svg_tag("g", filter.attribute_equals("id", "Layer1")).get_child_by_svg_tag("path"),
+        "nginx": xh.get_element_by_tag("li", filter.or_operator(
+            filter.and_operator(filter.value_contains("Uses"), filter.value_contains("awesome")),
+            filter.value_contains("nginx"),
+        )),
+        "first_links": xh.get_element_by_tag("a").limit(3) | xh.get_element_by_tag("h2"),
+    })
+    queries.add("count", xh.get_element_by_tag("li").count())
+    queries.add("string", xh.get_element_by_tag("h1").string())
+    queries.add("links", xh.get_element_by_tag("a").get_attribute("href"))
+    return queries
+
+
+def test_save_and_load(html_doc, tmp_path):
+    queries = create_query_set()
+    path = str(tmp_path / "catalog.json")
+    save_catalog(queries, path)
+    loaded = load_catalog(path)
+    assert list(loaded) == list(queries)
+    assert all(type(query) is CatalogQuery for _, query in loaded.items())
+    assert loaded.evaluate(html_doc) == queries.evaluate(html_doc)
+    assert loaded.evaluate(html_doc, Budget()) == queries.evaluate(html_doc)
+    for name, query in queries.items():
+        assert str(loaded[name]) == str(query)
+        assert loaded[name].fingerprint() == query.fingerprint()
+
+
+def test_compile_lazily(html_doc, tmp_path):
+    path = str(tmp_path / "catalog.json")
+    save_catalog(create_query_set(), path)
+    loaded = load_catalog(path)
+    assert loaded["count"]._CatalogQuery__compiled is None
+    assert loaded["count"].evaluate(html_doc) == len(html_doc.xpath("//li"))
+    assert loaded["count"]._CatalogQuery__compiled is not None
+    save_catalog(loaded, path)
+    assert load_catalog(path)["count"].canonical() == "count(//li)"
+
+
+def test_version_mismatch(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    save_catalog(create_query_set(), path)
+    with open(path) as file:
+        catalog = json.load(file)
+    catalog["version"] = "0.0.1"
+    with open(path, "w") as file:
+        json.dump(catalog, file)
+    with pytest.raises(CatalogVersionError) as error:
+        load_catalog(path)
+    assert error.value.version == "0.0.1"
@@ -0,0 +1,125 @@
+import bz2
+import gzip
+import json
+import lzma
+import subprocess
+import sys
+import pytest
+from xpath_helper import xh, filter, QuerySet
+from xpath_helper.catalog import save_catalog
+from xpath_helper.cli import expand_inputs, load_queries, main
+
+QUERY_FILE = """
+from xpath_helper import xh, filter
+
+queries = {
+    "items": xh.get_element_by_tag("li").count(),
+    "title": xh.get_element_by_tag("h1").string(),
+    "links": xh.get_element_by_tag("a", filter.attribute_contains("href", "http")),
+}
+"""
+
+
+def create_query_set():
+    return QuerySet({
+        "items": xh.get_element_by_tag("li").count(),
+        "title": xh.get_element_by_tag("h1").string(),
+        "links": xh.get_element_by_tag("a", filter.attribute_contains("href", "http")),
+    })
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    with open('./tests/index.html', 'rb') as f:
+        content = f.read()
+    paths = []
+    for index, (suffix, compress) in enumerate([("", bytes), (".gz", gzip.compress), (".bz2", bz2.compress),
+                                                (".xz", lzma.compress)] * 2):
+        path = tmp_path / ("page" + str(index) + ".html" + suffix)
+        path.write_bytes(compress(content.replace(b"<h1>", b"<h1>" + str(index).encode())))
+        paths.append(str(path))
+    query_file = tmp_path / "queries.py"
+    query_file.write_text(QUERY_FILE)
+    save_catalog(create_query_set(), str(tmp_path / "catalog.json"))
+    return tmp_path, paths
+
+
+def run(capsys, arguments):
+    status = main(arguments)
+    output = capsys.readouterr()
+    return status, [json.loads(line) for line in output.out.splitlines()], output.err
+
+
+def test_load_queries(corpus, html_doc):
+    directory, _ = corpus
+    expected = create_query_set().evaluate(html_doc)
+    assert load_queries(str(directory / "queries.py")).evaluate(html_doc) == expected
+    assert load_queries(str(directory / "catalog.json")).evaluate(html_doc) == expected
+    (directory / "empty.py").write_text("x = 1")
+    with pytest.raises(ValueError):
+        load_queries(str(directory / "empty.py"))
+
+
+def test_expand_inputs(corpus):
+    directory, paths = corpus
+    pattern = str(directory / "page*.html*")
+    assert list(expand_inputs([paths[1], pattern], sort=True)) == [paths[1]] + sorted(set(paths) - {paths[1]})
+    assert sorted(expand_inputs([str(directory / "**" / "*.xz")])) == sorted(paths[3::4])
+    # Without sorting, the paths are streamed and a file matched twice is produced twice
+    streamed = expand_inputs([paths[1], pattern])
+    assert not isinstance(streamed, (list, tuple))
+    assert sorted(streamed) == sorted(paths + [paths[1]])
+
+
+@pytest.mark.parametrize("query_file", ["queries.py", "catalog.json"])
+def test_main(corpus, capsys, html_doc, query_file):
+    directory, paths = corpus
+    status, lines, _ = run(capsys, [str(directory / query_file)] + paths + ["--workers", "0"])
+    assert status == 0
+    assert [line["path"] for line in lines] == paths
+    expected = create_query_set().evaluate_records(html_doc)
+    for index, line in enumerate(lines):
+        results = line["results"]
+        assert results["title"] == str(index) + expected["title"]
+        assert results["items"] == expected["items"]
+        assert [link["attributes"]["href"] for link in results["links"]] == \
+            [dict(record.attributes)["href"] for record in expected["links"]]
+
+
+def test_workers(corpus, capsys):
+    directory, paths = corpus
+    query_path = str(directory / "queries.py")
+    _, expected, _ = run(capsys, [query_path] + paths + ["--workers", "0"])
+    status, ordered, _ = run(capsys, [query_path] + paths + ["--workers", "2"])
+    assert status == 0
+    assert ordered == expected
+    status, unordered, statistics = run(capsys, [query_path, str(directory / "page*")] +
+                                        ["--workers", "2", "--unordered", "--progress"])
+    assert status == 0
+    assert sorted(unordered, key=lambda line: line["path"]) == sorted(expected, key=lambda line: line["path"])
+    assert "8 files (0 errors)" in statistics.splitlines()[-1]
+
+
+def test_errors(corpus, capsys):
+    directory, paths = corpus
+    (directory / "broken.xml").write_text("<html><body>")
+    status, lines, _ = run(capsys, [str(directory / "queries.py"), paths[0], str(directory / "broken.xml"),
+                                    str(directory / "missing.xml"), "--workers", "0"])
+    assert status == 1
+    assert "results" in lines[0]
+    assert lines[1]["error"].startswith("XMLSyntaxError")
+    # The message of the error comes from lxml and changes with its version
+    assert lines[2]["error"].startswith("OSError: ")
+    status, lines, _ = run(capsys, [str(directory / "queries.py"), str(directory / "broken.xml"),
+                                    "--workers", "0", "--html"])
+    assert status == 0
+    assert lines[0]["results"]["items"] == 0
+
+
+def test_module(corpus):
+    directory, paths = corpus
+    output = subprocess.run([sys.executable, "-m", "xpath_helper", str(directory / "catalog.json"), paths[0],
+                             "--attributes", "href"], stdout=subprocess.PIPE, check=True)
+    line = json.loads(output.stdout.decode())
+    assert line["path"] == paths[0]
+    assert all(set(link["attributes"]) == {"href"} for link in line["results"]["links"])
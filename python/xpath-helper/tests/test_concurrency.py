@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest
+from xpath_helper import xh, filter, QuerySet
+from xpath_helper.concurrency import map_in_chunks
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def read_document():
+    with open('./tests/index.html', 'rb') as f:
+        return f.read()
+
+
+def create_query_set():
+    return QuerySet({
+        "items": xh.get_element_by_tag("li").count(),
+        "title": xh.get_element_by_tag("h1").string(),
+        "classes": xh.get_element(filter.has_attribute("class")).get_attribute("class"),
+    })
+
+
+def test_aevaluate(html_doc):
+    links = xh.get_element_by_tag("a", filter.attribute_contains("href", "http"))
+    assert run(links.aevaluate(html_doc)) == links.evaluate(html_doc)
+    assert run(links.count().aevaluate(html_doc)) == links.count().evaluate(html_doc)
+    queries = create_query_set()
+    assert run(queries.aevaluate(html_doc)) == queries.evaluate(html_doc)
+
+
+def test_aevaluate_many():
+    content = read_document()
+    documents = [content.replace(b"<h1>", b"<h1>" + str(index).encode()) for index in range(20)]
+    queries = create_query_set()
+    results = run(queries.aevaluate_many(documents, concurrency=2, chunk_size=3))
+    assert [result["title"] for result in results] == [queries.evaluate(document)["title"] for document in documents]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert run(queries.aevaluate_many(documents[:4], executor=executor, chunk_size=2)) == results[:4]
+
+
+def test_bounded_concurrency():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.002)
+        with lock:
+            running[0] -= 1
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert run(map_in_chunks(work, range(50), executor, concurrency=2, chunk_size=4)) == list(range(0, 100, 2))
+    assert peak[0] == 2
+    with pytest.raises(ValueError):
+        run(map_in_chunks(work, range(5), chunk_size=0))
+
+
+def test_lazy_consumption():
+    consumed = []
+    release = threading.Event()
+
+    def items():
+        for item in range(50):
+            consumed.append(item)
+            yield item
+
+    def work(item):
+        release.wait(5)
+        return item
+
+    async def consume():
+        task = asyncio.ensure_future(map_in_chunks(work, items(), executor, concurrency=2, chunk_size=4))
+        await asyncio.sleep(0.05)
+        # Only the two running chunks have been read
+        assert len(consumed) == 8
+        release.set()
+        return await task
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert run(consume()) == list(range(50))
+
+
+def test_failure_stops_reading():
+    consumed = []
+
+    def items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    def work(item):
+        if item == 3:
+            raise KeyError(item)
+        return item
+
+    with pytest.raises(KeyError):
+        run(map_in_chunks(work, items(), concurrency=1, chunk_size=4))
+    assert len(consumed) < 100
+
+
+def test_cancellation():
+    processed = []
+
+    def work(item):
+        time.sleep(0.005)
+        processed.append(item)
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(map_in_chunks(work, range(200), concurrency=2, chunk_size=10))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel_soon())
+    time.sleep(0.05)
+    assert 0 < len(processed) < 40
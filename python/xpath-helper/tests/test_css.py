@@ -0,0 +1,69 @@
+import pytest
+from lxml import etree
+from xpath_helper import xh, filter
+from benchmarks.documents import DocumentShape, generate
+
+cssselect = pytest.importorskip("lxml.cssselect")
+
+QUERIES = [
+    xh.get_element_by_tag("span", filter.attribute_equals("class", "mfw")),
+    xh.get_element_by_tag("ul").get_child_by_tag("li"),
+    xh.get_element_by_tag("li", filter.get(2)),
+    xh.get_element_by_tag("ul").get_child(filter.get_last()),
+    xh.get_child_by_tag("html").get_child_by_tag("body").get_child_by_tag("p", filter.get_first()),
+    xh.get_element_by_tag("h2").get_following_sibling_by_tag("p", filter.attribute_contains("class", "st")),
+    xh.get_element(filter.has_attribute("href").and_operator(filter.not_operator(filter.attribute_contains("href", "http")))),
+    xh.get_element(filter.or_operator(filter.attribute_equals("class", "mfw"), filter.attribute_in("id", ["rbw", "e3"]))),
+    xh.get_element_by_tag("span", filter.attribute_not_equals("class", "mfw")),
+    xh.get_element_by_tag("h1") | xh.get_element_by_tag("a", filter.attribute_equals("title", "it's \"over\"")),
+    xh.get_descendant_or_self_by_tag("li", filter.attribute_in("class", ["item", "nav"])),
+    xh.get_element_by_tag("ul", filter.attribute_in("class", ["list", "nav"])).get_child_by_tag(
+        "li", filter.or_operator(filter.has_attribute("id"), filter.attribute_contains("class", "it")).and_operator(
+            filter.has_attribute("class"))),
+]
+
+
+@pytest.fixture(scope="module")
+def synthetic_doc():
+    return etree.fromstring(generate(DocumentShape(2000, depth=8, fan_out=6)))
+
+
+@pytest.mark.parametrize("index", range(len(QUERIES)))
+def test_same_elements(html_doc, synthetic_doc, index):
+    query = QUERIES[index]
+    selector = query.to_css()
+    assert selector is not None
+    for document in (html_doc, synthetic_doc):
+        assert cssselect.CSSSelector(selector)(document) == query.evaluate(document)
+
+
+def test_to_css():
+    assert QUERIES[0].to_css() == "span[class='mfw']"
+    assert QUERIES[1].to_css() == "ul > li"
+    assert QUERIES[2].to_css() == "li:nth-of-type(2)"
+    assert QUERIES[3].to_css() == "ul > *:last-child"
+    assert QUERIES[4].to_css() == "html:root > body > p:nth-of-type(1)"
+    assert QUERIES[5].to_css() == "h2 ~ p[class*='st']"
+    assert QUERIES[8].to_css() == "span[class]:not([class='mfw'])"
+    assert QUERIES[7].to_css() == "*[class='mfw'], *[id='e3'], *[id='rbw']"
+    assert QUERIES[9].to_css() == "h1, a[title='it\\'s \"over\"']"
+    assert QUERIES[10].to_css() == "li[class='item'], li[class='nav']"
+    assert QUERIES[11].to_css() == ("ul[class='list'] > li[id][class], ul[class='list'] > li[class*='it'][class], "
+                                    "ul[class='nav'] > li[id][class], ul[class='nav'] > li[class*='it'][class]")
+
+
+def test_no_css_equivalent():
+    assert xh.get_element_by_tag("a").get_parent().to_css() is None
+    assert xh.get_element_by_tag("p", filter.value_contains("guy")).to_css() is None
+    assert xh.get_element_by_tag("li").get_text().to_css() is None
+    assert xh.get_element_by_svg_tag("g").to_css() is None
+    assert xh.get_element_by_tag("h2").get_following_sibling_by_tag("p", filter.get_first()).to_css() is None
+    assert xh.get_element_by_tag("a").first().to_css() is None
+    assert xh.get_element_by_tag("a", filter.attribute_equals("data-number", 3)).to_css() is None
+    assert xh.get_element(filter.not_operator(filter.attribute_not_equals("class", "mfw"))).to_css() is None
+    assert xh.get_element_by_tag("div", filter.attribute_contains("class", "")).to_css() is None
+    assert xh.get_element_by_tag("section").get_descendant_by_tag(
+        "a", filter.attribute_less_than("data-number", 50)).to_css() is None
+    assert xh.get_element(filter.not_operator(filter.attribute_in("id", ["rbw", "e3"]))).to_css() is None
+    assert xh.get_element(filter.not_operator(filter.has_attribute("id").and_operator(
+        filter.has_attribute("class")))).to_css() is None
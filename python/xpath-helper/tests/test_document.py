@@ -0,0 +1,170 @@
+import mmap
+import os
+import subprocess
+import sys
+import tracemalloc
+import pytest
+from lxml import etree
+from xpath_helper import xh, filter, Budget, DocumentCache, QuerySet
+from xpath_helper.document import BUFFER_CHUNK_SIZE, documents, parse_content
+from benchmarks.documents import DocumentShape, generate
+
+# The peak RSS is read from /proc, as ru_maxrss keeps the peak of the parent process across fork and exec
+MEMORY_SCRIPT = """
+import pathlib, sys
+from lxml import etree
+from xpath_helper import xh
+
+def peak_rss():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+
+query = xh.get_element_by_tag("p").count()
+query.evaluate(b"<p/>")
+before = peak_rss()
+if sys.argv[1] == "tree":
+    count = len(etree.parse(sys.argv[2]).getroot())
+elif sys.argv[1] == "path":
+    count = query.evaluate(pathlib.Path(sys.argv[2]))
+else:
+    with open(sys.argv[2]) as f:
+        count = query.evaluate(f.read())
+print(count, peak_rss() - before)
+"""
+
+
+def read_document():
+    with open('./tests/index.html', 'rb') as f:
+        return f.read()
+
+
+def test_parse_once():
+    cache = DocumentCache()
+    content = read_document()
+    root = cache.parse(content)
+    assert cache.parse(bytes(content)) is root
+    assert cache.parse(content.decode("utf-8")) is not root
+    assert len(cache) == 2
+    assert content in cache
+    assert cache.memory > 2 * len(content)
+
+
+def test_evict_by_memory():
+    content = read_document()
+    cache = DocumentCache()
+    cache.parse(content)
+    cache = DocumentCache(max_memory=int(cache.memory * 2.5))
+    first = content.replace(b"<h1>", b"<h1>1")
+    second = content.replace(b"<h1>", b"<h1>2")
+    third = content.replace(b"<h1>", b"<h1>3")
+    cache.parse(first)
+    cache.parse(second)
+    cache.parse(first)
+    cache.parse(third)
+    assert len(cache) == 2
+    assert first in cache and third in cache and second not in cache
+    assert cache.memory <= cache.max_memory
+
+
+def test_too_large_document():
+    cache = DocumentCache(max_memory=100)
+    assert cache.parse(read_document()).tag == "html"
+    assert len(cache) == 0 and cache.memory == 0
+
+
+def test_evaluate_raw_document(html_doc):
+    content = read_document()
+    query = xh.get_element_by_tag("a", filter.value_contains("guy"))
+    assert [node.get("href") for node in query.evaluate(content)] == \
+        [node.get("href") for node in query.evaluate(html_doc)]
+    assert query.evaluate(content)[0] is query.evaluate(content, Budget())[0]
+    assert content in documents
+    assert query.count().evaluate(content.decode("utf-8")) == query.count().evaluate(html_doc)
+
+
+@pytest.fixture
+def document_file(tmp_path):
+    path = tmp_path / "index.html"
+    path.write_bytes(read_document())
+    return path
+
+
+def test_evaluate_path_and_buffers(html_doc, document_file):
+    content = read_document()
+    query = xh.get_element_by_tag("a", filter.value_contains("guy")).get_attribute("href")
+    expected = query.evaluate(html_doc)
+    with open(str(document_file), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for document in [document_file, memoryview(content), bytearray(content), mapped]:
+            assert query.evaluate(document) == expected
+            assert query.count().evaluate(document) == len(expected)
+            assert QuerySet({"links": query}).evaluate(document)["links"] == expected
+        assert xh.get_element_by_tag("a").evaluate_records(mapped) == xh.get_element_by_tag("a").evaluate_records(content)
+
+
+def test_cache_keys(document_file):
+    cache = DocumentCache()
+    content = read_document()
+    root = cache.parse(content)
+    assert cache.parse(memoryview(content)) is root
+    assert memoryview(content) in cache
+    from_file = cache.parse(document_file)
+    assert from_file is not root and cache.parse(document_file) is from_file
+    document_file.write_bytes(content.replace(b"<h1>", b"<h1>changed"))
+    os.utime(str(document_file), ns=(0, 0))
+    assert document_file not in cache
+    assert cache.parse(document_file).findtext(".//h1").startswith("changed")
+
+
+def parses_memoryview():
+    try:
+        etree.fromstring(memoryview(b"<p/>"))
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def peak_memory_of_parsing(buffer):
+    tracemalloc.start()
+    try:
+        parse_content(buffer)
+        parse_content(memoryview(buffer))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_buffers_not_copied(tmp_path, monkeypatch):
+    document_file = tmp_path / "large.xml"
+    document_file.write_bytes(generate(DocumentShape(20000)))
+    with open(str(document_file), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # Older lxml versions can't parse a buffer in place, it is copied one chunk at a time
+        bound = len(mapped) / 4 if parses_memoryview() else BUFFER_CHUNK_SIZE
+        assert peak_memory_of_parsing(mapped) < bound
+        # Without in-place parsing, the buffer is read by chunks
+        fromstring = etree.fromstring
+
+        def bytes_only(text, parser=None):
+            if not isinstance(text, (bytes, str)):
+                raise ValueError("can only parse strings")
+            return fromstring(text, parser)
+
+        monkeypatch.setattr(etree, "fromstring", bytes_only)
+        assert peak_memory_of_parsing(mapped) < BUFFER_CHUNK_SIZE < len(mapped) / 4
+        assert etree.tostring(parse_content(mapped)) == etree.tostring(parse_content(mapped[:]))
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs the peak RSS from /proc")
+def test_peak_memory_of_path(tmp_path):
+    path = tmp_path / "large.xml"
+    path.write_text("<root>" + ("<p>" + "lorem ipsum " * 700 + "</p>") * 1000 + "</root>")
+    size = path.stat().st_size
+    environment = dict(os.environ, PYTHONPATH=os.getcwd())
+    peaks = {}
+    for source in ["tree", "path", "str"]:
+        output = subprocess.run([sys.executable, "-c", MEMORY_SCRIPT, source, str(path)], env=environment,
+                                stdout=subprocess.PIPE, check=True).stdout.split()
+        assert output[0] == b"1000"
+        peaks[source] = int(output[1])
+    # Evaluating the file needs no more memory than its tree, while reading it into a str first adds a copy
+    assert peaks["path"] < 1.05 * peaks["tree"] + 2 ** 19
+    assert peaks["str"] > peaks["tree"] + size / 2
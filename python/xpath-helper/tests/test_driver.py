@@ -0,0 +1,43 @@
+import pytest
+from xpath_helper import xh, filter, QuerySet
+from xpath_helper.driver import DriverEvaluationError, evaluate_batch
+from tests.fake_driver import FakeDriver
+
+
+def create_query_set():
+    return QuerySet({
+        "links": xh.get_element_by_tag("a", filter.attribute_contains("href", "http")),
+        "items": xh.get_element_by_tag("li").count(),
+        "form": xh.get_element_by_tag("form").exists(),
+        "title": xh.get_element_by_tag("h1").string(),
+        "classes": xh.get_element(filter.has_attribute("class")).get_attribute("class"),
+        "texts": xh.get_element_by_tag("li").get_text(),
+    })
+
+
+def test_evaluate_batch(html_doc):
+    driver = FakeDriver(html_doc)
+    queries = create_query_set()
+    assert evaluate_batch(driver, queries) == queries.evaluate(html_doc)
+    assert driver.round_trips == 1
+
+
+def test_round_trips(html_doc):
+    driver = FakeDriver(html_doc)
+    fields = [xh.get_element_by_tag("li", filter.get(index)) for index in range(1, 201)]
+    results = evaluate_batch(driver, fields, batch_size=80)
+    assert driver.round_trips == 3
+    assert results == [driver.find_elements("xpath", str(field)) for field in fields]
+    assert driver.round_trips == 3 + len(fields)
+    assert evaluate_batch(driver, {}) == {}
+
+
+def test_errors(html_doc):
+    driver = FakeDriver(html_doc)
+    with pytest.raises(DriverEvaluationError) as error:
+        evaluate_batch(driver, [xh.get_element_by_tag("a"), xh.get_element_by_xpath("//a[")])
+    assert error.value.expression == "//a["
+    with pytest.raises(ValueError):
+        driver.execute_script("return document.title")
+    with pytest.raises(LookupError):
+        driver.find_element("xpath", "//blink")
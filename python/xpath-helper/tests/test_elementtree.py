@@ -0,0 +1,126 @@
+from xml.etree import ElementTree
+import pytest
+from lxml import etree
+from xpath_helper import xh, filter
+from xpath_helper.elementtree import compile_elementtree
+from benchmarks.documents import DocumentShape, generate
+
+ELEMENT_PATH_QUERIES = [
+    xh.get_element_by_tag("li"),
+    xh.get_element_by_tag("span", filter.attribute_equals("class", "mfw")),
+    xh.get_element_by_tag("li", filter.get(2)),
+    xh.get_element_by_tag("span", filter.has_attribute("id").and_operator(filter.attribute_equals("title", "it's"))),
+    xh.get_child_by_tag("html").get_child_by_tag("body").get_child_by_tag("p", filter.get_last()),
+    xh.get_child_by_tag("html").get_child_by_tag("body").get_descendant_by_tag("a", filter.has_attribute("href")),
+    xh.get_child_by_tag("html"),
+]
+
+CLOSURE_QUERIES = [
+    xh.get_element_by_tag("ul").get_child_by_tag("li"),
+    xh.get_element_by_tag("a").get_parent(),
+    xh.get_element_by_tag("li").get_text(),
+    xh.get_element_by_tag("a").get_attribute("href"),
+    xh.get_element_by_svg_tag("g").get_child_by_svg_tag("path"),
+    xh.get_element_by_tag("h2").get_following_sibling_by_tag("p", filter.get_first()),
+    xh.get_element_by_tag("h2").get_preceding_sibling(filter.get(2)),
+    xh.get_element_by_tag("span", filter.attribute_equals("class", "mfw")).get_preceding_by_tag("h2"),
+    xh.get_element_by_tag("h2", filter.get_first()).get_following_by_tag("a", filter.value_contains("secure")),
+    xh.get_element_by_tag("li", filter.get(2)).get_ancestor(),
+    xh.get_element_by_tag("li").get_ancestor_or_self_by_tag("ul", filter.get_last()),
+    xh.get_element_by_tag("div").get_descendant_or_self(filter.attribute_in("class", ["tleft", "mfw", "item"])),
+    xh.get_element(filter.or_operator(filter.attribute_less_than("data-number", 10),
+                                      filter.not_operator(filter.attribute_not_equals("id", "e5")))),
+    xh.get_element(filter.attribute_greater_than_or_equal_to("width", 620).and_operator(filter.has_attribute("height"))),
+    xh.get_element(filter.value_in(["fast", "secure connection", "CSS3"])),
+    xh.get_element_by_tag("p", filter.value_equals("For real.").or_operator(filter.value_contains("It's"))),
+    xh.get_element(filter.attribute_contains("class", "colo").and_operator(filter.get_first())),
+    xh.get_element_by_tag("h1") | xh.get_element_by_tag("a", filter.attribute_contains("href", "http")),
+    (xh.get_element_by_tag("li") | xh.get_element_by_tag("p")).limit(5).get_child(),
+    xh.get_element_by_tag("p").get_text().limit(3),
+    xh.get_element().get_text(),
+    xh.get_element_by_tag("li").get_text() | xh.get_element_by_tag("a").get_text(),
+]
+
+AGGREGATES = [
+    xh.get_element_by_tag("li").count(),
+    xh.get_element_by_tag("form").exists(),
+    xh.get_element_by_tag("h1").string(),
+    xh.get_element_by_tag("li").get_text().string(),
+]
+
+
+@pytest.fixture(scope="module", params=["index", "synthetic"])
+def documents(request):
+    if request.param == "index":
+        with open('./tests/index.html', 'rb') as f:
+            content = f.read()
+    else:
+        content = generate(DocumentShape(1000, depth=8, fan_out=6, svg_probability=0.05))
+    return etree.fromstring(content), ElementTree.fromstring(content)
+
+
+def positions(nodes, root):
+    # Comments are nodes of lxml trees but not of ElementTree trees
+    order = {node: position for position, node in enumerate(node for node in root.iter() if isinstance(node.tag, str))}
+    return [node if isinstance(node, str) else order[node] for node in nodes]
+
+
+@pytest.mark.parametrize("query", ELEMENT_PATH_QUERIES, ids=str)
+def test_element_path(documents, query):
+    lxml_document, document = documents
+    compiled = compile_elementtree(query)
+    assert compiled.element_path is not None
+    assert positions(compiled.evaluate(document), document) == positions(query.evaluate(lxml_document), lxml_document)
+
+
+@pytest.mark.parametrize("query", CLOSURE_QUERIES, ids=str)
+def test_closure(documents, query):
+    lxml_document, document = documents
+    compiled = compile_elementtree(query)
+    assert compiled.element_path is None
+    assert positions(compiled.evaluate(document), document) == positions(query.evaluate(lxml_document), lxml_document)
+
+
+def test_aggregates(documents):
+    lxml_document, document = documents
+    for query in AGGREGATES:
+        assert compile_elementtree(query).evaluate(document) == query.evaluate(lxml_document)
+
+
+def test_text_order():
+    content = '<r><x id="1">a<y>b</y>c</x>d<y id="2">e<x>f</x>g</y>h<x>i</x>j</r>'
+    lxml_document, document = etree.fromstring(content), ElementTree.fromstring(content)
+    queries = [
+        xh.get_element().get_text(),
+        xh.get_element_by_tag("x").get_text() | xh.get_element_by_tag("y").get_text(),
+        xh.get_element_by_tag("y").get_text() | xh.get_element().get_attribute("id") | xh.get_element_by_tag("x").get_text(),
+    ]
+    for query in queries:
+        assert compile_elementtree(query).evaluate(document) == query.evaluate(lxml_document)
+
+
+def test_raw_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr("xpath_helper.elementtree.BUFFER_CHUNK_SIZE", 1000)
+    with open('./tests/index.html', 'rb') as f:
+        content = f.read()
+    path = tmp_path / "index.html"
+    path.write_bytes(content)
+    query = compile_elementtree(xh.get_element_by_tag("a").get_attribute("href"))
+    for document in [path, memoryview(content), bytearray(content)]:
+        assert query.evaluate(document) == query.evaluate(content)
+        assert compile_elementtree(AGGREGATES[2]).evaluate(document) == compile_elementtree(AGGREGATES[2]).evaluate(content)
+
+
+def test_element_path_expression():
+    assert compile_elementtree(ELEMENT_PATH_QUERIES[1]).element_path == ".//span[@class='mfw']"
+    assert compile_elementtree(ELEMENT_PATH_QUERIES[5]).element_path == "body//a[@href]"
+    with open('./tests/index.html', 'rb') as f:
+        content = f.read()
+    assert len(compile_elementtree(ELEMENT_PATH_QUERIES[0]).evaluate(content)) == 40
+
+
+def test_unsupported():
+    with pytest.raises(ValueError):
+        compile_elementtree(xh.get_element_by_xpath("//li[position() > 2]"))
+    with pytest.raises(ValueError):
+        compile_elementtree(xh.get_element_by_tag("svg:g"))
@@ -0,0 +1,167 @@
+import pytest
+from lxml import etree
+from xpath_helper import xh, filter, Budget, BudgetExceededError
+
+QUERIES = [
+    xh.get_element_by_tag("h1"),
+    xh.get_element(filter.attribute_equals("class", "st")),
+    xh.get_element_by_tag("a", filter.value_contains("secure connection")).get_parent(),
+    xh.get_element_by_tag("a", filter.value_contains("secure connection")).get_element_by_xpath("/.."),
+    xh.get_element_by_tag("p").get_descendant_or_self(filter.attribute_equals("class", "mfw")),
+    xh.get_element_by_tag("h1").get_descendant_or_self_by_tag("h1", filter.get_first()),
+    xh.get_element(filter.attribute_equals("class", "tleft")).get_child(filter.get_first()),
+    xh.get_element_by_tag("ul").get_child_by_tag("li", filter.get_last()),
+    xh.get_element_by_tag("ul").get_element_by_tag("li", filter.get_first()),
+    xh.get_element_by_svg_tag("g", filter.attribute_equals("id", "Layer1")).get_child_by_svg_tag("path"),
+    xh.get_element_by_tag("a", filter.attribute_contains("href", "wiki/HTTPS")).get_ancestor_by_tag("ul"),
+    xh.get_element_by_tag("a").get_ancestor(filter.value_contains("It's over a,")),
+    xh.get_element_by_tag("a").get_ancestor_or_self(filter.get(2)),
+    xh.get_element_by_tag("i", filter.value_equals("almost")).get_following_by_tag("a"),
+    xh.get_element_by_tag("li").get_following(filter.attribute_greater_than("data-number", 21)),
+    xh.get_element_by_tag("i").get_following_sibling_by_tag("a", filter.value_equals("ARPANET")),
+    xh.get_element_by_tag("li", filter.attribute_less_than("data-number", 21)).get_following_sibling(),
+    xh.get_element_by_tag("a", filter.value_equals("ARPANET")).get_preceding_by_tag("i"),
+    xh.get_element_by_tag("a").get_preceding(filter.get_first()),
+    xh.get_element_by_tag("li", filter.value_greater_than_or_equal_to(20)).get_preceding_sibling(),
+    xh.get_element_by_tag("li", filter.or_operator(
+        filter.and_operator(filter.value_contains("Uses"), filter.value_contains("awesome")),
+        filter.value_contains("nginx"),
+    )),
+    xh.get_element(filter.get_first()),
+    xh.get_child(filter.get(2).and_operator(filter.get_last())),
+    xh.get_child(filter.get_first()).get_parent().get_child(),
+]
+
+
+@pytest.mark.parametrize("query", QUERIES, ids=str)
+def test_budgeted_evaluation_matches_engine(html_doc, query):
+    expected = html_doc.xpath(str(query))
+    assert query.evaluate(html_doc) == expected
+    assert query.evaluate(html_doc, Budget(max_visited_nodes=10 ** 6, timeout=60)) == expected
+
+
+def test_parent_of_root(html_doc):
+    query = xh.get_child(filter.get_first()).get_parent()
+    # lxml counts the document node, but leaves it out of the selected nodes
+    assert query.evaluate(html_doc, Budget()) == html_doc.xpath(str(query)) == []
+    assert query.count().evaluate(html_doc, Budget()) == query.count().evaluate(html_doc) == 1
+    assert query.exists().evaluate(html_doc, Budget()) is True
+
+
+def test_evaluate_empty_query(html_doc):
+    assert xh.evaluate(html_doc, Budget()) == [html_doc]
+
+
+def test_max_visited_nodes(html_doc):
+    query = xh.get_descendant().get_following(filter.value_contains("motherfudger"))
+    with pytest.raises(BudgetExceededError) as error:
+        query.evaluate(html_doc, Budget(max_visited_nodes=1000))
+    assert error.value.limit == "max_visited_nodes"
+    assert error.value.statistics.visited_nodes == 1001
+
+
+def test_max_results(html_doc):
+    query = xh.get_element_by_tag("li")
+    assert len(query.evaluate(html_doc, Budget(max_results=100))) > 10
+    with pytest.raises(BudgetExceededError) as error:
+        query.evaluate(html_doc, Budget(max_results=10))
+    assert error.value.limit == "max_results"
+    assert error.value.statistics.selected_nodes == 11
+
+
+def test_timeout(html_doc):
+    query = xh.get_descendant().get_following(filter.value_contains("motherfudger"))
+    with pytest.raises(BudgetExceededError) as error:
+        query.evaluate(html_doc, Budget(timeout=0))
+    assert error.value.limit == "timeout"
+    assert error.value.statistics.elapsed >= 0
+
+
+def test_limit(html_doc):
+    query = xh.get_element_by_tag("li").limit(3)
+    assert str(query) == "(//li)[position() <= 3]"
+    assert query.evaluate(html_doc) == html_doc.xpath(str(query))
+    assert len(query.evaluate(html_doc)) == 3
+
+
+def test_first(html_doc):
+    query = xh.get_element_by_tag("ul").get_child_by_tag("li", filter.get_first()).first()
+    assert str(query) == "(//ul/li[1])[position() <= 1]"
+    assert query.evaluate(html_doc) == html_doc.xpath(str(query))
+
+
+def test_limit_followed_by_steps(html_doc):
+    query = xh.get_element_by_tag("a").limit(2).get_parent()
+    assert query.evaluate(html_doc) == html_doc.xpath(str(query))
+
+
+@pytest.mark.parametrize("query", QUERIES, ids=str)
+def test_limit_matches_engine(html_doc, query):
+    limited = query.limit(2)
+    assert limited.evaluate(html_doc) == html_doc.xpath(str(limited))
+
+
+def test_limit_stops_early(html_doc):
+    budget = Budget(max_visited_nodes=30)
+    assert len(xh.get_element_by_tag("p").first().evaluate(html_doc, budget)) == 1
+    with pytest.raises(BudgetExceededError):
+        xh.get_element_by_tag("p").evaluate(html_doc, budget)
+
+
+def test_document_order_of_deep_documents():
+    from lxml import etree
+    document = etree.fromstring("<!-- before --><r/>").getroottree()
+    document.getroot().addprevious(etree.Comment("top"))
+    node = document.getroot()
+    for index in range(300):
+        etree.SubElement(node, "a").text = str(index)
+        node = etree.SubElement(node, "d")
+    query = xh.get_element_by_tag("d").get_element_by_tag("a")
+    assert query.evaluate(document, Budget()) == document.xpath(str(query))
+    assert query.first().evaluate(document) == document.xpath(str(query))[:1]
+    assert (xh.get_element_by_tag("a") | xh.get_element_by_tag("d")).evaluate(document, Budget()) == \
+        document.xpath("//a | //d")
+
+
+def test_iterate_is_lazy(html_doc):
+    nodes = xh.get_element_by_tag("h2").get_following_by_tag("a").iterate(html_doc, Budget(max_visited_nodes=100))
+    assert next(nodes).tag == "a"
+
+
+def test_union(html_doc):
+    union = QUERIES[0]
+    for query in QUERIES[1:]:
+        union = union | query
+    expected = html_doc.xpath(str(union))
+    assert union.evaluate(html_doc) == expected
+    assert union.evaluate(html_doc, Budget()) == expected
+    assert union.limit(5).evaluate(html_doc) == expected[:5]
+
+
+def test_union_of_projections(html_doc):
+    union = xh.get_element_by_tag("h1").get_text() | xh.get_element_by_tag("a").get_attribute("href")
+    assert sorted(union.evaluate(html_doc, Budget())) == sorted(union.evaluate(html_doc))
+
+
+def test_repeated_text_values(html_doc):
+    document = etree.fromstring("<ul><li>same</li><li>same</li><li>x</li><li>x</li></ul>")
+    texts = xh.get_element_by_tag("li").get_text()
+    assert texts.evaluate(document, Budget()) == ["same", "same", "x", "x"]
+    assert texts.count().evaluate(document, Budget()) == 4
+    everything = xh.get_element_by_xpath("/descendant-or-self::*/text()")
+    assert everything.evaluate(document, Budget()) == document.xpath(str(everything))
+    assert texts.evaluate(html_doc, Budget()) == html_doc.xpath(str(texts))
+    assert texts.count().evaluate(html_doc, Budget()) == texts.count().evaluate(html_doc)
+
+
+def test_union_of_nodes_and_projections(html_doc):
+    document = etree.fromstring('<r><x id="1">a<y>b</y>c</x><y id="2">d</y>e</r>')
+    queries = [
+        xh.get_element_by_tag("y") | xh.get_element_by_tag("x").get_text(),
+        xh.get_element_by_tag("x") | xh.get_element_by_tag("r").get_text() | xh.get_element().get_attribute("id"),
+        (xh.get_element_by_tag("y") | xh.get_element_by_tag("x").get_text()).limit(3),
+    ]
+    for query in queries:
+        assert query.evaluate(document, Budget()) == document.xpath(str(query))
+    links = xh.get_element_by_tag("a") | xh.get_element_by_tag("li").get_text()
+    assert links.evaluate(html_doc, Budget()) == html_doc.xpath(str(links))
@@ -1,4 +1,8 @@
-from xpath_helper import xh, filter
+import random
+import pytest
+from lxml import etree
+from xpath_helper import xh, filter, Budget
+from xpath_helper.filter import replace_apostrophes
 
 def test_and_operator(html_doc):
     h1_path = xh.get_element_by_tag("h1", filter.and_operator(
@@ -165,3 +169,123 @@ def test_not(html_doc):
     elements = html_doc.xpath(str(p_path))
     assert len(elements) != 0
     assert "For real" not in elements[0].text
+
+
+def test_attribute_in(html_doc):
+    a_path = xh.get_element_by_tag("a", filter.attribute_in("href", ["https://google.com/", "http://motherfudgingwebsite.com/"]))
+    elements = html_doc.xpath(str(a_path))
+    assert [element.text for element in elements] == ["Google home page", "guy before him", None]
+    assert a_path.evaluate(html_doc, Budget()) == elements
+
+
+def test_attribute_in_large_set(html_doc):
+    values = ["value-" + str(index) for index in range(20000)] + ["Layer1"]
+    g_path = xh.get_element_by_svg_tag("g", filter.attribute_in("id", values))
+    assert len(str(g_path)) < 300000
+    elements = html_doc.xpath(str(g_path))
+    assert len(elements) == 1
+    assert g_path.evaluate(html_doc, Budget()) == elements
+
+
+def test_attribute_in_delimiters(html_doc):
+    values = ["|", ",", ";", "~", "^", "#", "\t", "It's", "Layer1"]
+    g_path = xh.get_element_by_svg_tag("g", filter.attribute_in("id", values))
+    assert len(html_doc.xpath(str(g_path))) == 1
+    assert len(html_doc.xpath(str(xh.get_element(filter.attribute_in("id", []))))) == 0
+
+
+def test_membership_of_value_with_delimiter():
+    document = etree.fromstring('<p><a id="x|y">x|y</a><a id="x">y</a><a id="|x|">x</a></p>')
+    a_path = xh.get_element_by_tag("a", filter.attribute_in("id", ["x", "y"]))
+    assert [element.get("id") for element in document.xpath(str(a_path))] == ["x"]
+    assert a_path.evaluate(document, Budget()) == document.xpath(str(a_path))
+    a_path = xh.get_element_by_tag("a", filter.value_in(["x", "y"]))
+    assert [element.text for element in document.xpath(str(a_path))] == ["y", "x"]
+    assert a_path.evaluate(document, Budget()) == document.xpath(str(a_path))
+
+
+def test_value_in(html_doc):
+    a_path = xh.get_element_by_tag("a", filter.value_in(["ARPANET", "IPoAC", "nothing"]))
+    elements = html_doc.xpath(str(a_path))
+    assert [element.text for element in elements] == ["ARPANET", "IPoAC"]
+    assert a_path.evaluate(html_doc, Budget()) == elements
+
+
+def test_membership_in_operators(html_doc):
+    a_path = xh.get_element_by_tag("a", filter.or_operator(
+        filter.value_in(["ARPANET", "IPoAC"]).and_operator(filter.attribute_contains("href", "wikipedia")),
+        filter.not_operator(filter.attribute_in("href", ["https://google.com/"])).and_operator(filter.value_equals("guy")),
+    ))
+    elements = html_doc.xpath(str(a_path))
+    assert [element.text for element in elements] == ["ARPANET", "IPoAC", "guy"]
+    assert a_path.evaluate(html_doc, Budget()) == elements
+
+
+def test_operator_with_repeated_filter(html_doc):
+    a_filter = filter.value_contains("ARPANET")
+    assert str(filter.and_operator(a_filter, a_filter)) == \
+        "(text()[contains(., 'ARPANET')] and text()[contains(., 'ARPANET')])"
+    assert str(filter.or_operator(a_filter, filter.value_contains("ARPANET"))) == \
+        "(text()[contains(., 'ARPANET')] or text()[contains(., 'ARPANET')])"
+    elements = html_doc.xpath(str(xh.get_element_by_tag("a", filter.and_operator(a_filter, a_filter))))
+    assert len(elements) == 1
+
+
+def test_equality():
+    assert filter.has_attribute("href") == filter.has_attribute("href")
+    assert filter.has_attribute("href") != filter.has_attribute("src")
+    assert len({filter.value_equals("a"), filter.value_equals("a"), filter}) == 2
+
+
+def test_canonical():
+    first = filter.attribute_equals("class", "foo")
+    second = filter.value_contains("bar")
+    third = filter.has_attribute("href")
+    assert first.and_operator(second).canonical() == filter.and_operator(second, first).canonical()
+    assert filter.and_operator(filter.and_operator(first, second), third, first).fingerprint() == \
+        filter.and_operator(third, second, first).fingerprint()
+    assert filter.or_operator(first, second.and_operator(third)).canonical() == \
+        filter.or_operator(filter.and_operator(third, second), first).canonical()
+    assert first.and_operator(second).canonical() != first.or_operator(second).canonical()
+    assert filter.get_first().canonical() == "1"
+    assert filter.and_operator(filter.get_first(), filter.get_first()).canonical() == "boolean(1)"
+
+
+def test_minify(html_doc):
+    first = filter.attribute_equals("class", "foo")
+    second = filter.value_contains("it's, or")
+    third = filter.has_attribute("href")
+    assert filter.and_operator(filter.or_operator(first, second), third, third).minify() == \
+        "(@class='foo' or text()[contains(.,\"it's, or\")]) and @href"
+    assert filter.or_operator(first.and_operator(third), filter.not_operator(second)).minify() == \
+        "@class='foo' and @href or not(text()[contains(.,\"it's, or\")])"
+    assert filter.get_first().minify() == "1"
+    assert filter.and_operator(filter.get_first(), filter.get_first()).minify() == "boolean(1)"
+
+
+def test_shared_predicates():
+    assert filter.value_contains("guy").sb[0] is filter.value_contains("guy").sb[0]
+    assert filter.get_first().sb[0] is not filter.value_equals(1).sb[0]
+    assert filter.attribute_in("id", ["a", "b"]).sb[0] is filter.attribute_in("id", ["b", "a"]).sb[0]
+
+
+@pytest.mark.parametrize("literal, expression", [
+    ("foo", "'foo'"),
+    ("It's", "\"It's\""),
+    ("say \"hi\"", "'say \"hi\"'"),
+    ("It's \"over\"", "concat(\"It's \", '\"over\"')"),
+    ("'\"'", "concat(\"'\", '\"', \"'\")"),
+    (42, "42"),
+])
+def test_replace_apostrophes(literal, expression):
+    assert replace_apostrophes(literal) == expression
+
+
+def test_replace_apostrophes_round_trip():
+    generator = random.Random(0)
+    alphabet = "'\"ab é,()"
+    context = etree.fromstring("<a/>")
+    for _ in range(2000):
+        literal = "".join(generator.choice(alphabet) for _ in range(generator.randint(0, 12)))
+        expression = replace_apostrophes(literal)
+        assert context.xpath("string(" + expression + ")") == literal
@@ -0,0 +1,52 @@
+import re
+import subprocess
+import sys
+import pytest
+
+"""
+Maximum cumulative import time of the package, in microseconds, as reported by python -X importtime.
+"""
+IMPORT_TIME_BUDGET = 50000
+
+# Before Python 3.7, modules have no __getattr__ and the package loads all its names eagerly
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="lazy imports need module __getattr__")
+
+
+def run(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def test_import_time():
+    import_times = []
+    for _ in range(3):
+        report = run("import xpath_helper").stderr
+        import_times.append(int(re.search(r"^import time:\s+\d+ \|\s+(\d+) \| xpath_helper$", report, re.M).group(1)))
+    assert min(import_times) < IMPORT_TIME_BUDGET
+
+
+def test_lazy_modules():
+    modules = run("import sys, xpath_helper; print(' '.join(sys.modules))").stdout.split()
+    assert "xpath_helper.filter" in modules
+    assert "xpath_helper.evaluation" not in modules
+    assert "lxml" not in modules
+    modules = run("import sys; from xpath_helper import xh, filter; xh.get_element_by_tag('a', filter.get_first()); "
+                  "print(' '.join(sys.modules))").stdout.split()
+    assert "xpath_helper.xpath_helper" in modules
+    assert "xpath_helper.evaluation" not in modules
+    assert "xpath_helper.aggregate" not in modules
+    assert "xpath_helper.css" not in modules
+    assert "lxml" not in modules
+    modules = run("import sys; from xpath_helper import xh; xh.get_element_by_tag('a').count().evaluate(b'<a/>'); "
+                  "print(' '.join(sys.modules))").stdout.split()
+    assert "xpath_helper.evaluation" in modules
+    assert "xpath_helper.document" in modules
+
+
+def test_lazy_names():
+    import xpath_helper
+    from xpath_helper import xh, XPathHelper, Budget, QuerySet
+    assert type(xh) is XPathHelper
+    assert xpath_helper.xh is xh
+    assert type(xpath_helper.filter) is xpath_helper.EmptyFilter
+    assert "QuerySet" in dir(xpath_helper)
@@ -0,0 +1,74 @@
+import copy
+from lxml import etree
+from xpath_helper import xh, filter, QuerySet
+
+
+def create_query_set():
+    return QuerySet({
+        "title": xh.get_element_by_tag("h1").get_text(),
+        "items": xh.get_element_by_tag("ul").get_child_by_tag("li", filter.value_contains("nginx")),
+        "item_count": xh.get_element_by_tag("li").count(),
+        "links": xh.get_element_by_tag("a", filter.has_attribute("href")).get_attribute("href"),
+        "any": xh.get_element(filter.attribute_equals("class", "new")),
+        "svg_paths": xh.get_element_by_svg_tag("path").count(),
+    })
+
+
+def test_query_set(html_doc):
+    queries = create_query_set()
+    assert list(queries) == ["title", "items", "item_count", "links", "any", "svg_paths"]
+    results = queries.evaluate(html_doc)
+    assert results["item_count"] == len(html_doc.xpath("//li"))
+    assert results["title"] == ["The ", " motherfudging website"]
+
+
+def test_refresh_affected_queries(html_doc):
+    document = copy.deepcopy(html_doc)
+    queries = create_query_set()
+    evaluation = queries.incremental(document)
+    ul = document.xpath("//ul")[0]
+    with evaluation.editing(ul) as refreshed:
+        etree.SubElement(ul, "li").text = "Served by nginx"
+    assert refreshed == ["items", "item_count", "links", "any"]
+    assert evaluation.results == queries.evaluate(document)
+
+
+def test_refresh_removed_nodes(html_doc):
+    document = copy.deepcopy(html_doc)
+    queries = create_query_set()
+    evaluation = queries.incremental(document)
+    parent = document.xpath("//a[@href]")[0].getparent()
+    with evaluation.editing(parent) as refreshed:
+        for link in parent.findall("a"):
+            parent.remove(link)
+    assert "links" in refreshed
+    assert evaluation.results == queries.evaluate(document)
+
+
+def test_unaffected_queries(html_doc):
+    document = copy.deepcopy(html_doc)
+    queries = create_query_set()
+    evaluation = queries.incremental(document)
+    h1 = document.xpath("//h1")[0]
+    assert evaluation.affected([h1]) == ["title", "any"]
+    # The svg element is inside an li element, whose text children include its tail
+    assert evaluation.refresh([document.xpath("//*[local-name() = 'svg']")[0]]) == ["items", "item_count", "any", "svg_paths"]
+    queries.add("paragraphs", xh.get_element_by_tag("p").count())
+    assert evaluation.refresh([h1]) == ["title", "any", "paragraphs"]
+    assert evaluation.results == queries.evaluate(document)
+
+
+def test_refresh_tail_edits():
+    document = etree.fromstring("<html><body><div><span>item</span>before</div><p>other</p></body></html>")
+    queries = QuerySet({
+        "changed": xh.get_element_by_tag("div", filter.value_equals("changed")),
+        "texts": xh.get_element_by_tag("div").get_text(),
+        "paragraphs": xh.get_element_by_tag("p").count(),
+    })
+    evaluation = queries.incremental(document)
+    span = document.xpath("//span")[0]
+    with evaluation.editing(span) as refreshed:
+        span.tail = "changed"
+    assert refreshed == ["changed", "texts"]
+    assert evaluation.results == queries.evaluate(document)
+    assert evaluation.results["texts"] == ["changed"]
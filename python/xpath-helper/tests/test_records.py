@@ -0,0 +1,43 @@
+import io
+import json
+import pickle
+from xpath_helper import xh, filter, QuerySet
+from xpath_helper.document import documents
+from xpath_helper.records import NodeRecord, write_jsonl
+
+
+def test_evaluate_records(html_doc):
+    query = xh.get_element_by_tag("span", filter.attribute_equals("class", "mfw"))
+    records = query.evaluate_records(html_doc)
+    elements = query.evaluate(html_doc)
+    assert len(records) == len(elements)
+    for record, element in zip(records, elements):
+        assert record.tag == "span"
+        assert dict(record.attributes) == dict(element.attrib)
+        assert record.text == "".join(element.itertext())
+        assert record.line == element.sourceline
+        assert html_doc.xpath(record.path) == [element]
+    assert query.evaluate_records(html_doc, attributes=["id", "class"])[0].attributes == (("class", "mfw"),)
+    texts = xh.get_element_by_tag("h1").get_text().evaluate_records(html_doc)
+    assert texts == xh.get_element_by_tag("h1").get_text().evaluate(html_doc)
+    assert all(type(text) is str for text in texts)
+
+
+def test_serialization(html_doc):
+    records = xh.get_element_by_tag("li").get_child().evaluate_records(html_doc, attributes=["class"])
+    assert pickle.loads(pickle.dumps(records)) == records
+    file = io.StringIO()
+    assert write_jsonl([{"children": records, "count": len(records)}], file) == 1
+    line = json.loads(file.getvalue())
+    assert [NodeRecord.from_dict(fields) for fields in line["children"]] == records
+    assert line["count"] == len(records)
+
+
+def test_tree_not_cached():
+    with open('./tests/index.html', 'rb') as f:
+        content = f.read().replace(b"<h1>", b"<h1>Records: ")
+    queries = QuerySet({"title": xh.get_element_by_tag("h1"), "items": xh.get_element_by_tag("li").count()})
+    results = queries.evaluate_records(content)
+    assert results["title"][0].text.startswith("Records: ")
+    assert results["items"] == 40
+    assert content not in documents
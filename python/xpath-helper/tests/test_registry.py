@@ -0,0 +1,46 @@
+from xpath_helper import xh, filter, Budget
+from xpath_helper.catalog import CatalogQuery
+from xpath_helper.registry import QueryRegistry
+
+
+def create_registry(built):
+    registry = QueryRegistry()
+
+    @registry.declare("title")
+    def title():
+        built.append("title")
+        return xh.get_element_by_tag("h1")
+
+    registry.declare("items", lambda: built.append("items") or xh.get_element_by_tag("li").count())
+    registry.add("links", xh.get_element_by_tag("a", filter.has_attribute("href")))
+    return registry
+
+
+def test_build_on_first_use(html_doc):
+    built = []
+    registry = create_registry(built)
+    assert list(registry) == ["title", "items", "links"]
+    assert built == []
+    assert not registry.is_built("title")
+    assert registry["title"].evaluate(html_doc) == html_doc.xpath("//h1")
+    assert type(registry["title"]) is CatalogQuery
+    registry["title"]
+    assert built == ["title"]
+    assert registry.evaluate(html_doc) == {
+        "title": html_doc.xpath("//h1"),
+        "items": len(html_doc.xpath("//li")),
+        "links": html_doc.xpath("//a[@href]"),
+    }
+    assert registry.evaluate(html_doc, Budget()) == registry.evaluate(html_doc)
+    assert built == ["title", "items"]
+
+
+def test_warm_up():
+    built = []
+    registry = create_registry(built)
+    assert registry.warm_up(["items"]) == 1
+    assert built == ["items"]
+    assert registry.warm_up() == 1
+    assert registry.warm_up() == 0
+    assert built == ["items", "title"]
+    assert registry["title"]._CatalogQuery__compiled is not None
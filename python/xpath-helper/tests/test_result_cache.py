@@ -0,0 +1,76 @@
+import pytest
+from xpath_helper import xh, filter, ResultCache
+from xpath_helper.document import documents
+
+QUERY = xh.get_element_by_tag("a", filter.value_contains("guy"))
+
+
+def read_document():
+    with open('./tests/index.html', 'rb') as f:
+        return f.read()
+
+
+def test_hit(html_doc):
+    cache = ResultCache()
+    expected = QUERY.evaluate(html_doc)
+    assert cache.evaluate(QUERY, html_doc, key="index") == expected
+    assert cache.evaluate(xh.get_element_by_tag("a", filter.value_contains("guy")), html_doc, key="index") == expected
+    assert cache.evaluate(QUERY.get_attribute("href"), html_doc, key="index") == \
+        cache.evaluate(QUERY.get_attribute("href"), html_doc, key="index")
+    assert cache.evaluate(QUERY.count(), html_doc, key="index") == cache.evaluate(QUERY.count(), html_doc, key="index")
+    assert cache.statistics.hits == 3
+    assert cache.statistics.misses == 3
+    assert cache.statistics.hit_rate == 0.5
+
+
+def test_stores_no_element(html_doc):
+    cache = ResultCache()
+    cache.evaluate(QUERY, html_doc, key="index")
+    cache.evaluate(QUERY.get_text(), html_doc, key="index")
+    assert "_Element" not in repr(cache._ResultCache__entries)
+    assert all(type(value) is str for value in cache._ResultCache__entries.popitem()[1][1])
+
+
+def test_raw_document():
+    cache = ResultCache()
+    content = read_document()
+    first = cache.evaluate(QUERY, content)
+    documents.clear()
+    second = cache.evaluate(QUERY, content)
+    assert cache.statistics.hits == 1
+    assert [node.get("href") for node in first] == [node.get("href") for node in second]
+    assert second[0].getroottree() is not first[0].getroottree()
+
+
+def test_version_and_invalidate(html_doc):
+    cache = ResultCache()
+    cache.evaluate(QUERY, html_doc, key="index", version=1)
+    cache.evaluate(QUERY, html_doc, key="index", version=2)
+    cache.evaluate(QUERY, html_doc, key="other")
+    assert cache.statistics.misses == 3
+    cache.invalidate(html_doc, key="index")
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_eviction(html_doc):
+    cache = ResultCache(max_entries=2)
+    for tag in ["a", "h1", "a", "li"]:
+        cache.evaluate(xh.get_element_by_tag(tag), html_doc, key="index")
+    assert len(cache) == 2
+    assert cache.statistics.evictions == 1
+    cache.evaluate(xh.get_element_by_tag("a"), html_doc, key="index")
+    assert cache.statistics.hits == 2
+
+
+def test_ttl(html_doc):
+    cache = ResultCache(ttl=0)
+    cache.evaluate(QUERY, html_doc, key="index")
+    cache.evaluate(QUERY, html_doc, key="index")
+    assert cache.statistics.hits == 0
+
+
+def test_tree_requires_key(html_doc):
+    with pytest.raises(ValueError):
+        ResultCache().evaluate(QUERY, html_doc)
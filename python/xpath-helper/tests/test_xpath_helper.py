@@ -1,5 +1,7 @@
+import pickle
+import pytest
 from xpath_helper import __version__
-from xpath_helper import xh, filter
+from xpath_helper import xh, filter, XPathHelper
 
 def test_version():
     assert __version__ == '0.1.2'
@@ -300,4 +302,83 @@ def test_get_preceding_sibling_by_svg_tag(html_doc):
       .and_operator(filter.attribute_greater_than_or_equal_to("width", 620))
      )
     elements = html_doc.xpath(str(rect_path))
-    assert len(elements) != 0
\ No newline at end of file
+    assert len(elements) != 0
+
+
+def test_union(html_doc):
+    links = xh.get_element_by_tag("a")
+    titles = xh.get_element_by_tag("h1") | xh.get_element_by_tag("h2")
+    union = links | titles | links
+    assert str(union) == "(//a | //h1 | //h2)"
+    elements = html_doc.xpath(str(union))
+    assert len(elements) == len(html_doc.xpath("//a")) + len(html_doc.xpath("//h1")) + len(html_doc.xpath("//h2"))
+    parents = union.get_parent()
+    assert str(parents) == "(//a | //h1 | //h2)/.."
+    assert len(html_doc.xpath(str(parents))) != 0
+
+
+def test_equality():
+    assert xh.get_element_by_tag("a") == xh.get_descendant_by_tag("a")
+    assert xh.get_element_by_tag("a") != xh.get_child_by_tag("a")
+    cache = {xh.get_element_by_tag("a", filter.has_attribute("href")): "links"}
+    assert cache[xh.get_element_by_tag("a", filter.has_attribute("href"))] == "links"
+
+
+def test_fingerprint(html_doc):
+    first = xh.get_element_by_tag("a", filter.has_attribute("href").and_operator(filter.value_contains("guy")))
+    second = xh.get_element_by_tag("a", filter.and_operator(filter.value_contains("guy"), filter.has_attribute("href")))
+    assert first != second
+    assert first.fingerprint() == second.fingerprint()
+    assert html_doc.xpath(first.canonical()) == html_doc.xpath(str(first))
+    assert (first | xh.get_element_by_tag("h1")).fingerprint() == (xh.get_element_by_tag("h1") | second).fingerprint()
+    assert first.fingerprint() != first.get_parent().fingerprint()
+    assert xh.get_element_by_tag("h1").fingerprint() == "9e100a4ed5539535e93ec5ee4a63d9c7"
+
+
+def test_shared_steps():
+    first = xh.get_element_by_tag("a", filter.attribute_equals("class", "st")).get_parent()
+    second = xh.get_element_by_tag("a", filter.attribute_equals("class", "st")).get_parent()
+    assert all(step is other_step for step, other_step in zip(first.sb, second.sb))
+    assert pickle.loads(pickle.dumps(first)).sb[1] is first.sb[1]
+    assert not hasattr(first, "__dict__")
+    assert not hasattr(filter, "__dict__")
+
+
+def test_builder(html_doc):
+    builder = XPathHelper.builder()
+    assert builder.get_element_by_tag("ul") is builder
+    for index in range(1, 4):
+        builder.get_child_by_tag("li", filter.get(index)).get_parent()
+    chained = xh.get_element_by_tag("ul")
+    for index in range(1, 4):
+        chained = chained.get_child_by_tag("li", filter.get(index)).get_parent()
+    query = builder.freeze()
+    assert type(query) is XPathHelper
+    assert str(query) == str(chained)
+    assert query.evaluate(html_doc) == chained.evaluate(html_doc)
+
+    builder.first().get_text()
+    assert str(query) == str(chained)
+    assert str(builder) == str(chained.first().get_text())
+    assert builder.count().evaluate(html_doc) == chained.first().get_text().count().evaluate(html_doc)
+    with pytest.raises(TypeError):
+        hash(builder)
+
+
+def test_minify(html_doc):
+    queries = [
+        xh.get_element_by_tag("a", filter.attribute_contains("class", "st").and_operator(
+            filter.or_operator(filter.value_contains("guy"), filter.has_attribute("href")))),
+        xh.get_descendant_or_self_by_tag("li", filter.get(2)),
+        xh.get_element_by_tag("ul").get_descendant_or_self(filter.not_operator(filter.has_attribute("id"))),
+        xh.get_element_by_svg_tag("svg").get_child_by_svg_tag("rect", filter.attribute_less_than("width", 640)),
+        xh.get_element_by_tag("h2").get_following_sibling_by_tag("p", filter.get_last()).get_text(),
+        (xh.get_element_by_tag("h1") | xh.get_element_by_tag("h2")).limit(2).get_parent(),
+        xh.get_element_by_xpath("//ul [ @class = 'list' ] / li"),
+    ]
+    for query in queries:
+        assert len(query.minify()) <= len(str(query))
+        assert html_doc.xpath(query.minify()) == html_doc.xpath(str(query))
+        assert html_doc.xpath(query.count().minify()) == html_doc.xpath(str(query.count()))
+    assert queries[1].minify() == "/descendant-or-self::li[2]"
+    assert (xh.get_element_by_tag("a") | xh.get_element_by_tag("h1")).first().minify() == "(//a|//h1)[1]"
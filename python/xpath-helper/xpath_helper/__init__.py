@@ -1,8 +1,44 @@
 __version__ = '0.1.2'
-__all__ = ['xh', 'filter', 'XPathHelper', 'EmptyFilter']
+__all__ = ['xh', 'filter', 'XPathHelper', 'QueryBuilder', 'EmptyFilter', 'Budget', 'BudgetExceededError', 'DocumentCache', 'ResultCache', 'QuerySet']
 
+import importlib
+import sys
+
+# The filter module must be imported before the filter singleton is bound,
+# as importing a submodule sets the package attribute of the same name
 from xpath_helper.filter import EmptyFilter
-from xpath_helper.xpath_helper import XPathHelper
 filter = EmptyFilter()
-xh = XPathHelper()
 
+"""
+Modules of the names loaded on first use, so that importing the package doesn't load
+the builder, the evaluation and the caches.
+"""
+_LAZY_NAMES = {
+    'xh': 'xpath_helper.xpath_helper',
+    'XPathHelper': 'xpath_helper.xpath_helper',
+    'QueryBuilder': 'xpath_helper.xpath_helper',
+    'Budget': 'xpath_helper.evaluation',
+    'BudgetExceededError': 'xpath_helper.evaluation',
+    'DocumentCache': 'xpath_helper.document',
+    'ResultCache': 'xpath_helper.result_cache',
+    'QuerySet': 'xpath_helper.query_set',
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module 'xpath_helper' has no attribute '" + name + "'")
+    module = importlib.import_module(_LAZY_NAMES[name])
+    value = module.XPathHelper() if name == 'xh' else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is only supported from Python 3.7
+    for _name in _LAZY_NAMES:
+        __getattr__(_name)
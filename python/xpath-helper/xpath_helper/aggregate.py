@@ -0,0 +1,111 @@
+from typing import List, Optional, Union
+from xpath_helper.evaluation import Budget, evaluate_function
+from xpath_helper.fingerprint import fingerprint
+from xpath_helper.step import canonical_path, minify_path
+
+"""
+Aggregate provides the queries computing a single value out of the nodes selected by an XPathHelper query:
+their number, their existence or the string value of the first one.
+"""
+
+
+class Aggregate:
+    __slots__ = ('function', 'path')
+
+    def __init__(self, function: str, path: List[str]):
+        """Creates an instance of Aggregate.
+
+        Args:
+            function (str): XPath function applied to the selected nodes, "count", "boolean" or "string"
+            path (list[str]): path of the query selecting the nodes
+        """
+        self.function = function
+        self.path = path
+
+    def __str__(self) -> str:
+        """Returns the corresponding Xpath query.
+
+        Returns:
+            str: the string of the corresponding XPath query
+        """
+        return self.function + "(" + "".join(self.path) + ")"
+
+    def __eq__(self, other: object) -> bool:
+        """Returns true if <code>other</code> is an aggregate with the same XPath expression.
+
+        Args:
+            other (object): object to compare with
+
+        Returns:
+            bool: true if both aggregates have the same expression
+        """
+        if not isinstance(other, Aggregate):
+            return NotImplemented
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        """Returns the hash of the XPath expression of the aggregate.
+
+        Returns:
+            int: hash of the aggregate
+        """
+        return hash(str(self))
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the aggregate.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        return self.function + "(" + canonical_path(self.path) + ")"
+
+    def minify(self) -> str:
+        """Returns the shortest equivalent XPath expression of the aggregate.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        return self.function + "(" + minify_path(self.path) + ")"
+
+    def fingerprint(self) -> str:
+        """Returns the fingerprint of the canonical XPath expression of the aggregate.
+
+        Returns:
+            str: fingerprint of the aggregate
+        """
+        return fingerprint(self.canonical())
+
+    def evaluate(self, context, budget: Optional[Budget] = None) -> Union[int, bool, str]:
+        """Evaluates the aggregate against <code>context</code>, without returning any node.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document parsed
+                through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            int | bool | str: the number of selected nodes for count, their existence for boolean,
+            the string value of the first one for string
+        """
+        return evaluate_function(self.function, self.path, context, budget)
+
+    async def aevaluate(self, context, budget: Optional[Budget] = None, executor=None) -> Union[int, bool, str]:
+        """Evaluates the aggregate against <code>context</code> in an executor, without blocking the event loop.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document parsed
+                through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+            executor (concurrent.futures.Executor): executor evaluating the aggregate, the default executor of the event loop if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            int | bool | str: the value of the aggregate
+        """
+        from xpath_helper.concurrency import run_in_executor
+        return await run_in_executor(self.evaluate, context, budget, executor=executor)
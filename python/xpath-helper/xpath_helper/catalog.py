@@ -0,0 +1,193 @@
+import json
+from typing import Optional, Union
+
+from xpath_helper.aggregate import Aggregate
+from xpath_helper.document import resolve_document
+from xpath_helper.evaluation import Budget, COUNT, evaluate, evaluate_function, _is_projection
+from xpath_helper.query_set import QuerySet
+from xpath_helper.step import canonical_path
+from xpath_helper.xpath_helper import XPathHelper
+
+"""
+Persistent catalogs of queries.
+A catalog file holds, for each query of a QuerySet, its XPath expression, its canonical form and its fingerprint.
+Loading it builds no query: each query is read as its expressions, compiled by lxml on its first evaluation.
+"""
+
+"""
+Version of the layout of the catalog files.
+"""
+CATALOG_FORMAT = 1
+
+
+class CatalogVersionError(ValueError):
+    """
+    Raised when a catalog file was written by another version of the library, or in another layout.
+    """
+
+    def __init__(self, path: str, version: Optional[str], catalog_format: Optional[int]):
+        """Creates an instance of CatalogVersionError.
+
+        Args:
+            path (str): path of the catalog file
+            version (str): version of the library which wrote the file
+            catalog_format (int): layout of the file
+        """
+        from xpath_helper import __version__
+        super().__init__("The catalog " + str(path) + " was written by xpath-helper " + str(version) +
+                         " in format " + str(catalog_format) + ", expected " + __version__ +
+                         " in format " + str(CATALOG_FORMAT) + ": it must be saved again")
+        self.version = version
+        self.catalog_format = catalog_format
+
+
+class CatalogQuery:
+    """
+    Query loaded from a catalog file, evaluated from its canonical XPath expression.
+    """
+    __slots__ = ('expression', 'canonical_expression', 'function', 'projection', 'query_fingerprint', '__compiled')
+
+    def __init__(self, expression: str, canonical_expression: str, query_fingerprint: str,
+                 function: Optional[str] = None, projection: bool = False):
+        """Creates an instance of CatalogQuery.
+
+        Args:
+            expression (str): XPath expression of the path of the query
+            canonical_expression (str): canonical XPath expression of the path of the query
+            query_fingerprint (str): fingerprint of the query
+            function (str): XPath function applied to the selected nodes, "count", "boolean" or "string",
+                None if the query isn't an aggregate
+            projection (bool): true if the query selects strings rather than nodes
+        """
+        self.expression = expression
+        self.canonical_expression = canonical_expression
+        self.query_fingerprint = query_fingerprint
+        self.function = function
+        self.projection = projection
+        self.__compiled = None
+
+    def __str__(self) -> str:
+        """Returns the corresponding Xpath query.
+
+        Returns:
+            str: the string of the corresponding XPath query
+        """
+        if self.function is None:
+            return self.expression
+        return self.function + "(" + self.expression + ")"
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the query.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        if self.function is None:
+            return self.canonical_expression
+        return self.function + "(" + self.canonical_expression + ")"
+
+    def fingerprint(self) -> str:
+        """Returns the fingerprint of the query, as saved in the catalog.
+
+        Returns:
+            str: fingerprint of the query
+        """
+        return self.query_fingerprint
+
+    def evaluate(self, context, budget: Optional[Budget] = None):
+        """Evaluates the query against <code>context</code>, compiling it on its first evaluation.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+                parsed through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            list | int | bool | str: the selected nodes, or the value of the aggregate
+        """
+        if budget is not None:
+            if self.function is None:
+                return evaluate([self.canonical_expression], context, budget)
+            return evaluate_function(self.function, [self.canonical_expression], context, budget)
+
+        value = self.compile()(resolve_document(context))
+        return int(value) if self.function == COUNT else value
+
+    def compile(self):
+        """Compiles the query, unless it is already compiled.
+
+        Returns:
+            lxml.etree.XPath: the compiled query
+        """
+        if self.__compiled is None:
+            from lxml import etree
+            self.__compiled = etree.XPath(self.canonical() or ".",
+                                          smart_strings=self.function is None and not self.projection)
+        return self.__compiled
+
+
+def compile_query(query: Union[XPathHelper, Aggregate]) -> CatalogQuery:
+    """Returns the query evaluated from the compiled canonical expression of <code>query</code>.
+
+    Args:
+        query (XPathHelper | Aggregate): query
+
+    Returns:
+        CatalogQuery: the compiled query
+    """
+    compiled_query = CatalogQuery(*_entry("", query)[1:])
+    compiled_query.compile()
+    return compiled_query
+
+
+def save_catalog(queries: QuerySet, path: str):
+    """Saves the queries of <code>queries</code> into the catalog file <code>path</code>.
+
+    Args:
+        queries (QuerySet): queries to save
+        path (str): path of the catalog file
+    """
+    from xpath_helper import __version__
+    entries = []
+    for name, query in queries.items():
+        entries.append(_entry(name, query))
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"version": __version__, "format": CATALOG_FORMAT, "queries": entries}, file,
+                  separators=(",", ":"), ensure_ascii=False)
+
+
+def load_catalog(path: str) -> QuerySet:
+    """Loads the queries saved into the catalog file <code>path</code>.
+
+    Args:
+        path (str): path of the catalog file
+
+    Raises:
+        CatalogVersionError: when the file was written by another version of the library
+
+    Returns:
+        QuerySet: the loaded queries, instances of CatalogQuery
+    """
+    from xpath_helper import __version__
+    with open(path, encoding="utf-8") as file:
+        catalog = json.load(file)
+    if catalog.get("version") != __version__ or catalog.get("format") != CATALOG_FORMAT:
+        raise CatalogVersionError(path, catalog.get("version"), catalog.get("format"))
+
+    queries = QuerySet()
+    for name, expression, canonical_expression, query_fingerprint, function, projection in catalog["queries"]:
+        queries.add(name, CatalogQuery(expression, canonical_expression, query_fingerprint, function, projection))
+    return queries
+
+
+def _entry(name: str, query: Union[XPathHelper, Aggregate, CatalogQuery]) -> list:
+    if isinstance(query, CatalogQuery):
+        return [name, query.expression, query.canonical_expression, query.query_fingerprint, query.function,
+                query.projection]
+    if isinstance(query, Aggregate):
+        return [name, "".join(query.path), canonical_path(query.path), query.fingerprint(), query.function,
+                _is_projection(query.path)]
+    return [name, str(query), query.canonical(), query.fingerprint(), None, _is_projection(query.sb)]
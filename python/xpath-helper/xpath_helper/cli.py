@@ -0,0 +1,255 @@
+import argparse
+import collections
+import glob
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import IO, Iterator, List, Optional, Tuple
+
+from xpath_helper.query_set import QuerySet
+from xpath_helper.records import to_json_value
+
+"""
+Command line evaluating a set of queries against many files, with worker processes, streaming one line of JSON
+per file to the standard output.
+
+Usage:
+    python -m xpath_helper QUERIES INPUT [INPUT ...] [--workers N] [--unordered] [--sort] [--html] [--progress]
+
+QUERIES is a catalog saved with save_catalog (.json), or a Python file building the queries with XPathHelper
+and binding them to a <code>queries</code> variable, as a QuerySet or a dict. INPUT are paths or glob patterns,
+files ending with .gz, .bz2 or .xz are decompressed while they are parsed.
+The selected elements are written as records; at most a few files per worker are in flight at any time,
+and the glob patterns are expanded as the files are consumed, so the memory used doesn't depend on the number
+of files. With --sort, the files of each pattern are rather sorted and produced once, which keeps their paths
+in memory.
+"""
+
+"""
+Number of files submitted to the workers, per worker, before waiting for a result.
+"""
+FILES_IN_FLIGHT_PER_WORKER = 4
+
+"""
+Minimum interval between two progress lines, in seconds.
+"""
+PROGRESS_INTERVAL = 1.0
+
+_OPENERS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "lzma",
+}
+
+# Queries loaded by the worker process, by path of their file
+_loaded_queries = {}
+
+
+def load_queries(path: str) -> QuerySet:
+    """Loads the queries of a catalog file, or of a Python file binding them to a <code>queries</code> variable.
+
+    Args:
+        path (str): path of the query file
+
+    Raises:
+        ValueError: when the Python file doesn't define any <code>queries</code>
+
+    Returns:
+        QuerySet: the queries
+    """
+    if path.endswith(".json"):
+        from xpath_helper.catalog import load_catalog
+        return load_catalog(path)
+    queries = runpy.run_path(path).get("queries")
+    if isinstance(queries, dict):
+        queries = QuerySet(queries)
+    if not isinstance(queries, QuerySet):
+        raise ValueError(path + " doesn't define a QuerySet or a dict named queries")
+    return queries
+
+
+def expand_inputs(patterns: List[str], sort: bool = False) -> Iterator[str]:
+    """Lazily expands the input paths and glob patterns, in the order the file system lists them.
+    Paths are streamed, so the memory used doesn't depend on the number of files, but a file matched
+    by several patterns is produced once for each. Sorting the files of each pattern and skipping the files
+    already produced needs all their paths in memory, it is only done when <code>sort</code> is true.
+
+    Args:
+        patterns (list[str]): paths or glob patterns
+        sort (bool): whether the files of each pattern are sorted, and produced only once
+
+    Returns:
+        Iterator[str]: the paths of the files
+    """
+    seen = set() if sort else None
+    for pattern in patterns:
+        if not glob.has_magic(pattern):
+            paths = [pattern]
+        elif sort:
+            paths = sorted(glob.iglob(pattern, recursive=True))
+        else:
+            paths = glob.iglob(pattern, recursive=True)
+        for path in paths:
+            if os.path.isdir(path) or (seen is not None and path in seen):
+                continue
+            if seen is not None:
+                seen.add(path)
+            yield path
+
+
+def open_input(path: str) -> IO[bytes]:
+    """Opens a file, decompressing it on the fly if it ends with .gz, .bz2 or .xz.
+
+    Args:
+        path (str): path of the file
+
+    Returns:
+        IO[bytes]: the binary file
+    """
+    module = _OPENERS.get(os.path.splitext(path)[1])
+    if module is None:
+        return open(path, "rb")
+    return __import__(module).open(path, "rb")
+
+
+def evaluate_file(path: str, query_path: str, html: bool = False,
+                  attributes: Optional[List[str]] = None) -> Tuple[str, bool]:
+    """Evaluates the queries of a query file against a file. The queries are loaded once per process.
+
+    Args:
+        path (str): path of the file
+        query_path (str): path of the query file
+        html (bool): whether the file is parsed with the HTML parser
+        attributes (list[str]): names of the attributes copied in the records, all of them if None
+
+    Returns:
+        tuple[str, bool]: the line of JSON holding the path and the results, or the error, and whether it failed
+    """
+    from lxml import etree
+    try:
+        parser = etree.HTMLParser() if html else None
+        if os.path.splitext(path)[1] in _OPENERS:
+            with open_input(path) as file:
+                document = etree.parse(file, parser)
+        else:
+            # lxml reads the file itself, without copying it through Python
+            document = etree.parse(path, parser)
+        results = _queries(query_path).evaluate_records(document.getroot(), attributes)
+        line, failed = {"path": path, "results": to_json_value(results)}, False
+    except Exception as error:
+        line, failed = {"path": path, "error": type(error).__name__ + ": " + str(error)}, True
+    return json.dumps(line, ensure_ascii=False), failed
+
+
+def _queries(query_path: str) -> QuerySet:
+    queries = _loaded_queries.get(query_path)
+    if queries is None:
+        queries = _loaded_queries[query_path] = load_queries(query_path)
+    return queries
+
+
+def _evaluate_in_process(paths: Iterator[str], arguments: tuple) -> Iterator[Tuple[str, str, bool]]:
+    return ((path,) + evaluate_file(path, *arguments) for path in paths)
+
+
+def _evaluate_in_workers(paths: Iterator[str], arguments: tuple, executor: ProcessPoolExecutor, in_flight: int,
+                         ordered: bool) -> Iterator[Tuple[str, str, bool]]:
+    # At most in_flight files are submitted, so that neither the paths nor the results pile up
+    pending = collections.OrderedDict()
+    paths = iter(paths)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < in_flight:
+            path = next(paths, None)
+            if path is None:
+                exhausted = True
+            else:
+                pending[executor.submit(evaluate_file, path, *arguments)] = path
+        if not pending:
+            break
+        if ordered:
+            done = [next(iter(pending))]
+        else:
+            done = wait(pending, return_when=FIRST_COMPLETED).done
+        for future in done:
+            yield (pending.pop(future),) + future.result()
+
+
+class _Progress:
+    """
+    Counts the evaluated files and bytes, and reports the throughput on the standard error.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.files = 0
+        self.errors = 0
+        self.bytes = 0
+        self.start = time.monotonic()
+        self.last_report = self.start
+
+    def add(self, path: str, failed: bool):
+        self.files += 1
+        self.errors += failed
+        if not self.enabled:
+            return
+        try:
+            self.bytes += os.path.getsize(path)
+        except OSError:
+            pass
+        if time.monotonic() - self.last_report >= PROGRESS_INTERVAL:
+            self.report()
+
+    def report(self):
+        self.last_report = time.monotonic()
+        elapsed = max(self.last_report - self.start, 1e-9)
+        megabytes = self.bytes / 2 ** 20
+        sys.stderr.write("{} files ({} errors), {:.1f} MB in {:.1f} s: {:.1f} files/s, {:.2f} MB/s\n".format(
+            self.files, self.errors, megabytes, elapsed, self.files / elapsed, megabytes / elapsed))
+        sys.stderr.flush()
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m xpath_helper",
+                                     description="Evaluates a set of queries against many files, as JSON lines.")
+    parser.add_argument("queries", help="catalog (.json) or Python file defining the queries")
+    parser.add_argument("inputs", nargs="+", help="paths or glob patterns of the files, possibly .gz, .bz2 or .xz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes, 0 to evaluate in this process (default: number of CPUs)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="writes the results as soon as they are ready, rather than in the order of the files")
+    parser.add_argument("--sort", action="store_true",
+                        help="sorts the files of each pattern and skips duplicates, keeping all the paths in memory")
+    parser.add_argument("--html", action="store_true", help="parses the files with the lenient HTML parser")
+    parser.add_argument("--attributes", nargs="+", metavar="NAME",
+                        help="attributes copied in the records of the elements (default: all of them)")
+    parser.add_argument("--progress", action="store_true", help="reports the progress and throughput on the standard error")
+    options = parser.parse_args(arguments)
+
+    query_path = os.path.abspath(options.queries)
+    # Loaded before starting the workers, so that an invalid query file fails at once
+    _queries(query_path)
+    task_arguments = (query_path, options.html, options.attributes)
+    paths = expand_inputs(options.inputs, options.sort)
+    progress = _Progress(options.progress)
+    executor = None
+    if options.workers > 0:
+        executor = ProcessPoolExecutor(options.workers)
+        lines = _evaluate_in_workers(paths, task_arguments, executor,
+                                     options.workers * FILES_IN_FLIGHT_PER_WORKER, not options.unordered)
+    else:
+        lines = _evaluate_in_process(paths, task_arguments)
+    try:
+        for path, line, failed in lines:
+            sys.stdout.write(line + "\n")
+            progress.add(path, failed)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    sys.stdout.flush()
+    if options.progress:
+        progress.report()
+    return 1 if progress.errors else 0
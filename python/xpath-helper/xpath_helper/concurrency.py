@@ -0,0 +1,106 @@
+import functools
+import itertools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+"""
+Evaluation of queries from asyncio coroutines.
+Parsing and evaluating a large document blocks for a long time, so the work is offloaded to an executor:
+the default thread pool of the event loop, or any thread or process pool. With a process pool, the documents
+and the results travel between processes, so they must be raw documents and strings, numbers or booleans.
+"""
+
+"""
+Maximum number of chunks evaluated at the same time by default.
+"""
+DEFAULT_CONCURRENCY = 8
+
+"""
+Number of documents evaluated by a single executor task by default.
+"""
+DEFAULT_CHUNK_SIZE = 16
+
+
+async def run_in_executor(function: Callable, *arguments, executor: Optional[Executor] = None):
+    """Calls <code>function</code> in <code>executor</code>, without blocking the event loop.
+
+    Args:
+        function (Callable): function to call
+        arguments: arguments of the function
+        executor (Executor): executor calling the function, the default executor of the event loop if None
+
+    Returns:
+        object: the value returned by the function
+    """
+    import asyncio
+    # get_running_loop is only available from Python 3.7
+    get_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+    return await get_loop().run_in_executor(executor, functools.partial(function, *arguments))
+
+
+async def map_in_chunks(function: Callable, items: Iterable, executor: Optional[Executor] = None,
+                        concurrency: int = DEFAULT_CONCURRENCY, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """Applies <code>function</code> to every item in <code>executor</code>, by chunks of items.
+    At most <code>concurrency</code> chunks are submitted to the executor at the same time, and the items
+    are consumed only as chunks are submitted, so a generator of documents isn't loaded all at once.
+    When the coroutine is cancelled, the chunks not started yet are cancelled, and the ones running in threads
+    stop before their next item.
+
+    Args:
+        function (Callable): function applied to each item
+        items (Iterable): items
+        executor (Executor): executor applying the function, the default executor of the event loop if None
+        concurrency (int): maximum number of chunks submitted at the same time
+        chunk_size (int): number of items of a chunk
+
+    Raises:
+        ValueError: when <code>concurrency</code> or <code>chunk_size</code> isn't positive
+
+    Returns:
+        list: the values returned by the function, in the order of the items
+    """
+    import asyncio
+    if concurrency < 1 or chunk_size < 1:
+        raise ValueError("concurrency and chunk_size must be positive")
+    items = iter(items)
+    # Processes can't share an event, they only stop between chunks
+    cancelled = None if isinstance(executor, ProcessPoolExecutor) else threading.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+
+    async def run_chunk(chunk: list) -> list:
+        try:
+            return await run_in_executor(_apply_to_chunk, function, chunk, cancelled, executor=executor)
+        except BaseException:
+            failed.append(True)
+            raise
+        finally:
+            semaphore.release()
+
+    tasks = []
+    try:
+        while not failed:
+            # The next chunk is only read once a running chunk is done
+            await semaphore.acquire()
+            chunk = list(itertools.islice(items, chunk_size))
+            if not chunk:
+                break
+            tasks.append(asyncio.ensure_future(run_chunk(chunk)))
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        if cancelled is not None:
+            cancelled.set()
+        for task in tasks:
+            task.cancel()
+        raise
+    return [value for chunk_values in results for value in chunk_values]
+
+
+def _apply_to_chunk(function: Callable, chunk: list, cancelled: Optional[threading.Event]) -> List:
+    values = []
+    for item in chunk:
+        if cancelled is not None and cancelled.is_set():
+            break
+        values.append(function(item))
+    return values
@@ -0,0 +1,189 @@
+import re
+from typing import List, Optional
+
+from xpath_helper.filter import Predicate, AND_OPERATOR, OR_OPERATOR, ATOM, ATTRIBUTE_IN, _filter_tree, _is_position
+from xpath_helper.step import Step, Union, CHILD, DESCENDANT, DESCENDANT_OR_SELF, FOLLOWING_SIBLING
+
+"""
+Translation of queries to CSS selectors.
+Browsers match CSS selectors much faster than they evaluate XPath expressions, and the most common queries,
+made of descendant, child and following sibling steps filtered on their attributes, have an exact CSS equivalent.
+Queries without one, using other axes, text filters, numeric comparisons or SVG node tests, translate to None.
+"""
+
+_IDENTIFIER_PATTERN = re.compile(r"-?[_a-zA-Z][_a-zA-Z0-9-]*")
+_NAME = r"(-?[_a-zA-Z][_a-zA-Z0-9-]*)"
+_LITERAL = r"('[^']*'|\"[^\"]*\"|concat\(.*\))"
+_HAS_ATTRIBUTE_PATTERN = re.compile("@" + _NAME)
+_ATTRIBUTE_EQUALS_PATTERN = re.compile("@" + _NAME + "(!?)=" + _LITERAL)
+_ATTRIBUTE_CONTAINS_PATTERN = re.compile(r"contains\(@" + _NAME + ", " + _LITERAL + r"\)")
+_CONCAT_PART_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+"""
+Combinators of the axes translated to CSS, when the step isn't the first one.
+"""
+_COMBINATORS = {
+    DESCENDANT: " ",
+    CHILD: " > ",
+    FOLLOWING_SIBLING: " ~ ",
+}
+
+
+def to_css(path: List[str]) -> Optional[str]:
+    """Returns the CSS selector matching the same elements as a path, if there is one.
+
+    Args:
+        path (list[str]): path of a query
+
+    Returns:
+        str: the CSS selector, or None if the path can't be expressed in CSS
+    """
+    fragments = [fragment for fragment in path if fragment != ""]
+    if len(fragments) == 1 and isinstance(fragments[0], Union):
+        selectors = [to_css(list(branch)) for branch in fragments[0].branches]
+        return None if None in selectors else ", ".join(selectors)
+
+    # An OR filter translates to several compound selectors, so the path translates to a list of selectors
+    selectors = [""]
+    for index, step in enumerate(fragments):
+        if not isinstance(step, Step) or step.svg_tag is not None:
+            return None
+        if index == 0 and step.axis in (DESCENDANT, DESCENDANT_OR_SELF):
+            combinator = ""
+        elif index != 0 and step.axis in _COMBINATORS:
+            combinator = _COMBINATORS[step.axis]
+        elif index == 0 and step.axis == CHILD:
+            # The first child step selects the root element
+            combinator = ""
+        else:
+            return None
+        compounds = _compound_selectors(step)
+        if compounds is None:
+            return None
+        if index == 0 and step.axis == CHILD:
+            compounds = [compound + ":root" for compound in compounds]
+        selectors = [selector + combinator + compound for selector in selectors for compound in compounds]
+    return ", ".join(selectors) if fragments else None
+
+
+def _compound_selectors(step: Step) -> Optional[List[str]]:
+    if step.tag is not None and not _IDENTIFIER_PATTERN.fullmatch(step.tag):
+        return None
+    node_test = "*" if step.tag is None else step.tag
+    if step.filter is None:
+        return [node_test]
+
+    tree = _filter_tree(step.filter)
+    if _is_position(tree):
+        # A position counts the siblings matching the node test, so it only translates on the child axis
+        if step.axis not in (DESCENDANT, CHILD):
+            return None
+        return [node_test + _position_selector(_position(tree), step.tag is None)]
+    conditions = _condition_selectors(tree)
+    if conditions is None:
+        return None
+    return [node_test + condition for condition in conditions]
+
+
+def _position(tree: tuple) -> str:
+    operator, operands = tree
+    return operands if operator == ATOM else _position(operands[0])
+
+
+def _position_selector(position: str, any_tag: bool) -> str:
+    if position == "last()":
+        return ":last-child" if any_tag else ":last-of-type"
+    return (":nth-child(" if any_tag else ":nth-of-type(") + position + ")"
+
+
+def _condition_selectors(tree: tuple) -> Optional[List[str]]:
+    """Returns the CSS selectors matching, together, the elements a filter tree selects, without any node test.
+    The alternatives of an OR become separate selectors, as :is() is missing from many CSS engines,
+    and as few of them accept :not() inside :not() or several simple selectors inside :not(), such filters
+    have no translation.
+
+    Args:
+        tree (tuple): expression tree of the filter
+
+    Returns:
+        list[str]: the CSS selectors, or None if the filter can't be expressed in CSS
+    """
+    operator, operands = tree
+    if operator == ATOM:
+        return _atom_selectors(operands)
+
+    alternatives = [_condition_selectors(operand) for operand in operands]
+    if None in alternatives:
+        return None
+    if operator == OR_OPERATOR:
+        return [selector for selectors in alternatives for selector in selectors]
+    if operator == AND_OPERATOR:
+        combined = [""]
+        for selectors in alternatives:
+            combined = [prefix + selector for prefix in combined for selector in selectors]
+        return combined
+    selectors = alternatives[0]
+    if len(operands) != 1 or not _is_atom(operands[0]) or len(selectors) != 1 or ":not(" in selectors[0]:
+        return None
+    return [":not(" + selectors[0] + ")"]
+
+
+def _is_atom(tree: tuple) -> bool:
+    operator, operands = tree
+    if operator == ATOM:
+        return True
+    return operator in (AND_OPERATOR, OR_OPERATOR) and len(operands) == 1 and _is_atom(operands[0])
+
+
+def _atom_selectors(predicate: str) -> Optional[List[str]]:
+    if isinstance(predicate, Predicate) and predicate.kind == ATTRIBUTE_IN:
+        attribute, values = predicate.operands
+        if not values or not _IDENTIFIER_PATTERN.fullmatch(attribute):
+            return None
+        return ["[" + attribute + "=" + _css_string(value) + "]" for value in sorted(values)]
+
+    selector = _atom_selector(predicate)
+    return None if selector is None else [selector]
+
+
+def _atom_selector(predicate: str) -> Optional[str]:
+    match = _HAS_ATTRIBUTE_PATTERN.fullmatch(predicate)
+    if match:
+        return "[" + match.group(1) + "]"
+    match = _ATTRIBUTE_EQUALS_PATTERN.fullmatch(predicate)
+    if match:
+        attribute, negation, value = match.group(1), match.group(2), _literal_value(match.group(3))
+        if value is None:
+            return None
+        selector = "[" + attribute + "=" + _css_string(value) + "]"
+        # Unlike :not(), "!=" only selects the elements that have the attribute
+        return "[" + attribute + "]:not(" + selector + ")" if negation else selector
+    match = _ATTRIBUTE_CONTAINS_PATTERN.fullmatch(predicate)
+    if match:
+        attribute, value = match.group(1), _literal_value(match.group(2))
+        # Every string contains the empty string, even the value of a missing attribute, but [attribute*=""] matches nothing
+        if not value:
+            return None
+        return "[" + attribute + "*=" + _css_string(value) + "]"
+    return None
+
+
+def _literal_value(literal: str) -> Optional[str]:
+    """Returns the string an XPath literal, or a concatenation of literals, stands for.
+
+    Args:
+        literal (str): XPath literal, as written by <code>replace_apostrophes</code>
+
+    Returns:
+        str: the string value, or None if the expression isn't a literal
+    """
+    if literal.startswith("concat("):
+        parts = _CONCAT_PART_PATTERN.findall(literal[len("concat("):-1])
+        if ", ".join(parts) != literal[len("concat("):-1]:
+            return None
+        return "".join(part[1:-1] for part in parts)
+    return literal[1:-1]
+
+
+def _css_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\a ") + "'"
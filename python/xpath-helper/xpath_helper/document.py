@@ -0,0 +1,218 @@
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Union
+
+"""
+Parsing of raw documents, shared by the evaluations of queries against the same content.
+A document given as bytes or str is parsed once: its tree is kept in a cache keyed by the hash of its content,
+so that independent components querying the same page don't parse it again.
+Large files don't have to be read into bytes or str first: a path is parsed by lxml straight from the file,
+and a memoryview, bytearray or mmap buffer is hashed in place. Recent lxml versions parse such a buffer in place
+too; older ones only parse bytes and str from memory, so the buffer is then copied one chunk at a time.
+"""
+
+"""
+Types of the buffers parsed in place. Any other object with a __fspath__ method is the path of a file.
+"""
+BUFFER_TYPES = (bytearray, memoryview, mmap.mmap)
+
+"""
+Size of the chunks read from a buffer when lxml can't parse it in place.
+"""
+BUFFER_CHUNK_SIZE = 2 ** 16
+
+"""
+Default maximum estimated memory of the trees kept by a DocumentCache, in bytes.
+"""
+DEFAULT_MAX_MEMORY = 256 * 2 ** 20
+
+"""
+Estimated memory of a parsed node, in bytes, besides the text it holds.
+"""
+NODE_MEMORY = 256
+
+
+class DocumentCache:
+    """
+    Least recently used cache of parsed trees, bounded by the total estimated memory of the trees.
+    """
+
+    def __init__(self, max_memory: int = DEFAULT_MAX_MEMORY, parser=None):
+        """Creates an instance of DocumentCache.
+
+        Args:
+            max_memory (int): maximum total estimated memory of the cached trees, in bytes
+            parser (lxml.etree._BaseParser): parser of the documents, the lxml XML parser if None
+        """
+        self.max_memory = max_memory
+        self.parser = parser
+        self.__trees = OrderedDict()
+        self.__memory = 0
+        self.__lock = threading.Lock()
+
+    def parse(self, content: Union[bytes, str, os.PathLike, memoryview]):
+        """Returns the root element of the tree parsed from <code>content</code>, parsing it only if it isn't cached.
+        The returned tree is shared with the other callers parsing the same content, it must not be modified.
+        A file is identified by its path, modification time and size, so it is parsed again once it changes.
+
+        Args:
+            content (bytes | str | os.PathLike | memoryview | bytearray | mmap.mmap): document, or path of its file
+
+        Returns:
+            lxml.etree._Element: root element of the document
+        """
+        key = content_key(content)
+        with self.__lock:
+            cached = self.__trees.get(key)
+            if cached is not None:
+                self.__trees.move_to_end(key)
+                return cached[0]
+
+        root = parse_content(content, self.parser)
+        memory = estimate_memory(root, content)
+        with self.__lock:
+            if key not in self.__trees and memory <= self.max_memory:
+                self.__trees[key] = (root, memory)
+                self.__memory += memory
+                while self.__memory > self.max_memory:
+                    _, (_, evicted_memory) = self.__trees.popitem(last=False)
+                    self.__memory -= evicted_memory
+        return root
+
+    @property
+    def memory(self) -> int:
+        """Returns the total estimated memory of the cached trees.
+
+        Returns:
+            int: memory in bytes
+        """
+        return self.__memory
+
+    def __len__(self) -> int:
+        return len(self.__trees)
+
+    def __contains__(self, content: Union[bytes, str, os.PathLike, memoryview]) -> bool:
+        return content_key(content) in self.__trees
+
+    def clear(self):
+        """Removes all the cached trees.
+        """
+        with self.__lock:
+            self.__trees.clear()
+            self.__memory = 0
+
+
+def content_key(content: Union[bytes, str, os.PathLike, memoryview]) -> tuple:
+    """Returns the cache key of a document: its type and the hash of its content.
+    Both are needed, as a str and the bytes of its encoding can be parsed differently. Buffers are hashed
+    in place and share the key of the bytes they hold, while a file is keyed by its path, modification time and size.
+
+    Args:
+        content (bytes | str | os.PathLike | memoryview | bytearray | mmap.mmap): document, or path of its file
+
+    Returns:
+        tuple: key of the document
+    """
+    if isinstance(content, str):
+        return (str, hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+    if hasattr(content, "__fspath__"):
+        path = os.path.abspath(content.__fspath__())
+        status = os.stat(path)
+        return (os.PathLike, path, status.st_mtime_ns, status.st_size)
+    return (bytes, hashlib.blake2b(content, digest_size=16).digest())
+
+
+def estimate_memory(root, content: Union[bytes, str, os.PathLike, memoryview]) -> int:
+    """Estimates the memory used by a parsed tree, from its number of nodes and the size of its source.
+
+    Args:
+        root (lxml.etree._Element): root element of the tree
+        content (bytes | str | os.PathLike | memoryview | bytearray | mmap.mmap): source of the tree, or path of its file
+
+    Returns:
+        int: estimated memory in bytes
+    """
+    if hasattr(content, "__fspath__"):
+        size = os.path.getsize(content.__fspath__())
+    elif isinstance(content, memoryview):
+        size = content.nbytes
+    else:
+        size = len(content)
+    return NODE_MEMORY * sum(1 for _ in root.iter()) + size
+
+
+def is_raw_document(document) -> bool:
+    """Returns whether <code>document</code> is a raw document to parse, rather than a tree.
+
+    Args:
+        document (object): document
+
+    Returns:
+        bool: True for bytes, str, buffers and paths
+    """
+    return isinstance(document, (bytes, str) + BUFFER_TYPES) or hasattr(document, "__fspath__")
+
+
+def parse_content(content: Union[bytes, str, os.PathLike, memoryview], parser=None):
+    """Parses a raw document without caching its tree. A file is never read into an intermediate bytes
+    or str object. A buffer isn't copied either when lxml parses it in place; with older lxml versions,
+    it is copied one chunk of at most <code>BUFFER_CHUNK_SIZE</code> bytes at a time.
+
+    Args:
+        content (bytes | str | os.PathLike | memoryview | bytearray | mmap.mmap): document, or path of its file
+        parser (lxml.etree._BaseParser): parser of the document, the lxml XML parser if None
+
+    Returns:
+        lxml.etree._Element: root element of the document
+    """
+    from lxml import etree
+    if hasattr(content, "__fspath__"):
+        return etree.parse(content.__fspath__(), parser).getroot()
+    if isinstance(content, (bytes, str)):
+        return etree.fromstring(content, parser)
+    view = memoryview(content).cast("B")
+    try:
+        return etree.fromstring(view, parser)
+    except (TypeError, ValueError):
+        # Older lxml versions only parse bytes and str from memory: the buffer is rather copied by small chunks
+        return etree.parse(_BufferReader(view), parser).getroot()
+
+
+class _BufferReader:
+    """
+    File-like object reading a buffer by chunks of at most BUFFER_CHUNK_SIZE bytes.
+    """
+    __slots__ = ('view', 'position')
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        size = BUFFER_CHUNK_SIZE if size < 0 else min(size, BUFFER_CHUNK_SIZE)
+        chunk = self.view[self.position:self.position + size].tobytes()
+        self.position += len(chunk)
+        return chunk
+
+
+"""
+Cache used when a query is evaluated against a raw document.
+"""
+documents = DocumentCache()
+
+
+def resolve_document(context):
+    """Returns the node in reference of an evaluation, parsing it through <code>documents</code> if it is a raw document.
+
+    Args:
+        context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference or raw document
+
+    Returns:
+        lxml.etree._Element | lxml.etree._ElementTree: node in reference
+    """
+    if is_raw_document(context):
+        return documents.parse(context)
+    return context
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from typing import Dict, List, Union
+
+from xpath_helper.evaluation import COUNT
+
+"""
+Evaluation of queries in a browser, through a Selenium-like driver.
+Each find_element call is a round trip to the browser: the queries are rather sent together in a single script,
+evaluating each of them with document.evaluate and returning all the results at once.
+"""
+
+"""
+Kind of result of the queries selecting nodes. Aggregates are evaluated as the value of their function.
+"""
+NODES = "nodes"
+
+"""
+Maximum number of queries sent in one script by default.
+"""
+DEFAULT_BATCH_SIZE = 500
+
+"""
+Script evaluating a batch of [expression, kind] pairs, given as first argument, against the context node
+given as second argument, or the document. Text and attribute nodes are returned as their value,
+and a query that fails is returned as an object holding the error.
+"""
+BATCH_SCRIPT = """
+var queries = arguments[0], context = arguments[1] || document, results = [];
+for (var i = 0; i < queries.length; i++) {
+  var expression = queries[i][0], kind = queries[i][1];
+  try {
+    if (kind === "nodes") {
+      var snapshot = document.evaluate(expression, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+      var nodes = [];
+      for (var j = 0; j < snapshot.snapshotLength; j++) {
+        var node = snapshot.snapshotItem(j);
+        nodes.push(node.nodeType === Node.ELEMENT_NODE ? node : node.nodeValue);
+      }
+      results.push(nodes);
+    } else if (kind === "count") {
+      results.push(document.evaluate(expression, context, null, XPathResult.NUMBER_TYPE, null).numberValue);
+    } else if (kind === "boolean") {
+      results.push(document.evaluate(expression, context, null, XPathResult.BOOLEAN_TYPE, null).booleanValue);
+    } else {
+      results.push(document.evaluate(expression, context, null, XPathResult.STRING_TYPE, null).stringValue);
+    }
+  } catch (error) {
+    results.push({"error": String(error)});
+  }
+}
+return results;
+"""
+
+
+class DriverEvaluationError(Exception):
+    """
+    Raised when the browser fails to evaluate a query of a batch.
+    """
+
+    def __init__(self, expression: str, message: str):
+        """Creates an instance of DriverEvaluationError.
+
+        Args:
+            expression (str): XPath expression of the query
+            message (str): error reported by the browser
+        """
+        super().__init__("The browser failed to evaluate " + repr(expression) + ": " + message)
+        self.expression = expression
+        self.message = message
+
+
+def evaluate_batch(driver, queries, context=None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> Union[Dict[str, object], List[object]]:
+    """Evaluates <code>queries</code> in the browser of <code>driver</code>, with one script execution
+    for each batch of <code>batch_size</code> queries.
+
+    Args:
+        driver (selenium.webdriver.Remote): driver executing the scripts
+        queries (QuerySet | dict[str, Query] | list[Query]): queries, named or not
+        context (selenium.webdriver.remote.webelement.WebElement): node in reference of relative queries, the document if None
+        batch_size (int): maximum number of queries evaluated by one script
+
+    Raises:
+        DriverEvaluationError: when the browser fails to evaluate a query
+        ValueError: when <code>batch_size</code> isn't positive
+
+    Returns:
+        dict[str, list | int | bool | str] | list[list | int | bool | str]: results by query name, or in the order of
+        the queries. The nodes are the driver elements, the text and attribute nodes their value.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    if hasattr(queries, "items"):
+        names, queries = zip(*queries.items()) if len(queries) else ((), ())
+    else:
+        names, queries = None, list(queries)
+
+    requests = [_request(query) for query in queries]
+    results = []
+    for start in range(0, len(requests), batch_size):
+        batch = requests[start:start + batch_size]
+        values = driver.execute_script(BATCH_SCRIPT, batch, context)
+        for (expression, kind), value in zip(batch, values):
+            results.append(_result(expression, kind, value))
+    return results if names is None else OrderedDict(zip(names, results))
+
+
+def _request(query) -> list:
+    # Minified expressions keep the script short
+    expression = query.minify() if hasattr(query, "minify") else str(query)
+    return [expression, getattr(query, "function", None) or NODES]
+
+
+def _result(expression: str, kind: str, value):
+    if isinstance(value, dict) and "error" in value:
+        raise DriverEvaluationError(expression, value["error"])
+    if kind == COUNT:
+        return int(value)
+    return value
+
@@ -0,0 +1,580 @@
+import itertools
+import math
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Union as UnionType
+
+from xpath_helper.aggregate import Aggregate
+from xpath_helper.css import _literal_value
+from xpath_helper.document import BUFFER_CHUNK_SIZE, BUFFER_TYPES
+from xpath_helper.evaluation import COUNT, BOOLEAN, _is_projection
+from xpath_helper.filter import (ANY_ATTRIBUTE, AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR, ATOM, ATTRIBUTE_IN, VALUE_IN,
+                                 Predicate, _filter_tree, _is_position)
+from xpath_helper.step import (Limit, Step, Union, DESCENDANT, DESCENDANT_OR_SELF, CHILD, PARENT, ANCESTOR, ANCESTOR_OR_SELF,
+                               FOLLOWING, FOLLOWING_SIBLING, PRECEDING, PRECEDING_SIBLING, ATTRIBUTE, TEXT, FORWARD_AXES)
+from xpath_helper.xpath_helper import XPathHelper
+
+"""
+Evaluation of queries against the trees of the standard xml.etree.ElementTree module, for environments without lxml.
+ElementTree only supports a small subset of XPath, so each query is compiled once from its steps: into an ElementPath
+expression when one selects the same elements in the same order, otherwise into Python functions walking the tree.
+The element given as context is the root of the document the absolute paths of the query start from.
+"""
+
+_NAME = r"([_a-zA-Z][\w.-]*|\*)"
+_HAS_ATTRIBUTE_PATTERN = re.compile("@" + _NAME)
+_ATTRIBUTE_COMPARISON_PATTERN = re.compile("@" + _NAME + r"(=|!=|<=|<|>=|>)(.+)")
+_ATTRIBUTE_CONTAINS_PATTERN = re.compile(r"contains\(@" + _NAME + r", (.+)\)")
+_TEXT_COMPARISON_PATTERN = re.compile(r"text\(\) ?(=|!=|<=|<|>=|>) ?(.+)")
+_TEXT_CONTAINS_PATTERN = re.compile(r"text\(\)\[contains\(\., (.+)\)\]")
+_POSITION_PATTERN = re.compile(r"\d+")
+_NUMBER_PATTERN = re.compile(r"\s*-?(\d+(\.\d*)?|\.\d+)\s*")
+_LAST = "last()"
+
+_COMPARISONS = {
+    "=": lambda value, operand: value == operand,
+    "!=": lambda value, operand: value != operand,
+    "<": lambda value, operand: value < operand,
+    "<=": lambda value, operand: value <= operand,
+    ">": lambda value, operand: value > operand,
+    ">=": lambda value, operand: value >= operand,
+}
+
+
+class ElementTreeQuery:
+    """
+    Query compiled for the trees of xml.etree.ElementTree.
+    """
+    __slots__ = ('expression', 'element_path', 'function', '__select')
+
+    def __init__(self, query: UnionType[XPathHelper, Aggregate]):
+        """Creates an instance of ElementTreeQuery.
+
+        Args:
+            query (XPathHelper | Aggregate): query to compile
+
+        Raises:
+            ValueError: when the query has a step or a filter ElementTree can't evaluate,
+                like a raw XPath expression or a namespace prefix
+        """
+        self.expression = str(query)
+        self.function = query.function if isinstance(query, Aggregate) else None
+        path = query.path if isinstance(query, Aggregate) else query.sb
+        self.element_path = _element_path(path)
+        if self.element_path is not None:
+            self.__select = _compile_element_path(path, self.element_path)
+        else:
+            select_path = _compile_path(path)
+            self.__select = lambda root: list(select_path(_Tree(root), None))
+
+    def __str__(self) -> str:
+        return self.expression
+
+    def evaluate(self, context) -> UnionType[list, int, bool, str]:
+        """Evaluates the query against <code>context</code>.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | xml.etree.ElementTree.Element | xml.etree.ElementTree.ElementTree): root of the document, or raw document
+
+        Returns:
+            list | int | bool | str: the selected nodes in document order, or the value of the aggregate
+        """
+        root = _resolve_root(context)
+        nodes = self.__select(root)
+        if self.function is None:
+            return nodes
+        if self.function == COUNT:
+            return len(nodes)
+        if self.function == BOOLEAN:
+            return len(nodes) != 0
+        if not nodes:
+            return ""
+        return nodes[0] if isinstance(nodes[0], str) else "".join(nodes[0].itertext())
+
+
+def compile_elementtree(query: UnionType[XPathHelper, Aggregate]) -> ElementTreeQuery:
+    """Compiles a query for the trees of xml.etree.ElementTree.
+
+    Args:
+        query (XPathHelper | Aggregate): query to compile
+
+    Raises:
+        ValueError: when the query has a step or a filter ElementTree can't evaluate
+
+    Returns:
+        ElementTreeQuery: the compiled query
+    """
+    return ElementTreeQuery(query)
+
+
+def _resolve_root(context):
+    from xml.etree import ElementTree
+    if isinstance(context, (bytes, str)):
+        return ElementTree.fromstring(context)
+    if hasattr(context, "__fspath__"):
+        return ElementTree.parse(context.__fspath__()).getroot()
+    if isinstance(context, BUFFER_TYPES):
+        # Fed by slices of the buffer, which aren't copied
+        view = memoryview(context).cast("B")
+        parser = ElementTree.XMLParser()
+        for start in range(0, len(view), BUFFER_CHUNK_SIZE):
+            parser.feed(view[start:start + BUFFER_CHUNK_SIZE])
+        return parser.close()
+    return context.getroot() if hasattr(context, "getroot") else context
+
+
+class _Tree:
+    """
+    Document being evaluated: ElementTree nodes know neither their parent nor their position,
+    they are computed on first use.
+    """
+    __slots__ = ('root', '__parents', '__order')
+
+    def __init__(self, root):
+        self.root = root
+        self.__parents = None
+        self.__order = None
+
+    def parent(self, node):
+        if self.__parents is None:
+            self.__parents = {child: parent for parent in self.root.iter() for child in parent}
+        return self.__parents.get(node)
+
+    def position(self, node) -> int:
+        if self.__order is None:
+            self.__order = {node: position for position, node in enumerate(self.root.iter())}
+        return self.__order[node]
+
+    def text_position(self, node, is_tail: bool) -> tuple:
+        # The text of an element comes before its first child, the tail of a child after its last descendant,
+        # and after the tails of the descendants ending with it
+        if not is_tail:
+            return self.position(node), 0, 0
+        depth = 0
+        while len(node):
+            node = node[-1]
+            depth += 1
+        return self.position(node), 1, depth
+
+    def attribute_position(self, node, index: int) -> tuple:
+        # The attributes of an element come before its text
+        return self.position(node), -1, index
+
+    def sort(self, nodes: Iterable) -> list:
+        return sorted({id(node): node for node in nodes}.values(), key=self.position)
+
+
+def _compile_path(path: List[str]) -> Callable:
+    """Compiles a path into a function selecting its nodes in a tree.
+
+    Args:
+        path (list[str]): path of the query
+
+    Raises:
+        ValueError: when the path has a fragment ElementTree can't evaluate
+
+    Returns:
+        Callable: function taking the tree and the context nodes, None for the document, and lazily returning
+        the selected nodes
+    """
+    units = []
+    for fragment in path:
+        if fragment == "":
+            continue
+        if isinstance(fragment, Step):
+            units.append(_compile_step(fragment))
+        elif isinstance(fragment, Limit):
+            units.append(_compile_limit(fragment))
+        elif isinstance(fragment, Union):
+            units.append(_compile_union(fragment))
+        else:
+            raise ValueError("ElementTree can't evaluate the XPath expression " + repr(str(fragment)))
+
+    def select(tree: _Tree, contexts: Optional[list], keyed: bool = False) -> Iterable:
+        nodes = contexts
+        for index, unit in enumerate(units):
+            # Only the nodes of the last unit are produced lazily, the other ones are the contexts of the next unit
+            if index != len(units) - 1:
+                nodes = list(unit(tree, nodes))
+            else:
+                # Only projections are asked for the positions of their strings
+                nodes = unit(tree, nodes, True) if keyed else unit(tree, nodes)
+        return () if nodes is None else nodes
+    return select
+
+
+def _compile_limit(limit: Limit) -> Callable:
+    select = _compile_path(list(limit.path))
+    return lambda tree, contexts: itertools.islice(select(tree, None), limit.count)
+
+
+def _compile_union(union: Union) -> Callable:
+    branches = [_compile_path(list(branch)) for branch in union.branches]
+    if _is_projection([union]):
+        def select_strings(tree: _Tree, contexts: Optional[list], keyed: bool = False) -> list:
+            # The same string node selected by several branches has the same position
+            values = {}
+            for select in branches:
+                values.update(select(tree, None, True))
+            values = sorted(values.items(), key=lambda value: value[0])
+            return values if keyed else [text for _, text in values]
+        return select_strings
+    return lambda tree, contexts: tree.sort(node for select in branches for node in select(tree, None))
+
+
+def _compile_step(step: Step) -> Callable:
+    if step.tag is not None and ":" in step.tag:
+        raise ValueError("ElementTree can't evaluate the namespace prefix of " + repr(str(step)))
+    if step.axis == TEXT:
+        return _select_text
+    if step.axis == ATTRIBUTE:
+        return _compile_attribute_projection(step.tag)
+
+    axis = _AXES[step.axis]
+    node_test = _compile_node_test(step.tag, step.svg_tag)
+    predicate, position = _compile_step_filter(step)
+    if step.axis == DESCENDANT and position is not None:
+        # "//tag[2]" is the second tag child of each descendant, not the second descendant
+        axis = _AXES[CHILD]
+
+    def select_from(tree: _Tree, context) -> Iterator:
+        nodes = (node for node in axis(tree, context) if node_test(node))
+        if predicate is not None:
+            nodes = (node for node in nodes if predicate(node))
+        if position == _LAST:
+            return iter(list(nodes)[-1:])
+        if position is not None:
+            return itertools.islice(nodes, position - 1, position)
+        return nodes
+
+    in_document_order = step.axis in FORWARD_AXES
+    expands_contexts = step.axis == DESCENDANT and position is not None
+
+    def select(tree: _Tree, contexts: Optional[list]) -> Iterable:
+        if contexts is None:
+            contexts = [tree]
+        if expands_contexts:
+            contexts = list(itertools.chain.from_iterable(_descendant_or_self(tree, context) for context in contexts))
+        if len(contexts) == 1 and in_document_order:
+            return select_from(tree, contexts[0])
+        return tree.sort(itertools.chain.from_iterable(select_from(tree, context) for context in contexts))
+    return select
+
+
+def _select_text(tree: _Tree, contexts: Optional[list], keyed: bool = False) -> list:
+    texts = []
+    for context in contexts or ():
+        if context is tree:
+            continue
+        if context.text:
+            texts.append((context, False, context.text))
+        texts.extend((child, True, child.tail) for child in context if child.tail)
+    if keyed:
+        return sorted(((tree.text_position(node, is_tail), text) for node, is_tail, text in texts),
+                      key=lambda text: text[0])
+    if len(contexts or ()) > 1:
+        texts.sort(key=lambda text: tree.text_position(text[0], text[1]))
+    return [text for _, _, text in texts]
+
+
+def _compile_attribute_projection(attribute: str) -> Callable:
+    def select(tree: _Tree, contexts: Optional[list], keyed: bool = False) -> list:
+        values = []
+        for context in contexts or ():
+            if context is tree:
+                continue
+            if attribute == ANY_ATTRIBUTE:
+                values.extend((context, index, value) for index, value in enumerate(context.attrib.values()))
+            elif context.get(attribute) is not None:
+                values.append((context, list(context.attrib).index(attribute), context.get(attribute)))
+        if keyed:
+            return [(tree.attribute_position(node, index), value) for node, index, value in values]
+        return [value for _, _, value in values]
+    return select
+
+
+def _compile_node_test(tag: Optional[str], svg_tag: Optional[str]) -> Callable:
+    if svg_tag is not None:
+        return lambda node: isinstance(node.tag, str) and node.tag.rpartition("}")[2] == svg_tag
+    if tag is not None:
+        return lambda node: node.tag == tag
+    return lambda node: isinstance(node.tag, str)
+
+
+def _descendant_or_self(tree: _Tree, node) -> Iterator:
+    if node is tree:
+        return itertools.chain((tree,), tree.root.iter())
+    return node.iter()
+
+
+def _child(tree: _Tree, node) -> Iterable:
+    return (tree.root,) if node is tree else node
+
+
+def _descendant(tree: _Tree, node) -> Iterator:
+    if node is tree:
+        return tree.root.iter()
+    return itertools.islice(node.iter(), 1, None)
+
+
+def _ancestor_or_self(tree: _Tree, node) -> Iterator:
+    while node is not None and node is not tree:
+        yield node
+        node = tree.parent(node)
+
+
+def _siblings(tree: _Tree, node, preceding: bool) -> list:
+    parent = None if node is tree else tree.parent(node)
+    if parent is None:
+        return []
+    children = list(parent)
+    index = children.index(node)
+    if preceding:
+        return children[:index][::-1]
+    return children[index + 1:]
+
+
+def _following(tree: _Tree, node) -> Iterator:
+    for ancestor in _ancestor_or_self(tree, node):
+        for sibling in _siblings(tree, ancestor, False):
+            yield from sibling.iter()
+
+
+def _preceding(tree: _Tree, node) -> Iterator:
+    for ancestor in _ancestor_or_self(tree, node):
+        for sibling in _siblings(tree, ancestor, True):
+            yield from reversed(list(sibling.iter()))
+
+
+_AXES = {
+    CHILD: _child,
+    DESCENDANT: _descendant,
+    DESCENDANT_OR_SELF: lambda tree, node: tree.root.iter() if node is tree else node.iter(),
+    PARENT: lambda tree, node: () if node is tree or tree.parent(node) is None else (tree.parent(node),),
+    ANCESTOR: lambda tree, node: () if node is tree else _ancestor_or_self(tree, tree.parent(node)),
+    ANCESTOR_OR_SELF: _ancestor_or_self,
+    FOLLOWING_SIBLING: lambda tree, node: _siblings(tree, node, False),
+    PRECEDING_SIBLING: lambda tree, node: _siblings(tree, node, True),
+    FOLLOWING: lambda tree, node: () if node is tree else _following(tree, node),
+    PRECEDING: lambda tree, node: () if node is tree else _preceding(tree, node),
+}
+
+
+def _compile_step_filter(step: Step) -> tuple:
+    """Compiles the filter of a step into a predicate, or into the position of the nodes it keeps.
+
+    Args:
+        step (Step): location step
+
+    Returns:
+        tuple: the predicate, or None, and the position, an int or "last()", or None
+    """
+    if step.filter is None:
+        return None, None
+    tree = _filter_tree(step.filter)
+    if _is_position(tree):
+        position = _position(tree)
+        return None, position if position == _LAST else int(position)
+    return _compile_filter_tree(tree), None
+
+
+def _position(tree: tuple) -> str:
+    operator, operands = tree
+    return operands if operator == ATOM else _position(operands[0])
+
+
+def _compile_filter_tree(tree: tuple) -> Callable:
+    operator, operands = tree
+    if operator == ATOM:
+        return _compile_atom(operands)
+    predicates = [_compile_filter_tree(operand) for operand in operands]
+    if len(predicates) == 1 and operator != NOT_OPERATOR:
+        return predicates[0]
+    if operator == AND_OPERATOR:
+        return lambda node: all(predicate(node) for predicate in predicates)
+    if operator == OR_OPERATOR:
+        return lambda node: any(predicate(node) for predicate in predicates)
+    return lambda node: not all(predicate(node) for predicate in predicates)
+
+
+def _compile_atom(predicate: str) -> Callable:
+    """Compiles a term of a filter into a function telling whether a node passes it, following the XPath rules
+    for comparisons: a comparison of a set of attributes or texts is true if it is true for one of them,
+    and with a number, or with an ordering operator, the values are compared as numbers.
+
+    Args:
+        predicate (str): term of a filter
+
+    Raises:
+        ValueError: when the term isn't one the filter methods build
+
+    Returns:
+        Callable: function returning true if the node given as argument passes the term
+    """
+    kind = predicate.kind if isinstance(predicate, Predicate) else None
+    if kind == ATTRIBUTE_IN and ":" not in predicate.operands[0]:
+        attribute, values = predicate.operands
+        return lambda node: not values.isdisjoint(_attribute_values(node, attribute))
+    if kind == VALUE_IN:
+        values, = predicate.operands
+        return lambda node: not values.isdisjoint(_iter_text(node))
+    if _POSITION_PATTERN.fullmatch(predicate) or predicate == _LAST:
+        # In a boolean expression, a number is true when it isn't zero
+        is_true = predicate == _LAST or int(predicate) != 0
+        return lambda node: is_true
+
+    match = _HAS_ATTRIBUTE_PATTERN.fullmatch(predicate)
+    if match:
+        attribute = match.group(1)
+        return lambda node: any(True for _ in _attribute_values(node, attribute))
+    match = _ATTRIBUTE_COMPARISON_PATTERN.fullmatch(predicate)
+    if match:
+        return _compile_comparison(lambda node, attribute=match.group(1): _attribute_values(node, attribute),
+                                   match.group(2), match.group(3), predicate)
+    match = _ATTRIBUTE_CONTAINS_PATTERN.fullmatch(predicate)
+    if match:
+        attribute, value = match.group(1), _string_literal(match.group(2), predicate)
+        # The string value of a set of attributes is the value of the first one
+        return lambda node: value in next(iter(_attribute_values(node, attribute)), "")
+    match = _TEXT_CONTAINS_PATTERN.fullmatch(predicate)
+    if match:
+        value = _string_literal(match.group(1), predicate)
+        return lambda node: any(value in text for text in _iter_text(node))
+    match = _TEXT_COMPARISON_PATTERN.fullmatch(predicate)
+    if match:
+        return _compile_comparison(_iter_text, match.group(1), match.group(2), predicate)
+    raise ValueError("ElementTree can't evaluate the filter " + repr(str(predicate)))
+
+
+def _compile_comparison(values: Callable, operator: str, operand: str, predicate: str) -> Callable:
+    comparison = _COMPARISONS[operator]
+    if operand.startswith(("'", '"', "concat(")):
+        operand = _string_literal(operand, predicate)
+        if operator in ("=", "!="):
+            return lambda node: any(comparison(value, operand) for value in values(node))
+        operand = _number(operand)
+    else:
+        try:
+            operand = float(operand)
+        except ValueError:
+            raise ValueError("ElementTree can't evaluate the filter " + repr(str(predicate)))
+    return lambda node: any(comparison(_number(value), operand) for value in values(node))
+
+
+def _string_literal(literal: str, predicate: str) -> str:
+    value = _literal_value(literal)
+    if value is None:
+        raise ValueError("ElementTree can't evaluate the filter " + repr(str(predicate)))
+    return value
+
+
+def _number(value: str) -> float:
+    # Like the XPath number() function, anything else than a plain decimal number is NaN
+    return float(value) if _NUMBER_PATTERN.fullmatch(value) else math.nan
+
+
+def _attribute_values(node, attribute: str) -> Iterable:
+    if attribute == ANY_ATTRIBUTE:
+        return node.attrib.values()
+    value = node.get(attribute)
+    return () if value is None else (value,)
+
+
+def _iter_text(node) -> Iterator:
+    if node.text:
+        yield node.text
+    for child in node:
+        if child.tail:
+            yield child.tail
+
+
+def _element_path(path: List[str]) -> Optional[str]:
+    """Returns the ElementPath expression selecting the same elements as a path, relative to the root element,
+    or None if there is none.
+    The first step is tested against the root element apart, as ElementPath can't select it. As ElementPath neither
+    sorts nor deduplicates the elements it selects, the path must be made of child steps, optionally followed
+    by a single descendant step: then every step selects disjoint subtrees, in document order.
+
+    Args:
+        path (list[str]): path of the query
+
+    Returns:
+        str: the ElementPath expression
+    """
+    steps = [fragment for fragment in path if fragment != ""]
+    if not steps or not all(isinstance(step, Step) for step in steps):
+        return None
+    axes = [step.axis for step in steps]
+    if not (axes == [DESCENDANT] or (axes[0] == CHILD and all(axis == CHILD for axis in axes[1:-1]) and
+                                     axes[-1] in (CHILD, DESCENDANT))):
+        return None
+
+    parts = []
+    for index, step in enumerate(steps):
+        part = _element_path_step(step)
+        if part is None:
+            return None
+        if step.axis == DESCENDANT:
+            parts.append(("//" if parts else ".//") + part)
+        elif index != 0:
+            parts.append(("/" if parts else "") + part)
+    return "".join(parts)
+
+
+def _element_path_step(step: Step) -> Optional[str]:
+    if step.svg_tag is not None or (step.tag is not None and not re.fullmatch(r"[_a-zA-Z][\w.-]*", step.tag)):
+        return None
+    node_test = "*" if step.tag is None else step.tag
+    if step.filter is None:
+        return node_test
+    tree = _filter_tree(step.filter)
+    if _is_position(tree):
+        # ElementPath counts the siblings with the same tag, which matches XPath only for a tag node test
+        return None if step.tag is None else node_test + "[" + _position(tree) + "]"
+
+    terms = []
+    operator, operands = tree
+    if operator == OR_OPERATOR and len(operands) == 1:
+        operator, operands = operands[0]
+    for operand in (operands if operator == AND_OPERATOR else [tree]):
+        term = _element_path_term(operand)
+        if term is None:
+            return None
+        terms.append(term)
+    return node_test + "".join(terms)
+
+
+def _element_path_term(tree: tuple) -> Optional[str]:
+    operator, predicate = tree
+    while operator in (AND_OPERATOR, OR_OPERATOR) and len(predicate) == 1:
+        operator, predicate = predicate[0]
+    if operator != ATOM or (isinstance(predicate, Predicate) and predicate.kind != ATOM):
+        return None
+    match = _HAS_ATTRIBUTE_PATTERN.fullmatch(predicate)
+    if match and match.group(1) != ANY_ATTRIBUTE:
+        return "[" + predicate + "]"
+    match = _ATTRIBUTE_COMPARISON_PATTERN.fullmatch(predicate)
+    if match and match.group(1) != ANY_ATTRIBUTE and match.group(2) == "=" and match.group(3).startswith(("'", '"')):
+        return "[" + predicate + "]"
+    return None
+
+
+def _compile_element_path(path: List[str], element_path: str) -> Callable:
+    steps = [fragment for fragment in path if fragment != ""]
+    first_step = steps[0]
+    matches_root = _compile_root_test(first_step)
+    if first_step.axis == DESCENDANT:
+        return lambda root: ([root] if matches_root(root) else []) + root.findall(element_path)
+    if len(steps) == 1:
+        return lambda root: [root] if matches_root(root) else []
+    return lambda root: root.findall(element_path) if matches_root(root) else []
+
+
+def _compile_root_test(step: Step) -> Callable:
+    node_test = _compile_node_test(step.tag, step.svg_tag)
+    predicate, position = _compile_step_filter(step)
+    # The root element is the only element child of the document
+    if position is not None and position not in (1, _LAST):
+        return lambda root: False
+    if predicate is None:
+        return node_test
+    return lambda root: node_test(root) and predicate(root)
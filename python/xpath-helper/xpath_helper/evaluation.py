@@ -0,0 +1,598 @@
+import functools
+import heapq
+import itertools
+import re
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from xpath_helper.filter import (ANY_ATTRIBUTE, AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR, ATTRIBUTE_IN, VALUE_IN,
+                                 Predicate, ValidExpressionFilter)
+from xpath_helper.step import (Limit, Step, Union, DESCENDANT, DESCENDANT_OR_SELF, CHILD, PARENT, ANCESTOR, ANCESTOR_OR_SELF,
+                               FOLLOWING, FOLLOWING_SIBLING, PRECEDING, PRECEDING_SIBLING, TEXT, FORWARD_AXES,
+                               PROJECTION_AXES)
+
+"""
+Evaluation of XPathHelper queries against lxml trees.
+Without budget, a query is evaluated in one call to the lxml engine. With a budget, or when its result is limited,
+the query is lazily evaluated step by step, so that the work done can be measured, the evaluation aborted as soon
+as a limit is exceeded, and stopped as soon as enough nodes are found.
+"""
+
+"""
+Number of visited nodes between two checks of the deadline.
+"""
+DEADLINE_CHECK_INTERVAL = 64
+
+COUNT = "count"
+BOOLEAN = "boolean"
+STRING = "string"
+
+_POSITION_PATTERN = re.compile(r"\d+")
+_NO_NODE = object()
+
+
+class Budget:
+    """
+    Limits of the work allowed to evaluate a query.
+    """
+
+    def __init__(self, max_visited_nodes: Optional[int] = None, max_results: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """Creates an instance of Budget.
+
+        Args:
+            max_visited_nodes (int): maximum number of nodes visited along the axes of the query
+            max_results (int): maximum number of nodes in the result
+            timeout (float): maximum duration of the evaluation, in seconds
+        """
+        self.max_visited_nodes = max_visited_nodes
+        self.max_results = max_results
+        self.timeout = timeout
+
+
+class EvaluationStatistics:
+    """
+    Work done by a step by step evaluation.
+    """
+
+    def __init__(self):
+        """Creates an instance of EvaluationStatistics.
+        """
+        self.visited_nodes = 0
+        self.selected_nodes = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return ("EvaluationStatistics(visited_nodes=" + str(self.visited_nodes) +
+                ", selected_nodes=" + str(self.selected_nodes) +
+                ", elapsed=" + str(self.elapsed) + ")")
+
+
+class BudgetExceededError(Exception):
+    """
+    Raised when the evaluation of a query exceeds its budget.
+    """
+
+    def __init__(self, limit: str, statistics: EvaluationStatistics):
+        """Creates an instance of BudgetExceededError.
+
+        Args:
+            limit (str): name of the exceeded limit of the budget
+            statistics (EvaluationStatistics): work done until the evaluation was aborted
+        """
+        super().__init__("Query evaluation exceeded its " + limit + " budget: " + repr(statistics))
+        self.limit = limit
+        self.statistics = statistics
+
+
+def evaluate(path: List[str], context, budget: Optional[Budget] = None) -> list:
+    """Evaluates the XPath query made of <code>path</code> against <code>context</code>.
+
+    Args:
+        path (list[str]): path of the query
+        context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+        budget (Budget): limits of the evaluation, unlimited if None
+
+    Raises:
+        BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+    Returns:
+        list: the selected nodes in document order
+    """
+    context = _resolve_document(context)
+    if budget is None and not _is_limited(path):
+        return context.xpath("".join(path) or ".", smart_strings=not _is_projection(path))
+    return list(iterate(path, context, budget))
+
+
+def iterate(path: List[str], context, budget: Optional[Budget] = None) -> Iterator:
+    """Lazily evaluates the XPath query made of <code>path</code> against <code>context</code>.
+    Nodes are produced in document order, and no more work is done than needed to produce the nodes consumed.
+
+    Args:
+        path (list[str]): path of the query
+        context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+        budget (Budget): limits of the evaluation, unlimited if None
+
+    Raises:
+        BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+    Returns:
+        Iterator: the selected nodes in document order
+    """
+    evaluation = _Evaluation(_resolve_document(context), budget or Budget())
+    # Like lxml, the document node reached by a parent step is left out of the selected nodes
+    return (node for node in evaluation.iterate(path) if node is not evaluation.document)
+
+
+def evaluate_function(function: str, path: List[str], context, budget: Optional[Budget] = None):
+    """Evaluates the XPath <code>function</code> applied to the nodes selected by <code>path</code>.
+    The selected nodes are never returned: count() and boolean() are computed while iterating over them,
+    and boolean() stops at the first one.
+
+    Args:
+        function (str): "count", "boolean" or "string"
+        path (list[str]): path of the query
+        context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+        budget (Budget): limits of the evaluation, unlimited if None
+
+    Raises:
+        BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+    Returns:
+        int | bool | str: the value of the function
+    """
+    context = _resolve_document(context)
+    if budget is None and not _is_limited(path):
+        value = context.xpath(function + "(" + "".join(path) + ")", smart_strings=False)
+        return int(value) if function == COUNT else value
+
+    evaluation = _Evaluation(context, budget or Budget())
+    nodes = evaluation.iterate(path)
+    if function == COUNT:
+        return sum(1 for _ in nodes)
+    if function == BOOLEAN:
+        return next(nodes, _NO_NODE) is not _NO_NODE
+    node = next(nodes, _NO_NODE)
+    if node is _NO_NODE:
+        return ""
+    if node is evaluation.document:
+        node = node.getroot()
+    return node if isinstance(node, str) else "".join(node.itertext())
+
+
+def _resolve_document(context):
+    # The document cache is only loaded when a raw document is evaluated
+    if hasattr(context, "xpath"):
+        return context
+    from xpath_helper.document import resolve_document
+    return resolve_document(context)
+
+
+class _Evaluation:
+    """
+    Step by step evaluation of a query within a budget.
+    Each unit of the path lazily consumes the nodes selected by the previous one.
+    """
+
+    def __init__(self, context, budget: Budget):
+        self.context = context
+        self.document = context if hasattr(context, "getroot") else context.getroottree()
+        self.budget = budget
+        self.statistics = EvaluationStatistics()
+        self.start = time.monotonic()
+        self.deadline = None if budget.timeout is None else self.start + budget.timeout
+        self.order = {}
+        self.positions = {}
+        self.predicates = {}
+
+    def iterate(self, path: List[str]) -> Iterator:
+        max_results = self.budget.max_results
+        statistics = self.statistics
+        for node in self.__iterate_path(path, self.context):
+            statistics.selected_nodes += 1
+            if max_results is not None and statistics.selected_nodes > max_results:
+                self.__exceed("max_results")
+            yield node
+        self.__check_deadline()
+        statistics.elapsed = time.monotonic() - self.start
+
+    def __iterate_path(self, path: List[str], context, smart_strings: bool = False) -> Iterator:
+        units = _split_units(path)
+        nodes = iter((context,))
+        for index, unit in enumerate(units):
+            if index == 0 and unit.startswith("/"):
+                nodes = iter((self.document,))
+            nodes = self.__iterate_unit(unit, nodes, index == 0, smart_strings)
+        return nodes
+
+    def __iterate_unit(self, unit: str, contexts: Iterator, is_first: bool, smart_strings: bool) -> Iterator:
+        if isinstance(unit, Limit):
+            return itertools.islice(self.__iterate_path(list(unit.path), self.context, smart_strings), unit.count)
+        if isinstance(unit, Union):
+            if _is_projection([unit]):
+                return itertools.chain.from_iterable(
+                    self.__iterate_path(list(branch), self.context, smart_strings) for branch in unit.branches)
+            # Strings merged with nodes are located through their parent, which only smart strings know
+            return self.__unite([self.__iterate_path(list(branch), self.context, True) for branch in unit.branches])
+        if not isinstance(unit, Step) or _needs_engine(unit) or (smart_strings and unit.axis in PROJECTION_AXES):
+            return self.__collect(contexts, lambda context: self.__select_with_engine(
+                unit, context, is_first, smart_strings), True)
+        if unit.axis in PROJECTION_AXES:
+            return self.__collect(contexts, lambda context: self.__visit(self.__project(unit, context)), True)
+        if unit.axis in FORWARD_AXES:
+            return self.__merge(contexts, lambda context: self.__select_step(unit, context))
+        return self.__collect(contexts, lambda context: self.__select_step(unit, context), False)
+
+    def __merge(self, contexts: Iterator, select) -> Iterator:
+        """Lazily merges in document order the nodes selected from each context along a forward axis.
+        As these nodes are never located before their context, a node can be produced as soon as
+        every context located before it has been taken into account.
+        """
+        first = next(contexts, None)
+        second = next(contexts, None)
+        if second is None:
+            if first is not None:
+                yield from select(first)
+            return
+
+        position = self.__position
+        counter = itertools.count()
+        heap = []
+
+        def push(nodes: Iterator):
+            node = next(nodes, None)
+            if node is not None:
+                heapq.heappush(heap, (position(node), next(counter), node, nodes))
+
+        pending = itertools.chain((first, second), contexts)
+        context = next(pending, None)
+        last_position = None
+        while True:
+            while context is not None and (not heap or position(context) <= heap[0][0]):
+                push(iter(select(context)))
+                context = next(pending, None)
+            if not heap:
+                return
+            node_position, _, node, nodes = heapq.heappop(heap)
+            if node_position != last_position:
+                last_position = node_position
+                yield node
+            push(nodes)
+
+    def __unite(self, branches: List[Iterator]) -> Iterator:
+        """Lazily merges in document order the nodes selected by each branch of a union."""
+        last_node = None
+        for node in heapq.merge(*branches, key=self.__node_position):
+            if node is not last_node:
+                last_node = node
+                yield node
+
+    def __collect(self, contexts: Iterator, select, in_document_order: bool) -> Iterator:
+        nodes = []
+        seen = set()
+        context_count = 0
+        for context in contexts:
+            context_count += 1
+            for node in select(context):
+                if isinstance(node, str):
+                    # Equal strings are distinct text or attribute nodes, and may even be the same object
+                    nodes.append(node)
+                elif node not in seen:
+                    seen.add(node)
+                    nodes.append(node)
+
+        if context_count > 1 or not in_document_order:
+            nodes = self.__sort(nodes)
+        yield from nodes
+
+    def __select_with_engine(self, unit: str, context, is_first: bool, smart_strings: bool) -> list:
+        # The first unit is evaluated from the document node when it is absolute, and from the context otherwise
+        expression = unit if is_first else "." + unit
+        nodes = context.xpath(expression, smart_strings=smart_strings or not _is_projection([unit]))
+        if not isinstance(nodes, list):
+            nodes = [nodes]
+        self.statistics.visited_nodes += len(nodes)
+        self.__check_visited_nodes()
+        self.__check_deadline()
+        return nodes
+
+    def __select_step(self, step: Step, context) -> Iterable:
+        candidates = (node for node in self.__visit(self.__axis(step.axis, context)) if _matches(step, node))
+        if step.filter is None:
+            return candidates
+
+        expression = str(step.filter)
+        if _POSITION_PATTERN.fullmatch(expression):
+            return itertools.islice(candidates, int(expression) - 1, int(expression))
+        if expression == "last()":
+            return list(candidates)[-1:]
+        predicate = self.predicates.get(expression)
+        if predicate is None:
+            predicate = self.predicates[expression] = _compile_filter(step.filter)
+        return (node for node in candidates if predicate(node))
+
+    def __project(self, step: Step, context) -> Iterable:
+        if context is self.document:
+            return ()
+        if step.axis == TEXT:
+            return _iter_text(context)
+        if step.tag == ANY_ATTRIBUTE:
+            return context.attrib.values()
+        value = context.get(step.tag)
+        return () if value is None else (value,)
+
+    def __visit(self, nodes: Iterable) -> Iterator:
+        statistics = self.statistics
+        for node in nodes:
+            statistics.visited_nodes += 1
+            self.__check_visited_nodes()
+            if statistics.visited_nodes % DEADLINE_CHECK_INTERVAL == 0:
+                self.__check_deadline()
+            yield node
+
+    def __axis(self, axis: str, node) -> Iterable:
+        if node is self.document:
+            return self.__document_axis(axis)
+        if axis == CHILD:
+            return node.iterchildren()
+        if axis == DESCENDANT:
+            return node.iterdescendants()
+        if axis == DESCENDANT_OR_SELF:
+            return itertools.chain((node,), node.iterdescendants())
+        if axis == PARENT:
+            parent = node.getparent()
+            # The parent of the root element is the document node
+            return (self.document if parent is None else parent,)
+        if axis == ANCESTOR:
+            return node.iterancestors()
+        if axis == ANCESTOR_OR_SELF:
+            return itertools.chain((node,), node.iterancestors())
+        if axis == FOLLOWING_SIBLING:
+            return node.itersiblings()
+        if axis == PRECEDING_SIBLING:
+            return node.itersiblings(preceding=True)
+        if axis == FOLLOWING:
+            return _iter_following(node)
+        return _iter_preceding(node)
+
+    def __document_axis(self, axis: str) -> Iterable:
+        root = self.document.getroot()
+        top_level = itertools.chain(reversed(list(root.itersiblings(preceding=True))), (root,), root.itersiblings())
+        if axis == CHILD:
+            return top_level
+        if axis in (DESCENDANT, DESCENDANT_OR_SELF):
+            return itertools.chain.from_iterable(node.iter() for node in top_level)
+        return ()
+
+    def __position(self, node) -> tuple:
+        """Returns a key ordering the nodes in document order: the indexes of the node and of its ancestors among
+        their siblings, from the top. Only the children of the parents met are indexed, never the whole document,
+        so that a query stopping after a few nodes doesn't pay for the size of the document.
+        """
+        positions = self.positions
+        key = positions.get(node)
+        if key is not None:
+            return key
+        if node is self.document:
+            return ()
+        # The ancestors without a key yet, from the node up
+        pending = []
+        while key is None:
+            pending.append(node)
+            node = node.getparent()
+            key = () if node is None else positions.get(node)
+        for node in reversed(pending):
+            key = positions[node] = key + (self.__index(node),)
+        return key
+
+    def __node_position(self, node) -> tuple:
+        """Returns a key ordering nodes and the strings selected with them in document order.
+        The attribute values of an element come right after it, then its text, then its children,
+        and its tail after all its descendants.
+        """
+        if not isinstance(node, str):
+            return self.__position(node)
+        parent = node.getparent()
+        if node.is_attribute:
+            return self.__position(parent) + (-2,)
+        if node.is_tail:
+            return self.__position(parent) + (float("inf"),)
+        return self.__position(parent) + (-1,)
+
+    def __index(self, node) -> int:
+        parent = node.getparent()
+        children = self.order.get(parent)
+        if children is None:
+            if parent is None:
+                # Comments and processing instructions can be siblings of the root element
+                root = self.document.getroot()
+                siblings = itertools.chain(reversed(list(root.itersiblings(preceding=True))), (root,),
+                                           root.itersiblings())
+            else:
+                siblings = parent.iterchildren()
+            children = self.order[parent] = {child: index for index, child in enumerate(siblings)}
+        return children.get(node, -1)
+
+    def __sort(self, nodes: list) -> list:
+        if any(isinstance(node, str) for node in nodes):
+            return nodes
+        return sorted(nodes, key=self.__position)
+
+    def __check_visited_nodes(self):
+        max_visited_nodes = self.budget.max_visited_nodes
+        if max_visited_nodes is not None and self.statistics.visited_nodes > max_visited_nodes:
+            self.__exceed("max_visited_nodes")
+
+    def __check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.__exceed("timeout")
+
+    def __exceed(self, limit: str):
+        self.statistics.elapsed = time.monotonic() - self.start
+        raise BudgetExceededError(limit, self.statistics)
+
+
+def _split_units(path: List[str]) -> List[str]:
+    """Splits a path into the units evaluated one after the other.
+    Fragments that do not start a new location path are merged with the previous unit.
+
+    Args:
+        path (list[str]): path of the query
+
+    Returns:
+        list[str]: units of the path
+    """
+    units = []
+    for fragment in path:
+        if not fragment:
+            continue
+        if units and not fragment.startswith("/"):
+            units[-1] = str(units[-1]) + fragment
+        else:
+            units.append(fragment)
+    return units
+
+
+def _is_limited(path: List[str]) -> bool:
+    return any(isinstance(fragment, Limit) for fragment in path)
+
+
+def _is_projection(path: List[str]) -> bool:
+    if not path:
+        return False
+    if isinstance(path[-1], Union):
+        return all(_is_projection(list(branch)) for branch in path[-1].branches)
+    return isinstance(path[-1], Step) and path[-1].axis in PROJECTION_AXES
+
+
+def _needs_engine(step: Step) -> bool:
+    """Returns true if the step has to be delegated to the lxml engine.
+    It is the case for tags with a namespace prefix, and for predicates depending on the position
+    of the node other than a plain index or last().
+
+    Args:
+        step (Step): location step
+
+    Returns:
+        bool: true if the step has to be evaluated by the lxml engine
+    """
+    if step.tag is not None and ":" in step.tag:
+        return True
+    if step.filter is None:
+        return False
+    expression = str(step.filter)
+    if _POSITION_PATTERN.fullmatch(expression) or expression == "last()":
+        # "//tag[1]" is the first tag child of each descendant, not the first descendant
+        return step.axis == DESCENDANT
+    return "position()" in expression or "last()" in expression
+
+
+def _matches(step: Step, node) -> bool:
+    """Returns true if <code>node</code> passes the node test of <code>step</code>.
+
+    Args:
+        step (Step): location step
+        node (lxml.etree._Element): node
+
+    Returns:
+        bool: true if the node passes the node test
+    """
+    tag = getattr(node, "tag", None)
+    if tag is None:
+        # Only the document node has no tag, and only parent steps, testing any node, select it
+        return step.axis == PARENT
+    if not isinstance(tag, str):
+        return False
+    if step.svg_tag is not None:
+        return tag.rpartition("}")[2] == step.svg_tag
+    return step.tag is None or tag == step.tag
+
+
+def _iter_text(node) -> Iterator:
+    if node.text is not None:
+        yield node.text
+    for child in node:
+        if child.tail is not None:
+            yield child.tail
+
+
+def _iter_following(node) -> Iterator:
+    while node is not None:
+        for sibling in node.itersiblings():
+            yield from sibling.iter()
+        node = node.getparent()
+
+
+def _iter_preceding(node) -> Iterator:
+    while node is not None:
+        for sibling in node.itersiblings(preceding=True):
+            yield from reversed(list(sibling.iter()))
+        node = node.getparent()
+
+
+def _compile_filter(filter: ValidExpressionFilter) -> Callable:
+    """Compiles a filter into a function telling whether a node passes it.
+    Set-membership terms are evaluated as hash-set lookups, the other terms by the lxml engine.
+
+    Args:
+        filter (Filter): filter
+
+    Returns:
+        Callable: function returning true if the node given as argument passes the filter
+    """
+    if not _has_membership(filter.sb):
+        return _compile_predicate(str(filter))
+
+    # As "and" has precedence over "or", "a or (b) and (c)" means "a or ((b) and (c))"
+    alternatives = []
+    for index, term in enumerate(filter.sb):
+        if index == 0 or not isinstance(term, Predicate) or term.kind not in (AND_OPERATOR, OR_OPERATOR):
+            if index != 0:
+                return _compile_predicate(str(filter))
+            alternatives.append([_compile_term(term)])
+        elif term.kind == OR_OPERATOR:
+            alternatives.append([_compile_term(term)])
+        else:
+            alternatives[-1].append(_compile_term(term))
+
+    if len(alternatives) == 1 and len(alternatives[0]) == 1:
+        return alternatives[0][0]
+    return lambda node: any(all(predicate(node) for predicate in terms) for terms in alternatives)
+
+
+def _compile_term(term: str) -> Callable:
+    kind = term.kind if isinstance(term, Predicate) else None
+    if kind == ATTRIBUTE_IN and ":" not in term.operands[0]:
+        attribute, values = term.operands
+        if attribute == ANY_ATTRIBUTE:
+            return lambda node: not values.isdisjoint(node.attrib.values())
+        return lambda node: node.get(attribute) in values
+    if kind == VALUE_IN:
+        values, = term.operands
+        return lambda node: not values.isdisjoint(_iter_text(node))
+    if kind in (AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR):
+        predicates = [_compile_filter(operand) for operand in term.operands]
+        if kind == AND_OPERATOR:
+            return lambda node: all(predicate(node) for predicate in predicates)
+        if kind == OR_OPERATOR:
+            return lambda node: any(predicate(node) for predicate in predicates)
+        return lambda node: not predicates[0](node)
+    return _compile_predicate(str(term))
+
+
+def _has_membership(terms: List[str]) -> bool:
+    for term in terms:
+        if isinstance(term, Predicate):
+            if term.kind in (ATTRIBUTE_IN, VALUE_IN):
+                return True
+            if term.kind in (AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR) and \
+                    any(_has_membership(operand.sb) for operand in term.operands):
+                return True
+    return False
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_predicate(expression: str):
+    from lxml import etree
+    return etree.XPath("boolean(" + expression + ")")
@@ -1,5 +1,8 @@
 import functools
-from typing import List, Optional
+import re
+import weakref
+from typing import FrozenSet, Iterable, List, Optional
+from xpath_helper.fingerprint import fingerprint
 
 """
 The following Filter classes provide a simple, chainable and decomposable api
@@ -12,13 +15,76 @@ Shortcut to design any attribute name
 ANY_ATTRIBUTE = "*"
 
 
+"""
+Kinds of the predicates built by the operators and the set-membership filters.
+"""
+AND_OPERATOR = "and_operator"
+OR_OPERATOR = "or_operator"
+NOT_OPERATOR = "not_operator"
+ATTRIBUTE_IN = "attribute_in"
+VALUE_IN = "value_in"
+
+"""
+Kind of the predicates built by the other filter methods.
+"""
+ATOM = "atom"
+
+_POSITION_PATTERN = re.compile(r"\d+|last\(\)")
+
+"""
+Delimiters tried, in order, to join the values of a set-membership filter into a single literal.
+"""
+MEMBERSHIP_DELIMITERS = ("|", ",", ";", "~", "^", "#", "\t")
+
+"""
+Interned predicates, by kind and expression. Predicates no query refers to anymore are dropped.
+"""
+_PREDICATES = weakref.WeakValueDictionary()
+
+
+"""
+Term of a filter expression.
+A predicate is the string of its XPath expression, but it also keeps the filter method it was built by
+and the operands it was built from.
+Predicates are interned: building the same predicate twice returns the same instance,
+so that a large catalog of queries shares the terms they have in common.
+"""
+
+
+class Predicate(str):
+    __slots__ = ('kind', 'operands', '__weakref__')
+
+    def __new__(cls, expression: str, kind: str, operands: tuple = ()) -> 'Predicate':
+        """Creates an instance of Predicate, or returns the interned one with the same kind and expression.
+
+        Args:
+            expression (str): XPath expression of the predicate
+            kind (str): name of the filter method building the predicate
+            operands (tuple): operands of the predicate
+
+        Returns:
+            Predicate: the new predicate
+        """
+        key = (kind, expression)
+        predicate = _PREDICATES.get(key)
+        if predicate is None:
+            predicate = super().__new__(cls, expression)
+            predicate.kind = kind
+            predicate.operands = operands
+            _PREDICATES[key] = predicate
+        return predicate
+
+    def __reduce__(self):
+        return (Predicate, (str(self), self.kind, self.operands))
+
+
 """
 XPath Filter containing a valid expression.
 """
 
 
 class ValidExpressionFilter:
-    sb: List[str] = []
+    __slots__ = ('sb',)
 
     def __init__(self, current_path: Optional[List[str]]=None):
         """Creates an instance of ValidExpressionFilter.
@@ -28,6 +94,8 @@ class ValidExpressionFilter:
         """
         if (current_path != None):
             self.sb = current_path
+        else:
+            self.sb = []
 
     def and_operator(self, *filters: 'EmptyFilter') -> 'ValidExpressionFilter':
         """Adds one or more filter expression to the current one with the AND logical operator.
@@ -43,10 +111,10 @@ class ValidExpressionFilter:
             expression += " and "
 
         expression += "("
-        expression += functools.reduce(lambda acc, filter: acc + add_openrand(
-            filter, " and ", filter == filters[-1]), filters, "")
+        expression += functools.reduce(lambda acc, indexed_filter: acc + add_openrand(
+            indexed_filter[1], " and ", indexed_filter[0] == len(filters) - 1), enumerate(filters), "")
         expression += ")"
-        return ValidExpressionFilter(self.sb + [expression])
+        return ValidExpressionFilter(self.sb + [Predicate(expression, AND_OPERATOR, snapshot(filters))])
 
     def or_operator(self, *filters: 'EmptyFilter') -> 'ValidExpressionFilter':
         """Adds one or more filter expression to the current one with the OR logical operator.
@@ -62,10 +130,10 @@ class ValidExpressionFilter:
             expression += " or "
 
         expression += "("
-        expression += functools.reduce(lambda acc, filter: acc + add_openrand(
-            filter, " or ", filter == filters[-1]), filters, "")
+        expression += functools.reduce(lambda acc, indexed_filter: acc + add_openrand(
+            indexed_filter[1], " or ", indexed_filter[0] == len(filters) - 1), enumerate(filters), "")
         expression += ")"
-        return ValidExpressionFilter(self.sb + [expression])
+        return ValidExpressionFilter(self.sb + [Predicate(expression, OR_OPERATOR, snapshot(filters))])
 
     def __str__(self):
         """Returns the Filter as a valid XPath filter expression.
@@ -75,6 +143,64 @@ class ValidExpressionFilter:
         """
         return "".join(self.sb)
 
+    def __eq__(self, other: object) -> bool:
+        """Returns true if <code>other</code> is a filter with the same XPath expression.
+
+        Args:
+            other (object): object to compare with
+
+        Returns:
+            bool: true if both filters have the same expression
+        """
+        if not isinstance(other, ValidExpressionFilter):
+            return NotImplemented
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        """Returns the hash of the XPath expression of the filter.
+        A filter used as a dictionary key must not be emptied afterwards.
+
+        Returns:
+            int: hash of the filter
+        """
+        return hash(str(self))
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the filter.
+        Equivalent filters whose operands are written in a different order, duplicated or nested in the same operator
+        have the same canonical expression.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        tree = _filter_tree(self)
+        expression = _render_tree(tree)
+        if _POSITION_PATTERN.fullmatch(expression) and not _is_position(tree):
+            # An operator converts a position into a boolean, the canonical expression has to as well
+            return "boolean(" + expression + ")"
+        return expression
+
+    def minify(self) -> str:
+        """Returns the shortest equivalent XPath expression of the filter: without the parentheses
+        the operators don't need, duplicated operands, and spaces the expression doesn't need.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        tree = _filter_tree(self)
+        expression = _render_minified_tree(tree)
+        if _POSITION_PATTERN.fullmatch(expression) and not _is_position(tree):
+            return "boolean(" + expression + ")"
+        return expression
+
+    def fingerprint(self) -> str:
+        """Returns the fingerprint of the canonical XPath expression of the filter.
+
+        Returns:
+            str: fingerprint of the filter
+        """
+        return fingerprint(self.canonical())
+
     def empty(self):
         """Empties the current path.
         """
@@ -95,6 +221,8 @@ Empty XPath filter.
 
 
 class EmptyFilter(ValidExpressionFilter):
+    __slots__ = ()
+
     def __init__(self, currentPath=None):
         """Creates an instance of Filter.
 
@@ -112,7 +240,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute, ATOM)])
 
     def attribute_contains(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code> containing the value <code><value</code>.
@@ -124,8 +252,8 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["contains(@" + attribute + ", " + replace_apostrophes(value) + ")",
-                                                ])
+        return ValidExpressionFilter(self.sb + [Predicate("contains(@" + attribute + ", " + replace_apostrophes(value) + ")",
+                                                          ATOM)])
 
     def attribute_equals(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value equals <code><value</code>.
@@ -137,8 +265,8 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + "=" + replace_apostrophes(value) + "",
-                                                ])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + "=" + replace_apostrophes(value) + "",
+                                                          ATOM)])
 
     def attribute_not_equals(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value doesn't equal <code><value</code>.
@@ -150,7 +278,8 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + "!=" + replace_apostrophes(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + "!=" + replace_apostrophes(value),
+                                                          ATOM)])
 
     def attribute_less_than(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value is less than <code><value<code>.
@@ -162,7 +291,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + "<" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + "<" + str(value), ATOM)])
 
     def attribute_less_than_or_equal_to(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value is less than or equal to <code><value</code>.
@@ -174,7 +303,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + "<=" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + "<=" + str(value), ATOM)])
 
     def attribute_greater_than(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value is greater than <code><value</code>.
@@ -186,7 +315,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + ">" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + ">" + str(value), ATOM)])
 
     def attribute_greater_than_or_equal_to(self, attribute: str, value: str) -> ValidExpressionFilter:
         """Selects the nodes with the attribute <code>attribute</code>, whose value is greater than or equal to <code><value</code>.
@@ -198,7 +327,24 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["@" + attribute + ">=" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + ">=" + str(value), ATOM)])
+
+    def attribute_in(self, attribute: str, values: Iterable[str]) -> ValidExpressionFilter:
+        """Selects the nodes with the attribute <code>attribute</code>, whose value is one of <code>values</code>.
+        Values are compared as strings. The values are joined into a single literal, so the expression stays compact
+        however many values there are. lxml scans that literal for each node; only the budgeted and limited
+        evaluations look the values up in a set.
+
+        Args:
+            attribute (str): attribute name
+            values (list[str | int | float]): attribute values
+
+        Returns:
+            ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
+        """
+        values = frozenset(str(value) for value in values)
+        return ValidExpressionFilter(self.sb + [Predicate("@" + attribute + render_membership(values), ATTRIBUTE_IN,
+                                                          (attribute, values))])
 
     def value_contains(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes containing the value <code><value</code>.
@@ -209,7 +355,8 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text()[contains(., " + replace_apostrophes(value) + ")]"])
+        return ValidExpressionFilter(self.sb + [Predicate("text()[contains(., " + replace_apostrophes(value) + ")]",
+                                                          ATOM)])
 
     def value_equals(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes whose value equals <code><value</code>.
@@ -220,7 +367,22 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() = " + replace_apostrophes(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() = " + replace_apostrophes(value), ATOM)])
+
+    def value_in(self, values: Iterable[str]) -> ValidExpressionFilter:
+        """Selects the nodes whose value is one of <code>values</code>.
+        Values are compared as strings. The values are joined into a single literal, so the expression stays compact
+        however many values there are. lxml scans that literal for each node; only the budgeted and limited
+        evaluations look the values up in a set.
+
+        Args:
+            values (list[str | int | float]): values
+
+        Returns:
+            ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
+        """
+        values = frozenset(str(value) for value in values)
+        return ValidExpressionFilter(self.sb + [Predicate("text()" + render_membership(values), VALUE_IN, (values,))])
 
     def value_not_equals(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes with whose value doesn't equal <code><value</code>.
@@ -231,7 +393,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() !=" + replace_apostrophes(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() !=" + replace_apostrophes(value), ATOM)])
 
     def value_less_than(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes whose value is less than <code><value</code>.
@@ -242,7 +404,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() <" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() <" + str(value), ATOM)])
 
     def value_less_than_or_equal_to(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes whose value is less than or equal to <code><value</code>.
@@ -253,7 +415,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() <=" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() <=" + str(value), ATOM)])
 
     def value_greater_than(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes  whose value is greater than <code><value</code>.
@@ -264,7 +426,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() >" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() >" + str(value), ATOM)])
 
     def value_greater_than_or_equal_to(self, value: str) -> ValidExpressionFilter:
         """Selects the nodes whose value is greater than or equal to <code><value</code>.
@@ -275,7 +437,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["text() >=" + str(value)])
+        return ValidExpressionFilter(self.sb + [Predicate("text() >=" + str(value), ATOM)])
 
     def get(self, index: int):
         """Selects the node element who is positioned at the <code>index</code> position in its parent children list.
@@ -286,7 +448,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + [str(index)])
+        return ValidExpressionFilter(self.sb + [Predicate(str(index), ATOM)])
 
     def get_first(self):
         """Selects the node element who is positioned first in its parent children list.
@@ -294,7 +456,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["1"])
+        return ValidExpressionFilter(self.sb + [Predicate("1", ATOM)])
 
     def get_last(self):
         """Selects the node element who is positioned last in its parent children list.
@@ -302,7 +464,7 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["last()"])
+        return ValidExpressionFilter(self.sb + [Predicate("last()", ATOM)])
 
     def not_operator(self, filter: ValidExpressionFilter):
         """Reverses the filter <code>filter</code>. Returns true when the filter returns false and true when the filter returns false.
@@ -313,7 +475,8 @@ class EmptyFilter(ValidExpressionFilter):
         Returns:
             ValidExpressionFilter: a new instance of ValidExpressionFilter with the newly formed expression.
         """
-        return ValidExpressionFilter(self.sb + ["not( " + add_openrand(filter) + " )"])
+        return ValidExpressionFilter(self.sb + [Predicate("not( " + add_openrand(filter) + " )", NOT_OPERATOR,
+                                                          snapshot([filter]))])
 
 
 def add_openrand(filter: EmptyFilter, separator="", is_last: Optional[bool] = True) -> str:
@@ -336,8 +499,173 @@ def add_openrand(filter: EmptyFilter, separator="", is_last: Optional[bool] = Tr
     return suffix
 
 
+def snapshot(filters: Iterable[ValidExpressionFilter]) -> tuple:
+    """Copies filters, so that emptying them afterwards doesn't alter the expression built from them.
+
+    Args:
+        filters (list[Filter]): filters
+
+    Returns:
+        tuple: copies of the filters
+    """
+    return tuple(ValidExpressionFilter(filter.sb) for filter in filters if filter)
+
+
+def render_membership(values: FrozenSet[str]) -> str:
+    """Returns the predicate selecting the context nodes whose string value is one of <code>values</code>.
+    Values are joined with a delimiter they don't contain, so that a single contains() call tests the membership.
+    A string value containing the delimiter could match across two joined values, so it is excluded.
+
+    Args:
+        values (frozenset[str]): values
+
+    Returns:
+        str: XPath predicate
+    """
+    if not values:
+        return "[false()]"
+    ordered_values = sorted(values)
+    for delimiter in MEMBERSHIP_DELIMITERS:
+        if not any(delimiter in value for value in ordered_values):
+            joined_values = delimiter + delimiter.join(ordered_values) + delimiter
+            quoted_delimiter = replace_apostrophes(delimiter)
+            return ("[contains(" + replace_apostrophes(joined_values) + ", concat(" + quoted_delimiter + ", ., " +
+                    quoted_delimiter + ")) and not(contains(., " + quoted_delimiter + "))]")
+    return "[" + " or ".join(". = " + replace_apostrophes(value) for value in ordered_values) + "]"
+
+
+def _filter_tree(filter: ValidExpressionFilter) -> tuple:
+    """Returns the boolean expression tree of a filter, made of (operator, operands) tuples.
+
+    Args:
+        filter (Filter): filter
+
+    Returns:
+        tuple: expression tree of the filter
+    """
+    # As "and" has precedence over "or", "a or (b) and (c)" means "a or ((b) and (c))"
+    alternatives = []
+    for index, term in enumerate(filter.sb):
+        kind = term.kind if isinstance(term, Predicate) else None
+        if index != 0 and kind not in (AND_OPERATOR, OR_OPERATOR):
+            return (ATOM, str(filter))
+        if index == 0 or kind == OR_OPERATOR:
+            alternatives.append([])
+        alternatives[-1].append(_term_tree(term))
+
+    return (OR_OPERATOR, tuple((AND_OPERATOR, tuple(terms)) for terms in alternatives))
+
+
+def _term_tree(term: str) -> tuple:
+    kind = term.kind if isinstance(term, Predicate) else None
+    if kind in (AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR):
+        return (kind, tuple(_filter_tree(operand) for operand in term.operands))
+    # Atoms keep their predicate, which tells the filter method they were built by
+    return (ATOM, term)
+
+
+def _is_position(tree: tuple) -> bool:
+    operator, operands = tree
+    if operator == ATOM:
+        return bool(_POSITION_PATTERN.fullmatch(operands))
+    return operator in (AND_OPERATOR, OR_OPERATOR) and len(operands) == 1 and _is_position(operands[0])
+
+
+def _render_tree(tree: tuple) -> str:
+    """Renders an expression tree with its operands flattened, deduplicated and sorted.
+
+    Args:
+        tree (tuple): expression tree
+
+    Returns:
+        str: XPath expression
+    """
+    operator, operands = tree
+    if operator == ATOM:
+        return operands
+    if operator == NOT_OPERATOR:
+        return "not(" + " and ".join(sorted(set(_render_tree(operand) for operand in operands))) + ")"
+
+    expressions = set()
+    for operand in _flatten(tree, operator):
+        expression = _render_tree(operand)
+        if operator == AND_OPERATOR and _flatten(operand, OR_OPERATOR) != [operand]:
+            expression = "(" + expression + ")"
+        expressions.add(expression)
+    separator = " and " if operator == AND_OPERATOR else " or "
+    return separator.join(sorted(expressions))
+
+
+def _render_minified_tree(tree: tuple, parent_operator: Optional[str] = None) -> str:
+    """Renders an expression tree with the fewest parentheses, keeping the order of its operands.
+
+    Args:
+        tree (tuple): expression tree
+        parent_operator (str): operator of the parent tree, None at the top of the expression
+
+    Returns:
+        str: XPath expression
+    """
+    operator, operands = tree
+    if operator == ATOM:
+        expression = minify_expression(operands)
+        if parent_operator == AND_OPERATOR and " or " in expression:
+            return "(" + expression + ")"
+        return expression
+    if operator == NOT_OPERATOR:
+        return "not(" + " and ".join(_render_minified_tree(operand, AND_OPERATOR) for operand in operands) + ")"
+
+    flattened_operator = operator if len(operands) > 1 else None
+    expressions = []
+    for operand in _flatten(tree, operator):
+        expression = _render_minified_tree(operand, flattened_operator or parent_operator)
+        if expression not in expressions:
+            expressions.append(expression)
+    separator = " and " if operator == AND_OPERATOR else " or "
+    expression = separator.join(expressions)
+    if len(expressions) > 1 and operator == OR_OPERATOR and parent_operator == AND_OPERATOR:
+        return "(" + expression + ")"
+    return expression
+
+
+"""
+Characters after which, or before which, the spaces of an expression are useless.
+"""
+_SPACE_PATTERN = re.compile(r"""('[^']*'|"[^"]*")|\s+(?=[)\]=!<>,|])|(?<=[(\[=<>,|])\s+""")
+
+
+def minify_expression(expression: str) -> str:
+    """Removes the spaces of an XPath expression next to brackets, commas and comparison operators,
+    outside of its literals.
+
+    Args:
+        expression (str): XPath expression
+
+    Returns:
+        str: the expression without its useless spaces
+    """
+    return _SPACE_PATTERN.sub(lambda match: match.group(1) or "", expression)
+
+
+def _flatten(tree: tuple, operator: str) -> list:
+    """Returns the operands of nested <code>operator</code> trees, and of single-operand trees.
+
+    Args:
+        tree (tuple): expression tree
+        operator (str): AND_OPERATOR or OR_OPERATOR
+
+    Returns:
+        list: the operands
+    """
+    if tree[0] in (AND_OPERATOR, OR_OPERATOR) and (tree[0] == operator or len(tree[1]) == 1):
+        return [operand for child in tree[1] for operand in _flatten(child, operator)]
+    return [tree]
+
+
 def replace_apostrophes(input: str) -> str:
     """Treats the presence of apostrophes so it doesn't break the XPath filter expression.
+    The literal is quoted with apostrophes, or with double quotes if it contains apostrophes. When it contains both,
+    it is split into the fewest possible parts, each quoted with the character it doesn't contain, joined by concat().
 
     Args:
         input (str | int): input
@@ -347,17 +675,41 @@ def replace_apostrophes(input: str) -> str:
     """
     if not isinstance(input, str):
         return str(input)
+    return _quote(input)
+
+
+"""
+Maximum number of literals whose quoted expression is kept by replace_apostrophes.
+"""
+QUOTE_CACHE_SIZE = 4096
 
-    if "'" in input:
-        prefix: str = ""
-        elements = input.split("'")
-        output = "concat("
-        for s in elements:
-            output += prefix + "'" + s + "'"
-            prefix = ',"\'",'
+_QUOTE_PATTERN = re.compile("['\"]")
 
-        output += ")"
-        return output
 
-    else:
+@functools.lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _quote(input: str) -> str:
+    if "'" not in input:
         return "'" + input + "'"
+    if '"' not in input:
+        return '"' + input + '"'
+
+    # Each part is extended as long as it doesn't contain both quote characters,
+    # which gives the fewest parts in a single pass
+    parts = []
+    start = 0
+    apostrophe = quote = False
+    for match in _QUOTE_PATTERN.finditer(input):
+        index, character = match.start(), match.group()
+        if character == "'":
+            if quote:
+                parts.append("'" + input[start:index] + "'")
+                start, quote = index, False
+            apostrophe = True
+        elif character == '"':
+            if apostrophe:
+                parts.append('"' + input[start:index] + '"')
+                start, apostrophe = index, False
+            quote = True
+    last_part = input[start:]
+    parts.append('"' + last_part + '"' if apostrophe else "'" + last_part + "'")
+    return "concat(" + ", ".join(parts) + ")"
@@ -0,0 +1,18 @@
+"""
+Fingerprints identify queries by their canonical XPath expression.
+Unlike the built-in hash of strings, they are the same across processes and runs, so they can be used as cache keys
+and stored on disk.
+"""
+
+
+def fingerprint(canonical_expression: str) -> str:
+    """Returns the fingerprint of a canonical XPath expression.
+
+    Args:
+        canonical_expression (str): canonical XPath expression
+
+    Returns:
+        str: 32 hexadecimal characters fingerprint
+    """
+    import hashlib
+    return hashlib.blake2b(canonical_expression.encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,190 @@
+import contextlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from xpath_helper.aggregate import Aggregate
+from xpath_helper.evaluation import Budget, STRING
+from xpath_helper.step import Limit, Step, Union, ATTRIBUTE, PARENT, TEXT
+from xpath_helper.xpath_helper import XPathHelper
+
+"""
+Incremental evaluation of a QuerySet against a tree changing in small places.
+After a change, only the queries whose node tests match a node of the changed subtrees, before or after
+the change, are evaluated again. The other ones keep their previous result.
+
+A change must be confined to a subtree: the root of a changed subtree stays in place, but its attributes,
+its text, its tail and its descendants can change. The steps of a query test the names of nodes, and its filters
+look at the attributes and the text children of the nodes tested. The tail of the root is a text child of its
+parent, so such a change can only alter the result of a query testing the name of one of the nodes of the subtree,
+or of the parent of its root. Queries whose result depends on any node, like the ones with wildcard steps
+or string values, are evaluated again after every change.
+"""
+
+"""
+Names of the nodes of changed subtrees: their tags, and their local names.
+"""
+NodeNames = Tuple[frozenset, frozenset]
+
+
+class IncrementalEvaluation:
+    """
+    Results of the queries of a QuerySet against a tree, kept up to date as the tree changes.
+    """
+
+    def __init__(self, queries, document, budget: Optional[Budget] = None):
+        """Creates an instance of IncrementalEvaluation, evaluating all the queries.
+
+        Args:
+            queries (QuerySet): queries to evaluate
+            document (lxml.etree._Element | lxml.etree._ElementTree): node in reference
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+        """
+        self.queries = queries
+        self.document = document
+        self.budget = budget
+        self.results = queries.evaluate(document, budget)
+        self.__dependencies = {}
+
+    def affected(self, subtrees: Iterable, previous_names: Optional[NodeNames] = None) -> List[str]:
+        """Returns the names of the queries whose result can be altered by the changes of <code>subtrees</code>.
+
+        Args:
+            subtrees (list[lxml.etree._Element]): roots of the changed subtrees
+            previous_names (tuple[frozenset, frozenset]): names of the nodes of the subtrees before the change,
+                as returned by <code>node_names</code>
+
+        Returns:
+            list[str]: the names of the affected queries
+        """
+        tags, local_names = node_names(subtrees)
+        if previous_names is not None:
+            tags, local_names = tags | previous_names[0], local_names | previous_names[1]
+        if not tags:
+            return [name for name in self.queries if name not in self.results]
+
+        affected = []
+        for name, query in self.queries.items():
+            dependencies = self.__dependencies_of(name, query)
+            if (name not in self.results or dependencies is None or
+                    not tags.isdisjoint(dependencies[0]) or not local_names.isdisjoint(dependencies[1])):
+                affected.append(name)
+        return affected
+
+    def refresh(self, subtrees: Iterable, previous_names: Optional[NodeNames] = None) -> List[str]:
+        """Evaluates again the queries whose result can be altered by the changes of <code>subtrees</code>.
+        The names of the nodes the subtrees contained before the change are needed when nodes were removed or renamed.
+
+        Args:
+            subtrees (list[lxml.etree._Element]): roots of the changed subtrees
+            previous_names (tuple[frozenset, frozenset]): names of the nodes of the subtrees before the change,
+                as returned by <code>node_names</code>
+
+        Raises:
+            BudgetExceededError: when the evaluation of a query exceeds the budget
+
+        Returns:
+            list[str]: the names of the evaluated queries
+        """
+        subtrees = list(subtrees)
+        affected = self.affected(subtrees, previous_names)
+        for name in affected:
+            self.results[name] = self.queries[name].evaluate(self.document, self.budget)
+        for name in [name for name in self.results if name not in self.queries]:
+            del self.results[name]
+        return affected
+
+    @contextlib.contextmanager
+    def editing(self, *subtrees) -> Iterator[List[str]]:
+        """Returns a context in which <code>subtrees</code> are changed. When the context exits,
+        the queries affected by the changes are evaluated again.
+
+        Args:
+            subtrees (lxml.etree._Element): roots of the subtrees to change
+
+        Returns:
+            Iterator[list[str]]: context providing the list filled with the names of the evaluated queries on exit
+        """
+        previous_names = node_names(subtrees)
+        refreshed = []
+        yield refreshed
+        refreshed.extend(self.refresh(subtrees, previous_names))
+
+    def __dependencies_of(self, name: str, query) -> Optional[NodeNames]:
+        cached = self.__dependencies.get(name)
+        if cached is None or cached[0] is not query:
+            cached = (query, dependencies(query))
+            self.__dependencies[name] = cached
+        return cached[1]
+
+
+def node_names(subtrees: Iterable) -> NodeNames:
+    """Returns the tags and the local names of the elements of <code>subtrees</code>, and of the parents
+    of their roots, which hold the tails of the roots as text children.
+
+    Args:
+        subtrees (list[lxml.etree._Element]): roots of the subtrees
+
+    Returns:
+        tuple[frozenset, frozenset]: the tags and the local names
+    """
+    tags = set()
+    for subtree in subtrees:
+        parent = subtree.getparent()
+        if parent is not None and isinstance(parent.tag, str):
+            tags.add(parent.tag)
+        for node in subtree.iter():
+            if isinstance(node.tag, str):
+                tags.add(node.tag)
+    return frozenset(tags), frozenset(tag.rpartition("}")[2] for tag in tags)
+
+
+def dependencies(query) -> Optional[NodeNames]:
+    """Returns the names tested by the steps of <code>query</code>: its tags, and its local names tested by SVG steps
+    or by prefixed tags. A query whose result can change whatever the node changed has no dependencies.
+
+    Args:
+        query (XPathHelper | Aggregate): query
+
+    Returns:
+        tuple[frozenset, frozenset]: the tags and the local names, or None if the query depends on any node
+    """
+    if isinstance(query, Aggregate):
+        if query.function == STRING:
+            # The string value of a node includes the text of all its descendants
+            return None
+        path = query.path
+    elif isinstance(query, XPathHelper):
+        path = query.sb
+    else:
+        # Queries loaded from a catalog are plain expressions
+        return None
+
+    tags = set()
+    local_names = set()
+    if not _collect_dependencies(path, tags, local_names):
+        return None
+    return frozenset(tags), frozenset(local_names)
+
+
+def _collect_dependencies(path: Iterable[str], tags: set, local_names: set) -> bool:
+    for fragment in path:
+        if isinstance(fragment, Limit):
+            if not _collect_dependencies(fragment.path, tags, local_names):
+                return False
+        elif isinstance(fragment, Union):
+            if not all(_collect_dependencies(branch, tags, local_names) for branch in fragment.branches):
+                return False
+        elif isinstance(fragment, Step):
+            if fragment.axis in (PARENT, TEXT, ATTRIBUTE):
+                continue
+            if fragment.svg_tag is not None:
+                local_names.add(fragment.svg_tag)
+            elif fragment.tag is None:
+                return False
+            elif ":" in fragment.tag:
+                local_names.add(fragment.tag.rpartition(":")[2])
+            else:
+                tags.add(fragment.tag)
+        elif fragment:
+            # Expressions written by hand can't be analysed
+            return False
+    return True
@@ -0,0 +1,158 @@
+import functools
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from xpath_helper.aggregate import Aggregate
+from xpath_helper.evaluation import Budget, _resolve_document
+from xpath_helper.incremental import IncrementalEvaluation
+from xpath_helper.xpath_helper import XPathHelper
+
+"""
+QuerySet registers named queries, to be evaluated together against the same documents.
+"""
+
+Query = Union[XPathHelper, Aggregate]
+
+
+class QuerySet:
+    """
+    Named queries, in registration order.
+    """
+
+    def __init__(self, queries: Optional[Dict[str, Query]] = None):
+        """Creates an instance of QuerySet.
+
+        Args:
+            queries (dict[str, XPathHelper | Aggregate]): queries by name
+        """
+        self.queries = OrderedDict()
+        for name, query in (queries or {}).items():
+            self.add(name, query)
+
+    def add(self, name: str, query: Query) -> 'QuerySet':
+        """Registers <code>query</code> under <code>name</code>, replacing the query already registered with this name.
+
+        Args:
+            name (str): name of the query
+            query (XPathHelper | Aggregate): query
+
+        Returns:
+            QuerySet: this query set
+        """
+        self.queries[name] = query
+        return self
+
+    def __getitem__(self, name: str) -> Query:
+        return self.queries[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.queries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.queries)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def items(self) -> Iterator[Tuple[str, Query]]:
+        """Returns the registered queries with their names.
+
+        Returns:
+            Iterator[tuple[str, XPathHelper | Aggregate]]: the names and queries
+        """
+        return iter(self.queries.items())
+
+    def evaluate(self, document, budget: Optional[Budget] = None) -> Dict[str, object]:
+        """Evaluates all the queries against <code>document</code>.
+
+        Args:
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation of a query exceeds <code>budget</code>
+
+        Returns:
+            dict[str, list | int | bool | str]: results by query name
+        """
+        # A raw document is resolved once, rather than hashed again for each query
+        document = _resolve_document(document)
+        return OrderedDict((name, query.evaluate(document, budget)) for name, query in self.items())
+
+    def evaluate_records(self, document, attributes: Optional[Iterable[str]] = None,
+                         budget: Optional[Budget] = None) -> Dict[str, object]:
+        """Evaluates all the queries against <code>document</code>, and returns compact records of the selected elements
+        instead of the elements. A raw document is parsed once, without the document cache, so its tree is freed
+        as soon as the records are built.
+
+        Args:
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+            attributes (list[str]): names of the attributes copied in the records, all of them if None
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation of a query exceeds <code>budget</code>
+
+        Returns:
+            dict[str, list[NodeRecord | str] | int | bool | str]: results by query name
+        """
+        from xpath_helper.records import parse_uncached, to_records
+        results = self.evaluate(parse_uncached(document), budget)
+        for name, result in results.items():
+            if isinstance(result, list):
+                results[name] = to_records(result, attributes)
+        return results
+
+    async def aevaluate(self, document, budget: Optional[Budget] = None, executor=None) -> Dict[str, object]:
+        """Evaluates all the queries against <code>document</code> in an executor, without blocking the event loop.
+
+        Args:
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+            executor (concurrent.futures.Executor): executor evaluating the queries, the default executor of the event loop if None
+
+        Raises:
+            BudgetExceededError: when the evaluation of a query exceeds <code>budget</code>
+
+        Returns:
+            dict[str, list | int | bool | str]: results by query name
+        """
+        from xpath_helper.concurrency import run_in_executor
+        return await run_in_executor(self.evaluate, document, budget, executor=executor)
+
+    async def aevaluate_many(self, documents: Iterable, budget: Optional[Budget] = None, executor=None,
+                             concurrency: Optional[int] = None, chunk_size: Optional[int] = None) -> List[Dict[str, object]]:
+        """Evaluates all the queries against each document in an executor, without blocking the event loop.
+        Documents are evaluated by chunks, one executor task each, and at most <code>concurrency</code> chunks
+        are submitted at the same time. Cancelling the evaluation stops it before the next document.
+
+        Args:
+            documents (Iterable[bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree]): documents
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+            executor (concurrent.futures.Executor): executor evaluating the queries, the default executor of the event loop if None.
+                With a process pool, the documents must be raw and the queries must return no element.
+            concurrency (int): maximum number of chunks evaluated at the same time, DEFAULT_CONCURRENCY if None
+            chunk_size (int): number of documents of a chunk, DEFAULT_CHUNK_SIZE if None
+
+        Raises:
+            BudgetExceededError: when the evaluation of a query exceeds <code>budget</code>
+
+        Returns:
+            list[dict[str, list | int | bool | str]]: results by query name, for each document in order
+        """
+        from xpath_helper.concurrency import DEFAULT_CHUNK_SIZE, DEFAULT_CONCURRENCY, map_in_chunks
+        return await map_in_chunks(functools.partial(self.evaluate, budget=budget), documents, executor,
+                                   concurrency or DEFAULT_CONCURRENCY, chunk_size or DEFAULT_CHUNK_SIZE)
+
+    def incremental(self, document, budget: Optional[Budget] = None) -> IncrementalEvaluation:
+        """Evaluates all the queries against <code>document</code>, and keeps the results up to date
+        by re-evaluating only the queries affected by the changes of the document.
+
+        Args:
+            document (lxml.etree._Element | lxml.etree._ElementTree): node in reference
+            budget (Budget): limits of the evaluation of each query, unlimited if None
+
+        Returns:
+            IncrementalEvaluation: the evaluation of the queries
+        """
+        return IncrementalEvaluation(self, document, budget)
@@ -0,0 +1,122 @@
+import json
+from collections import namedtuple
+from typing import IO, Iterable, Optional
+
+"""
+Compact records of the elements selected by queries.
+Elements pin their whole tree in memory and can't be pickled: a record copies what is needed of an element,
+its tag, attributes, text, source line and path, so that the tree can be freed as soon as the records are built,
+and the records sent to other processes or written to JSONL files.
+"""
+
+
+class NodeRecord(namedtuple('NodeRecord', ['tag', 'attributes', 'text', 'line', 'path'])):
+    """
+    Copy of an element selected by a query, holding no reference to its tree.
+    The attributes are (name, value) pairs, the text is the string value of the element, and the path
+    is an XPath expression selecting the element again in the same document.
+    """
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        """Returns the record as a dictionary, to be serialized in JSON.
+
+        Returns:
+            dict: the fields of the record
+        """
+        return {"tag": self.tag, "attributes": dict(self.attributes), "text": self.text, "line": self.line,
+                "path": self.path}
+
+    @staticmethod
+    def from_dict(fields: dict) -> 'NodeRecord':
+        """Creates a record from the dictionary returned by <code>to_dict</code>.
+
+        Args:
+            fields (dict): the fields of the record
+
+        Returns:
+            NodeRecord: the record
+        """
+        return NodeRecord(fields["tag"], tuple(fields["attributes"].items()), fields["text"], fields["line"],
+                          fields["path"])
+
+
+def to_records(nodes: Iterable, attributes: Optional[Iterable[str]] = None) -> list:
+    """Returns the records of the nodes selected by a query, in one pass over them.
+    Strings, like the texts and attribute values selected by projections, are kept as they are.
+
+    Args:
+        nodes (Iterable): nodes selected by a query
+        attributes (list[str]): names of the attributes to copy, all of them if None
+
+    Returns:
+        list[NodeRecord | str]: the records
+    """
+    names = None if attributes is None else tuple(attributes)
+    records = []
+    tree = None
+    for node in nodes:
+        if isinstance(node, str):
+            records.append(str(node))
+            continue
+        if tree is None:
+            tree = node.getroottree()
+        if names is None:
+            copied_attributes = tuple(node.attrib.items())
+        else:
+            copied_attributes = tuple((name, node.get(name)) for name in names if node.get(name) is not None)
+        tag = node.tag if isinstance(node.tag, str) else None
+        records.append(NodeRecord(tag, copied_attributes, "".join(node.itertext()) if tag else node.text,
+                                  node.sourceline, tree.getpath(node)))
+    return records
+
+
+def to_json_value(value):
+    """Returns a result, with its records converted to dictionaries, to be serialized in JSON.
+
+    Args:
+        value (dict | list | NodeRecord | int | bool | str): result of an evaluation
+
+    Returns:
+        dict | list | int | bool | str: the result as JSON value
+    """
+    if isinstance(value, NodeRecord):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {name: to_json_value(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(item) for item in value]
+    return value
+
+
+def write_jsonl(results: Iterable, file: IO[str]) -> int:
+    """Writes each result as a line of JSON.
+
+    Args:
+        results (Iterable[dict | list | NodeRecord | int | bool | str]): results of evaluations
+        file (IO[str]): text file
+
+    Returns:
+        int: the number of lines written
+    """
+    count = 0
+    for result in results:
+        file.write(json.dumps(to_json_value(result), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def parse_uncached(document):
+    """Returns the node in reference of an evaluation, parsing raw documents without caching their tree,
+    so that it is freed once the records are built.
+
+    Args:
+        document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference or raw document
+
+    Returns:
+        lxml.etree._Element | lxml.etree._ElementTree: node in reference
+    """
+    from xpath_helper.document import documents, is_raw_document, parse_content
+    if not is_raw_document(document):
+        return document
+    return parse_content(document, documents.parser)
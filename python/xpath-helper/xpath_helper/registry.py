@@ -0,0 +1,105 @@
+import threading
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from xpath_helper.catalog import compile_query
+from xpath_helper.query_set import Query, QuerySet
+
+"""
+QueryRegistry declares named queries without building them.
+A query is declared with the function building it, and is only built, put in canonical form and compiled
+when it is first used, so that importing the modules declaring queries costs nearly nothing.
+"""
+
+
+class QueryRegistry(QuerySet):
+    """
+    Query set whose queries are built on first use.
+    """
+
+    def __init__(self):
+        """Creates an instance of QueryRegistry.
+        """
+        super().__init__()
+        self.__lock = threading.Lock()
+
+    def declare(self, name: str, factory: Optional[Callable[[], Query]] = None):
+        """Declares the query <code>name</code>, built by calling <code>factory</code> when it is first used.
+        Without <code>factory</code>, returns a decorator declaring the function it decorates.
+
+        Args:
+            name (str): name of the query
+            factory (Callable[[], XPathHelper | Aggregate]): function building the query
+
+        Returns:
+            Callable: <code>factory</code>, or the decorator
+        """
+        if factory is None:
+            return lambda decorated_factory: self.declare(name, decorated_factory)
+        self.queries[name] = _Declaration(factory)
+        return factory
+
+    def __getitem__(self, name: str) -> Query:
+        """Returns the query <code>name</code>, building and compiling it if it is its first use.
+
+        Args:
+            name (str): name of the query
+
+        Returns:
+            CatalogQuery: the compiled query
+        """
+        query = self.queries[name]
+        if isinstance(query, _Declaration):
+            with self.__lock:
+                query = self.queries[name]
+                if isinstance(query, _Declaration):
+                    query = compile_query(query.factory())
+                    self.queries[name] = query
+        return query
+
+    def items(self) -> Iterator[Tuple[str, Query]]:
+        """Returns the queries with their names, building the ones never used before.
+
+        Returns:
+            Iterator[tuple[str, XPathHelper | Aggregate | CatalogQuery]]: the names and queries
+        """
+        return ((name, self[name]) for name in list(self.queries))
+
+    def is_built(self, name: str) -> bool:
+        """Returns true if the query <code>name</code> was already built.
+
+        Args:
+            name (str): name of the query
+
+        Returns:
+            bool: true if the query is built
+        """
+        return not isinstance(self.queries[name], _Declaration)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> int:
+        """Builds and compiles the queries before their first use.
+
+        Args:
+            names (list[str]): names of the queries to build, all of them if None
+
+        Returns:
+            int: the number of queries built
+        """
+        built = 0
+        for name in list(self.queries) if names is None else names:
+            if not self.is_built(name):
+                self[name]
+                built += 1
+        return built
+
+
+class _Declaration:
+    __slots__ = ('factory',)
+
+    def __init__(self, factory: Callable[[], Query]):
+        self.factory = factory
+
+
+"""
+Registry shared by the modules declaring queries.
+"""
+registry = QueryRegistry()
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from xpath_helper.document import content_key, is_raw_document, resolve_document
+from xpath_helper.evaluation import Budget
+
+"""
+Cache of the results of queries evaluated again and again against the same documents.
+Results are stored as references, the positions of the selected elements in their tree, never as live elements,
+so that the cache doesn't keep whole trees in memory.
+"""
+
+"""
+Default maximum number of results kept by a ResultCache.
+"""
+DEFAULT_MAX_ENTRIES = 1024
+
+_UNCACHEABLE = object()
+
+
+class CacheStatistics:
+    """
+    Lookups made in a ResultCache.
+    """
+
+    def __init__(self):
+        """Creates an instance of CacheStatistics.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the ratio of the lookups finding their result in the cache.
+
+        Returns:
+            float: hit rate, between 0 and 1
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return ("CacheStatistics(hits=" + str(self.hits) + ", misses=" + str(self.misses) +
+                ", evictions=" + str(self.evictions) + ")")
+
+
+class ResultCache:
+    """
+    Least recently used cache of query results, keyed by document identity and version, and by query fingerprint.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: Optional[float] = None):
+        """Creates an instance of ResultCache.
+
+        Args:
+            max_entries (int): maximum number of cached results
+            ttl (float): duration after which a result expires, in seconds, never if None
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.statistics = CacheStatistics()
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def evaluate(self, query, document, key: Optional[Hashable] = None, version: Optional[Hashable] = None,
+                 budget: Optional[Budget] = None):
+        """Evaluates <code>query</code> against <code>document</code>, or returns its cached result.
+        A raw document is identified by its content, and a file by its path, modification time and size.
+        A tree is identified by <code>key</code>, and its <code>version</code> must change whenever the tree changes, unless its results are invalidated.
+
+        Args:
+            query (XPathHelper | Aggregate): query to evaluate
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): raw document or tree
+            key (Hashable): identity of the tree, like its URL, ignored for raw documents
+            version (Hashable): version of the tree
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            ValueError: when <code>document</code> is a tree and <code>key</code> is None
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            list | int | bool | str: the result of the query
+        """
+        entry_key = (_identity(document, key), version, query.fingerprint())
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(entry_key)
+            if entry is not None and entry[0] is not None and entry[0] <= now:
+                del self.__entries[entry_key]
+                entry = None
+            if entry is not None:
+                self.__entries.move_to_end(entry_key)
+                self.statistics.hits += 1
+            else:
+                self.statistics.misses += 1
+
+        if entry is not None:
+            return _dereference(entry[1], resolve_document(document))
+
+        result = query.evaluate(document, budget)
+        reference = _reference(result)
+        if reference is not _UNCACHEABLE:
+            expiration = None if self.ttl is None else now + self.ttl
+            with self.__lock:
+                self.__entries[entry_key] = (expiration, reference)
+                self.__entries.move_to_end(entry_key)
+                while len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+                    self.statistics.evictions += 1
+        return result
+
+    def invalidate(self, document=None, key: Optional[Hashable] = None):
+        """Removes the cached results of a document, whatever their version, or all of them if no document is given.
+
+        Args:
+            document (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): raw document or tree
+            key (Hashable): identity of the tree, ignored for raw documents
+        """
+        with self.__lock:
+            if document is None and key is None:
+                self.__entries.clear()
+                return
+            identity = _identity(document, key)
+            for entry_key in [entry_key for entry_key in self.__entries if entry_key[0] == identity]:
+                del self.__entries[entry_key]
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+def _identity(document, key: Optional[Hashable]) -> Hashable:
+    if is_raw_document(document):
+        return content_key(document)
+    if key is None:
+        raise ValueError("The results of a tree can only be cached under a key identifying it")
+    return ("key", key)
+
+
+def _reference(result):
+    """Returns the reference stored in place of a result: elements are replaced by their position in their tree,
+    and strings by plain str objects, which unlike lxml smart strings don't refer to their element.
+    """
+    if not isinstance(result, list):
+        return result
+    reference = []
+    for node in result:
+        if isinstance(node, str):
+            reference.append(str(node))
+            continue
+        position = _position(node)
+        if position is None:
+            return _UNCACHEABLE
+        reference.append(position)
+    return reference
+
+
+def _position(node) -> Optional[tuple]:
+    """Returns the child indexes leading from the root element of its tree to <code>node</code>,
+    or None when <code>node</code> isn't an element under the root element.
+    """
+    if not hasattr(node, "getparent"):
+        return None
+    indexes = []
+    parent = node.getparent()
+    while parent is not None:
+        indexes.append(parent.index(node))
+        node, parent = parent, parent.getparent()
+    if node is not node.getroottree().getroot():
+        return None
+    return tuple(reversed(indexes))
+
+
+def _dereference(reference, context):
+    if not isinstance(reference, list):
+        return reference
+    root = context.getroot() if hasattr(context, "getroot") else context.getroottree().getroot()
+    result = []
+    for position in reference:
+        if isinstance(position, str):
+            result.append(position)
+            continue
+        node = root
+        for index in position:
+            node = node[index]
+        result.append(node)
+    return result
@@ -0,0 +1,289 @@
+import weakref
+from typing import List, Optional
+from xpath_helper.filter import ValidExpressionFilter, _filter_tree, _is_position, minify_expression
+
+"""
+Location steps composing an XPathHelper query.
+"""
+
+DESCENDANT = "descendant"
+DESCENDANT_OR_SELF = "descendant-or-self"
+CHILD = "child"
+PARENT = "parent"
+ANCESTOR = "ancestor"
+ANCESTOR_OR_SELF = "ancestor-or-self"
+FOLLOWING = "following"
+FOLLOWING_SIBLING = "following-sibling"
+PRECEDING = "preceding"
+PRECEDING_SIBLING = "preceding-sibling"
+ATTRIBUTE = "attribute"
+TEXT = "text"
+
+"""
+Axes whose nodes are all located after the node in reference, in document order.
+"""
+FORWARD_AXES = frozenset([DESCENDANT, DESCENDANT_OR_SELF, CHILD, FOLLOWING, FOLLOWING_SIBLING])
+
+"""
+Axes selecting strings rather than nodes: the attribute values and the text of the node in reference.
+"""
+PROJECTION_AXES = frozenset([ATTRIBUTE, TEXT])
+
+_AXIS_PREFIXES = {
+    DESCENDANT: "//",
+    DESCENDANT_OR_SELF: "/descendant-or-self::",
+    CHILD: "/",
+    ANCESTOR: "/ancestor::",
+    ANCESTOR_OR_SELF: "/ancestor-or-self::",
+    FOLLOWING: "/following::",
+    FOLLOWING_SIBLING: "/following-sibling::",
+    PRECEDING: "/preceding::",
+    PRECEDING_SIBLING: "/preceding-sibling::",
+}
+
+"""
+Interned steps, by XPath expression. Steps no query refers to anymore are dropped.
+"""
+_STEPS = weakref.WeakValueDictionary()
+
+
+"""
+Location step of an XPath query.
+A step is the string of its XPath expression, so it can be joined like any other path fragment,
+but it also keeps the axis, node test and filter it was built from.
+Steps are interned: queries sharing a step share the same instance.
+"""
+
+
+class Step(str):
+    __slots__ = ('axis', 'tag', 'svg_tag', 'filter', '__weakref__')
+
+    def __new__(cls, axis: str, tag: Optional[str] = None, svg_tag: Optional[str] = None,
+                filter: Optional[ValidExpressionFilter] = None) -> 'Step':
+        """Creates an instance of Step, or returns the interned one with the same expression.
+
+        Args:
+            axis (str): XPath axis of the step
+            tag (str): tag name, any tag if None, or attribute name for the attribute axis
+            svg_tag (str): SVG tag name, matched against the local name of the nodes
+            filter (Filter): filter to apply
+
+        Returns:
+            Step: the new step
+        """
+        if filter is not None and filter.is_empty():
+            filter = None
+        expression = _render_step(axis, tag, svg_tag, compute_filter(filter))
+        step = _STEPS.get(expression)
+        if step is None:
+            step = super().__new__(cls, expression)
+            step.axis = axis
+            step.tag = tag
+            step.svg_tag = svg_tag
+            # Filters can be emptied in place, the step keeps the expression it was built with
+            step.filter = None if filter is None else ValidExpressionFilter(filter.sb)
+            _STEPS[expression] = step
+        return step
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the step, with its filter in canonical form.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        if self.filter is None:
+            return str(self)
+        return _render_step(self.axis, self.tag, self.svg_tag, "[" + self.filter.canonical() + "]")
+
+    def minify(self) -> str:
+        """Returns the shortest equivalent XPath expression of the step, with its filter minified.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        if self.axis in (PARENT, TEXT, ATTRIBUTE):
+            return str(self)
+        predicate = "" if self.filter is None else "[" + self.filter.minify() + "]"
+        node_test = minify_expression(render_node_test(self.tag, self.svg_tag))
+        # On the self axis, the position of a node is always 1: positional filters can't be moved there
+        if self.axis == DESCENDANT_OR_SELF and (self.filter is None or not _is_position(_filter_tree(self.filter))):
+            return "//self::" + node_test + predicate
+        return _AXIS_PREFIXES[self.axis] + node_test + predicate
+
+    def __reduce__(self):
+        return (Step, (self.axis, self.tag, self.svg_tag, self.filter))
+
+
+def _render_step(axis: str, tag: Optional[str], svg_tag: Optional[str], predicate: str) -> str:
+    if axis == PARENT:
+        return "/.."
+    if axis == TEXT:
+        return "/text()"
+    if axis == ATTRIBUTE:
+        return "/@" + tag
+    return _AXIS_PREFIXES[axis] + render_node_test(tag, svg_tag) + predicate
+
+
+def canonical_path(path: List[str]) -> str:
+    """Returns the canonical XPath expression of a path.
+    Equivalent paths built with filters written differently, or with union branches in a different order,
+    have the same canonical expression.
+
+    Args:
+        path (list[str]): path of a query
+
+    Returns:
+        str: the canonical XPath expression
+    """
+    return "".join(fragment.canonical() if isinstance(fragment, (Step, Limit, Union)) else fragment
+                   for fragment in path)
+
+
+def minify_path(path: List[str]) -> str:
+    """Returns the shortest equivalent XPath expression of a path.
+    Steps and filters are rendered without the spaces and parentheses they don't need, and a union
+    making the whole path loses its parentheses.
+
+    Args:
+        path (list[str]): path of a query
+
+    Returns:
+        str: the minified XPath expression
+    """
+    if len(path) == 1 and isinstance(path[0], Union):
+        return path[0].minify()[1:-1]
+    return "".join(fragment.minify() if isinstance(fragment, (Step, Limit, Union)) else minify_expression(fragment)
+                   for fragment in path)
+
+
+def render_node_test(tag: Optional[str] = None, svg_tag: Optional[str] = None) -> str:
+    """Returns the XPath node test matching <code>tag</code> or <code>svg_tag</code>.
+
+    Args:
+        tag (str): tag name, any tag if None
+        svg_tag (str): SVG tag name
+
+    Returns:
+        str: node test as an XPath string
+    """
+    if svg_tag is not None:
+        return "*[local-name() = '" + svg_tag + "']"
+    if tag is not None:
+        return tag
+    return "*"
+
+
+def compute_filter(filter: Optional[ValidExpressionFilter] = None) -> str:
+    """Returns the given filter as an XPath predicate.
+
+    Args:
+        filter (Filter): filter to apply
+
+    Returns:
+        str: filter as an XPath string
+    """
+    suffix = ""
+    if (filter != None and not filter.is_empty()):
+        expression = str(filter)
+        suffix = "[" + expression + "]"
+
+    return suffix
+
+
+"""
+Path keeping only the first nodes it selects, in document order.
+"""
+
+
+class Limit(str):
+    __slots__ = ('path', 'count')
+
+    def __new__(cls, path: List[str], count: int) -> 'Limit':
+        """Creates an instance of Limit.
+
+        Args:
+            path (list[str]): path whose result is limited
+            count (int): maximum number of nodes to keep
+
+        Returns:
+            Limit: the new limited path
+        """
+        limit = super().__new__(cls, "(" + "".join(path) + ")[position() <= " + str(count) + "]")
+        limit.path = tuple(path)
+        limit.count = count
+        return limit
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the limited path.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        return "(" + canonical_path(self.path) + ")[position() <= " + str(self.count) + "]"
+
+    def minify(self) -> str:
+        """Returns the shortest equivalent XPath expression of the limited path.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        return "(" + minify_path(self.path) + ")[" + ("1" if self.count == 1 else "position()<=" + str(self.count)) + "]"
+
+    def __reduce__(self):
+        return (Limit, (list(self.path), self.count))
+
+
+"""
+Union of the nodes selected by several paths, in document order.
+"""
+
+
+class Union(str):
+    __slots__ = ('branches',)
+
+    def __new__(cls, branches: List[List[str]]) -> 'Union':
+        """Creates an instance of Union.
+        Nested unions are flattened and duplicated branches are removed.
+
+        Args:
+            branches (list[list[str]]): paths whose nodes are united
+
+        Returns:
+            Union: the new union
+        """
+        unique_branches = {}
+        for branch in branches:
+            if len(branch) == 1 and isinstance(branch[0], Union):
+                nested_branches = branch[0].branches
+            else:
+                nested_branches = [tuple(branch)]
+            for nested_branch in nested_branches:
+                unique_branches.setdefault("".join(nested_branch) or ".", nested_branch)
+
+        union = super().__new__(cls, "(" + " | ".join(unique_branches) + ")")
+        union.branches = tuple(unique_branches.values())
+        return union
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the union, whose branches are sorted.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        return "(" + " | ".join(sorted(set(canonical_path(branch) or "." for branch in self.branches))) + ")"
+
+    def minify(self) -> str:
+        """Returns the shortest equivalent XPath expression of the union, whose branches keep their order.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        branches = []
+        for branch in self.branches:
+            expression = minify_path(branch) or "."
+            if expression not in branches:
+                branches.append(expression)
+        return "(" + "|".join(branches) + ")"
+
+    def __reduce__(self):
+        return (Union, ([list(branch) for branch in self.branches],))
@@ -1,13 +1,14 @@
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from xpath_helper.filter import ValidExpressionFilter
+from xpath_helper.step import (Limit, Step, Union, canonical_path, minify_path, DESCENDANT, DESCENDANT_OR_SELF, CHILD, PARENT, ANCESTOR, ANCESTOR_OR_SELF,
+                               FOLLOWING, FOLLOWING_SIBLING, PRECEDING, PRECEDING_SIBLING, ATTRIBUTE, TEXT)
 
 """
 XPathHelper provides a simple and chainnable API to build complicated XPath queries without the hassle.
 After building your XPath query, pass it to the <code>str</code> method  to get the corresponding XPath string.
 """
 class XPathHelper:
-    
-    sb: List[str] = []
+    __slots__ = ('sb',)
 
     def __init__(self, currentPath: Optional[List[str]]=None):
         """Creates an instance of XPathHelper.
@@ -19,6 +20,7 @@ class XPathHelper:
             self.sb = currentPath
 
         else:
+            self.sb = []
             self.__append_local_path()
 
     def empty(self):
@@ -35,6 +37,165 @@ class XPathHelper:
         """
         return "".join(self.sb)
 
+    def __eq__(self, other: object) -> bool:
+        """Returns true if <code>other</code> is a query with the same XPath expression.
+
+        Args:
+            other (object): object to compare with
+
+        Returns:
+            bool: true if both queries have the same expression
+        """
+        if not isinstance(other, XPathHelper):
+            return NotImplemented
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        """Returns the hash of the XPath expression of the query.
+        A query used as a dictionary key must not be emptied afterwards.
+
+        Returns:
+            int: hash of the query
+        """
+        return hash(str(self))
+
+    def canonical(self) -> str:
+        """Returns the canonical XPath expression of the query.
+        Equivalent queries whose filters have their operands written in a different order, duplicated or nested
+        in the same operator, or whose unions have their branches in a different order, have the same canonical expression.
+
+        Returns:
+            str: the canonical XPath expression
+        """
+        return canonical_path(self.sb)
+
+    def minify(self) -> str:
+        """Returns the shortest XPath expression selecting the same nodes as the query,
+        to keep large queries short when they are logged, stored or sent to a browser.
+
+        Returns:
+            str: the minified XPath expression
+        """
+        return minify_path(self.sb)
+
+    def to_css(self) -> Optional[str]:
+        """Returns the CSS selector matching the same elements as the query, which browsers match faster than XPath.
+        Only queries made of descendant, child and following sibling steps, filtered on their attributes or their position,
+        have a CSS equivalent.
+
+        Returns:
+            str: the CSS selector, or None if the query can't be expressed in CSS
+        """
+        from xpath_helper.css import to_css
+        return to_css(self.sb)
+
+    def fingerprint(self) -> str:
+        """Returns the fingerprint of the canonical XPath expression of the query.
+        The fingerprint is stable across processes, so that it can be used as a cache key.
+
+        Returns:
+            str: fingerprint of the query
+        """
+        from xpath_helper.fingerprint import fingerprint
+        return fingerprint(self.canonical())
+
+    def __or__(self, other: 'XPathHelper') -> 'XPathHelper' :
+        """Unites the nodes selected by this query and by <code>other</code>, with the <code>|</code> operator.
+        Queries united several times appear only once, and the union is evaluated in a single pass.
+
+        Args:
+            other (XPathHelper): query to unite with
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        if not isinstance(other, XPathHelper):
+            return NotImplemented
+        return self._replace(Union([self.sb, other.sb]))
+
+    def evaluate(self, context, budget: Optional['Budget']=None) -> list:
+        """Evaluates the query against <code>context</code>.
+        With a <code>budget</code>, the query is evaluated step by step and aborted as soon as one of its limits is exceeded.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document parsed
+                through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            list: the selected nodes
+        """
+        from xpath_helper.evaluation import evaluate
+        return evaluate(self.sb, context, budget)
+
+    def evaluate_records(self, context, attributes: Optional[Iterable[str]]=None, budget: Optional['Budget']=None) -> list:
+        """Evaluates the query against <code>context</code>, and returns compact records of the selected elements
+        instead of the elements. A raw document is parsed without the document cache, so its tree is freed
+        as soon as the records are built.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document
+            attributes (list[str]): names of the attributes copied in the records, all of them if None
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            list[NodeRecord | str]: the records of the selected elements, and the selected strings
+        """
+        from xpath_helper.records import parse_uncached, to_records
+        return to_records(self.evaluate(parse_uncached(context), budget), attributes)
+
+    async def aevaluate(self, context, budget: Optional['Budget']=None, executor=None) -> list:
+        """Evaluates the query against <code>context</code> in an executor, without blocking the event loop.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document parsed
+                through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+            executor (concurrent.futures.Executor): executor evaluating the query, the default executor of the event loop if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            list: the selected nodes
+        """
+        from xpath_helper.concurrency import run_in_executor
+        return await run_in_executor(self.evaluate, context, budget, executor=executor)
+
+    def iterate(self, context, budget: Optional['Budget']=None) -> Iterator:
+        """Lazily evaluates the query against <code>context</code>, step by step.
+        The nodes are produced in document order, and the evaluation stops as soon as no more node is requested.
+
+        Args:
+            context (bytes | str | os.PathLike | memoryview | lxml.etree._Element | lxml.etree._ElementTree): node in reference, or raw document parsed
+                through the document cache
+            budget (Budget): limits of the evaluation, unlimited if None
+
+        Raises:
+            BudgetExceededError: when the evaluation exceeds <code>budget</code>
+
+        Returns:
+            Iterator: the selected nodes
+        """
+        from xpath_helper.evaluation import iterate
+        return iterate(self.sb, context, budget)
+
+    @staticmethod
+    def builder() -> 'QueryBuilder':
+        """Returns a builder appending the steps in place, without creating a new instance per step.
+        Once complete, the query is frozen into an XPathHelper with <code>freeze</code>.
+
+        Returns:
+            QueryBuilder: a new, empty, instance of QueryBuilder
+        """
+        return QueryBuilder()
+
     ############## General commands ##############
 
     def get_parent(self) -> 'XPathHelper' :
@@ -43,7 +204,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/.."])
+        return self._append(Step(PARENT))
 
     def get_element_by_xpath(self, xpath : str) -> 'XPathHelper' :
         """Selects an element with an XPath selector <code>xpath</code>.
@@ -54,7 +215,85 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + [xpath])
+        return self._append(xpath)
+
+    def limit(self, count: int) -> 'XPathHelper' :
+        """Keeps only the <code>count</code> first nodes selected by the whole query, in document order.
+        Unlike <code>filter.get(index)</code>, which applies to the position of the node in its parent children list,
+        the limit applies to the complete result, and its evaluation stops as soon as enough nodes are found.
+
+        Args:
+            count (int): maximum number of nodes to select
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return self._replace(Limit(self.sb, count))
+
+    def first(self) -> 'XPathHelper' :
+        """Keeps only the first node selected by the whole query, in document order.
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return self.limit(1)
+
+    ############## Aggregates ##############
+    # Aggregates compute a single value out of the selected nodes, without returning them.
+    ########################################
+
+    def count(self) -> 'Aggregate':
+        """Counts the nodes selected by the query.
+
+        Returns:
+            Aggregate: the <code>count</code> aggregate, evaluated as an int
+        """
+        from xpath_helper.aggregate import Aggregate
+        from xpath_helper.evaluation import COUNT
+        return Aggregate(COUNT, self.sb)
+
+    def exists(self) -> 'Aggregate':
+        """Tells whether the query selects at least one node.
+
+        Returns:
+            Aggregate: the <code>boolean</code> aggregate, evaluated as a bool
+        """
+        from xpath_helper.aggregate import Aggregate
+        from xpath_helper.evaluation import BOOLEAN
+        return Aggregate(BOOLEAN, self.sb)
+
+    def string(self) -> 'Aggregate':
+        """Returns the string value of the first node selected by the query.
+
+        Returns:
+            Aggregate: the <code>string</code> aggregate, evaluated as a str
+        """
+        from xpath_helper.aggregate import Aggregate
+        from xpath_helper.evaluation import STRING
+        return Aggregate(STRING, self.sb)
+
+    ############## Projections ##############
+    # Projections select strings instead of nodes. Their evaluation returns plain str objects.
+    #########################################
+
+    def get_text(self) -> 'XPathHelper' :
+        """Selects the text of the current elements.
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return self._append(Step(TEXT))
+
+    def get_attribute(self, attribute: str) -> 'XPathHelper' :
+        """Selects the value of the attribute <code>attribute</code> of the current elements.
+
+        Args:
+            attribute (str): attribute name
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return self._append(Step(ATTRIBUTE, tag=attribute))
 
     ############## Descendant axis ##############
     # The descendant axis retrieves all nodes below the node in reference no matter the depth.
@@ -69,7 +308,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["//*" + self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT, filter=filter))
 
     def get_element(self, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes filtered by <code>filter</code>, below the node in reference no matter the depth.
@@ -93,7 +332,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["//" + tag + self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT, tag=tag, filter=filter))
 
     def get_element_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>, below the node in reference no matter the depth.
@@ -118,7 +357,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["//*[local-name() = '" + svg_tag + "']" + self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT, svg_tag=svg_tag, filter=filter))
 
     def get_element_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>, below the node in reference no matter the depth.
@@ -147,7 +386,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/descendant-or-self::*" + self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT_OR_SELF, filter=filter))
 
     def get_descendant_or_self_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>, below the current node, but also returns the node in reference.
@@ -159,7 +398,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/descendant-or-self::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT_OR_SELF, tag=tag, filter=filter))
 
     def get_descendant_or_self_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>, below the current node, but also returns the node in reference.
@@ -171,10 +410,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/descendant-or-self::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(DESCENDANT_OR_SELF, svg_tag=svg_tag, filter=filter))
 
     ############## Child axis ##############
     # The child axis returns the nodes immediately below the node in reference.
@@ -189,7 +425,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/*" + self.__compute_filter(filter)])
+        return self._append(Step(CHILD, filter=filter))
 
     def get_child_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>, immediately below the node in reference.
@@ -201,7 +437,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(CHILD, tag=tag, filter=filter))
 
     def get_child_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>, immediately below the node in reference.
@@ -213,7 +449,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/*[local-name() = '" + svg_tag + "']" + self.__compute_filter(filter)])
+        return self._append(Step(CHILD, svg_tag=svg_tag, filter=filter))
 
     ############## Ancestor axis ##############
     # The ancestor axis returns all the nodes that are ancestors,
@@ -230,7 +466,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor::*" + self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR, filter=filter))
 
     def get_ancestor_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -243,7 +479,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR, tag=tag, filter=filter))
 
     def get_ancestor_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -256,10 +492,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR, svg_tag=svg_tag, filter=filter))
 
     ############## Ancestor-or-self axis ##############
     # The ancestor-or-self axis returns all nodes that are ancestors,
@@ -276,7 +509,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor-or-self::*" + self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR_OR_SELF, filter=filter))
 
     def get_ancestor_or_self_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -289,7 +522,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor-or-self::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR_OR_SELF, tag=tag, filter=filter))
 
     def get_ancestor_or_self_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -302,10 +535,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/ancestor-or-self::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(ANCESTOR_OR_SELF, svg_tag=svg_tag, filter=filter))
 
     ############## Following axis ##############
     # The following axis selects all nodes no matter the depth, that are located on parent-level
@@ -322,7 +552,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following::*" + self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING, filter=filter))
 
     def get_following_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -335,7 +565,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING, tag=tag, filter=filter))
 
     def get_following_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -348,10 +578,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING, svg_tag=svg_tag, filter=filter))
 
     ############## Following-sibling axis ##############
     # The following-sibling axis selects all nodes that are located on the same level who are located after (following) the node in reference.
@@ -367,7 +594,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following-sibling::*" + self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING_SIBLING, filter=filter))
 
     def get_following_sibling_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -380,7 +607,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following-sibling::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING_SIBLING, tag=tag, filter=filter))
 
     def get_following_sibling_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -393,10 +620,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/following-sibling::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(FOLLOWING_SIBLING, svg_tag=svg_tag, filter=filter))
 
     ############## Preceding axis ##############
     # The preceding axis selects all nodes no matter the depth,
@@ -413,7 +637,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding::*" + self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING, filter=filter))
 
     def get_preceding_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -426,7 +650,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING, tag=tag, filter=filter))
 
     def get_preceding_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -439,10 +663,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING, svg_tag=svg_tag, filter=filter))
 
     ############## Preceding-sibling axis ##############
     # The preceding axis selects all nodes that are located on the same level
@@ -459,7 +680,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding-sibling::*" + self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING_SIBLING, filter=filter))
 
     def get_preceding_sibling_by_tag(self, tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
         """Selects the nodes with tag <code>tag</code> filtered by <code>filter</code>,
@@ -472,7 +693,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding-sibling::" + tag + "" + self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING_SIBLING, tag=tag, filter=filter))
 
     def get_preceding_sibling_by_svg_tag(self, svg_tag: str, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper':
         """Selects the SVG nodes with SVG tag <code>svg_tag</code> filtered by <code>filter</code>,
@@ -485,10 +706,7 @@ class XPathHelper:
         Returns:
             XPathHelper: a new instance of XPathHelper
         """
-        return XPathHelper(self.sb + ["/preceding-sibling::*[local-name() = '" +
-                                      svg_tag +
-                                      "']" +
-                                      self.__compute_filter(filter)])
+        return self._append(Step(PRECEDING_SIBLING, svg_tag=svg_tag, filter=filter))
 
     def __append_local_path(self):
         """Adds the local path.
@@ -498,18 +716,76 @@ class XPathHelper:
         """
         return XPathHelper(self.sb + ["."])
 
-    def __compute_filter(self, filter: Optional[ValidExpressionFilter]=None) -> 'XPathHelper' :
-        """Adds the given filter to the current xpath expression.
+    def _append(self, fragment: str) -> 'XPathHelper':
+        """Appends a fragment to the path.
 
         Args:
-            filter (Filter): filter to apply
+            fragment (str): fragment of XPath expression
 
         Returns:
-            str: filter as an XPath string
+            XPathHelper: a new instance of XPathHelper
         """
-        suffix = ""
-        if (filter != None and not filter.is_empty()):
-            expression = str(filter)
-            suffix = "[" + expression + "]"
+        return XPathHelper(self.sb + [fragment])
+
+    def _replace(self, fragment: str) -> 'XPathHelper':
+        """Replaces the whole path by a fragment built from it.
+
+        Args:
+            fragment (str): fragment of XPath expression
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return XPathHelper([fragment])
+
+
+"""
+QueryBuilder has the same API as XPathHelper, but appends the steps to its own path instead of
+returning a new instance for each of them. It suits code assembling long queries step by step in a loop.
+Once complete, the query is frozen into an immutable XPathHelper with <code>freeze</code>.
+"""
+class QueryBuilder(XPathHelper):
+    __slots__ = ()
+
+    # A builder changes at each step, it can't be used as a dictionary key
+    __hash__ = None
+
+    def freeze(self) -> XPathHelper:
+        """Returns the query built so far. Further steps appended to the builder don't alter it.
+
+        Returns:
+            XPathHelper: a new instance of XPathHelper
+        """
+        return XPathHelper(list(self.sb))
+
+    def count(self) -> 'Aggregate':
+        """Counts the nodes selected by the query built so far.
+
+        Returns:
+            Aggregate: the <code>count</code> aggregate, evaluated as an int
+        """
+        return self.freeze().count()
+
+    def exists(self) -> 'Aggregate':
+        """Tells whether the query built so far selects at least one node.
+
+        Returns:
+            Aggregate: the <code>boolean</code> aggregate, evaluated as a bool
+        """
+        return self.freeze().exists()
+
+    def string(self) -> 'Aggregate':
+        """Returns the string value of the first node selected by the query built so far.
+
+        Returns:
+            Aggregate: the <code>string</code> aggregate, evaluated as a str
+        """
+        return self.freeze().string()
+
+    def _append(self, fragment: str) -> 'QueryBuilder':
+        self.sb.append(fragment)
+        return self
 
-        return suffix
\ No newline at end of file
+    def _replace(self, fragment: str) -> 'QueryBuilder':
+        self.sb = [fragment]
+        return self